@@ -1,38 +1,47 @@
 import argparse
+import asyncio
 import logging
 import sys
-import time
+import threading
 
-import schedule
-
-from atp import crud
+from atp import crud, settings
 from atp.check_availability import check_video_batch
-from atp.database import get_db_session, run_migrations
+from atp.database import check_database_settings, get_db_session, run_migrations
 from atp.download import download_new_videos
+from atp.media import temp_files_cleanup
+from atp.outbox import send_outbox, sender_wakeup
+from atp.part_cache import cache_cleanup
+from atp.scheduler import Scheduler
 from atp.settings import COOKIES_FILE, DOWNLOAD_LIKED_VIDEOS, DOWNLOAD_SAVED_VIDEOS, TIKTOK_USER
 from atp.telegram import discover_chat_id
 from atp.video_import import import_from_file, import_from_tiktok
 
 logger = logging.getLogger(__name__)
 
-
-def run_download_from_file() -> None:
-    """Импортирует видео из json файла и скачивает их"""
-    import_from_file()
-    download_new_videos()
+# Будит задачу скачивания, когда импорт добавил новые видео
+download_wakeup = threading.Event()
 
 
-def run_download_from_tiktok() -> None:
-    """Импортирует видео из TikTok и скачивает их"""
+def run_import_from_tiktok() -> None:
+    """Импортирует видео из TikTok и запускает их скачивание"""
     import_from_tiktok()
-    download_new_videos()
+    download_wakeup.set()
 
 
 def run_scheduler() -> None:
-    """Основной цикл работы приложения"""
+    """Основной цикл работы приложения
+
+    Импорт, скачивание, проверка доступности и отправка уведомлений работают
+    независимыми задачами планировщика, поэтому долгое скачивание не откладывает проверку.
+    Каждая задача пишет в базу своей сессией короткими транзакциями и не держит
+    блокировку записи SQLite, пока ждёт сети (см. crud.batched_commits).
+    """
     run_migrations()
+    check_database_settings()
+    temp_files_cleanup()
+    cache_cleanup()
     discover_chat_id()
-    run_download_from_file()
+    import_from_file()
 
     db = get_db_session()
     videos = crud.get_videos(db)
@@ -44,7 +53,14 @@ def run_scheduler() -> None:
         )
         sys.exit(1)
 
-    schedule.every().hour.at("00:00").do(check_video_batch)
+    scheduler = Scheduler()
+    # Скачивание запускается сразу и затем после каждого импорта из TikTok
+    scheduler.loop("download", download_new_videos, wakeup=download_wakeup)
+    scheduler.hourly("check", check_video_batch, minute=0)
+    # Уведомления, не отправленные до перезапуска, уходят сразу
+    scheduler.loop(
+        "notify", send_outbox, interval=settings.OUTBOX_POLL_INTERVAL, wakeup=sender_wakeup
+    )
 
     if not TIKTOK_USER:
         logger.warning("TIKTOK_USER is missing! Importing videos from TikTok is disabled")
@@ -60,12 +76,10 @@ def run_scheduler() -> None:
                 "For more information please visit https://github.com/skrepkaq/ATP#cookies"
             )
 
-        schedule.every().hour.at("30:00").do(run_download_from_tiktok)
+        scheduler.hourly("import", run_import_from_tiktok, minute=30)
 
     logger.info("ATP archiver has been started!")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    asyncio.run(scheduler.run())
 
 
 def main() -> None:
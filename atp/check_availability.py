@@ -1,25 +1,37 @@
-import io
+import itertools
 import logging
 import math
+import os
 import random
-import time
+from concurrent.futures import Future, as_completed
 from datetime import datetime
-from pathlib import Path
 
 import requests
 from sqlalchemy.orm import Session
 
 from atp import crud, settings
 from atp.database import get_db_session
-from atp.media import generate_bmp, get_file_size, split_video, temp_files_cleanup
-from atp.models import Video, VideoStatus
+from atp.media import generate_bmp
+from atp.models import Video, VideoInfo, VideoStatus
+from atp.outbox import wake_outbox_sender
+from atp.rate_limit import TokenBucket, get_rate_limiter
 from atp.settings import CHECK_INTERVAL_DAYS
-from atp.telegram import edit_media, send_media
-from atp.tiktok import check_video_availability
+from atp.telegram import edit_media
+from atp.tiktok import (
+    YtDlpExecutor,
+    check_video_availability,
+    close_ydl_pool,
+    probe_videos_availability,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _check_limiter() -> TokenBucket:
+    """Общий для всех потоков лимит CHECK_RATE_LIMIT запросов в секунду на прокси"""
+    return get_rate_limiter(f"check:{os.getenv('ALL_PROXY', '')}", settings.CHECK_RATE_LIMIT)
+
+
 def check_services_availability() -> bool:
     """Проверяет доступность TikTok и Telegram"""
     if not settings.CHECK_TIKTOK_AVAILABILITY:
@@ -29,18 +41,22 @@ def check_services_availability() -> bool:
     VIDEO_AVAILABLE_BEFORE = datetime(2022, 3, 1)
 
     db = get_db_session()
-    db_videos = sorted(
-        crud.get_videos(db, status=[VideoStatus.SUCCESS]),
-        key=lambda v: (v.date is not None, v.date),
-    )
-    db_videos = [video.id for video in db_videos if video.date > VIDEO_AVAILABLE_BEFORE]
+    try:
+        db_videos = crud.get_latest_video_ids(
+            db, VideoStatus.SUCCESS, after=VIDEO_AVAILABLE_BEFORE, limit=100
+        )
+    finally:
+        db.close()
     videos = (
-        random.sample(db_videos[-100:], min(10, len(db_videos)))
+        random.sample(db_videos, min(10, len(db_videos)))
         + random.sample(settings.KNOWN_GOOD_TIKTOKS, 20)
     )[:20]  # fmt: skip
 
+    limiter = _check_limiter()
     for i, video in enumerate(videos):
-        result = check_video_availability(Video(id=video, status=VideoStatus.NEW), no_errors=True)
+        result = check_video_availability(
+            Video(id=video, status=VideoStatus.NEW), no_errors=True, limiter=limiter
+        )
         if result and result.deleted_reason is None and result.date > VIDEO_AVAILABLE_BEFORE:
             return True
         if i == 0:
@@ -63,87 +79,6 @@ def check_services_availability() -> bool:
     return False
 
 
-def _get_caption(video: Video) -> str:
-    """Возвращает описание видео, ограничив его 1024 символами"""
-    MAX_LENGTH = 1024
-    author = video.author + "\n" if video.author else ""
-    cut_name = video.name or ""
-    total_length = len(author) + len(cut_name) + 11
-    if total_length > MAX_LENGTH:
-        diff = total_length - MAX_LENGTH
-        cut_name = cut_name[: -diff - 3] + "..."
-    caption = author + cut_name + "\n" + video.date.strftime("%d.%m.%Y")
-    return caption
-
-
-def _send_multipart_video(video_parts: list[Path], caption: str) -> int:
-    """У телеграма есть ограничение для ботов на размер видео в 50МБ
-    Поэтому если видео больше 50МБ, то его нужно разбить на части и отправить как медиа-группу
-    Только вот ограничение на самом деле распространяется не на каждое видео, на весь POST запрос
-    Поэтому нам приходится сначала отправить BMP заглушки,
-    а потом, по одному заменять их на реальные видео части.
-    """
-    bmp_photos = [generate_bmp(str(video_file)) for video_file in video_parts]
-    result = send_media(caption=caption, photos=bmp_photos)
-
-    messages = result if isinstance(result, list) else [result]
-    message_ids = [msg["message_id"] for msg in messages]
-
-    for i, (msg_id, part_path) in enumerate(zip(message_ids, video_parts, strict=True)):
-        with open(part_path, "rb") as video_file:
-            video_data = io.BytesIO(video_file.read())
-
-        part_caption = caption if i == 0 else ""
-
-        success = edit_media(message_id=msg_id, caption=part_caption, video=video_data)
-        if not success:
-            logger.warning("Failed to replace placeholder with video part %s", i + 1)
-
-        time.sleep(5)
-
-    logger.info("Telegram notification sent and parts updated successfully.")
-    return message_ids[0]
-
-
-def _handle_unavailable(db: Session, video: Video) -> bool:
-    logger.info("Video %s is no longer available!", video.id)
-
-    video_path = Path(settings.DOWNLOADS_DIR) / f"{video.id}.mp4"
-    if not video_path.exists():
-        logger.error("Video file not found: %s", video_path)
-        return False
-
-    try:
-        caption = _get_caption(video)
-
-        video_len = get_file_size(video_path)
-        if video_len > settings.TELEGRAM_MAX_VIDEO_SIZE:
-            parts = math.ceil(video_len / (settings.TELEGRAM_MAX_VIDEO_SIZE * 0.9))
-            parts = max(2, min(10, parts))  # от 2 до 10 частей
-
-            logger.info("Video %s is too large, splitting it into %s parts", video.id, parts)
-            video_parts = split_video(video_path, parts)
-            if not video_parts:
-                logger.error(
-                    "Failed to split video. This should never happen. Create a GitHub issue"
-                )
-                return False
-            msg_id = _send_multipart_video(video_parts, caption)
-        else:
-            with open(video_path, "rb") as video_file:
-                video_data = io.BytesIO(video_file.read())
-            result = send_media(caption=caption, video=video_data)
-            msg_id = result["message_id"]
-            logger.info("Telegram notification sent successfully.")
-
-        return crud.update_video(db, video=video, message_id=msg_id, status=VideoStatus.DELETED)
-    except Exception as e:
-        logger.exception("Exception occurred while sending Telegram notification: %s", e)
-        return False
-    finally:
-        temp_files_cleanup()
-
-
 def _handle_restored(db: Session, video: Video) -> bool:
     logger.info("Video %s has been restored!", video.id)
     if video.message_id:
@@ -162,60 +97,113 @@ def _handle_restored(db: Session, video: Video) -> bool:
     return crud.update_video(db, video=video, message_id=None, status=VideoStatus.SUCCESS)
 
 
+def _detached(video: Video) -> Video:
+    """Копия видео для других потоков: ORM объекты после commit перечитываются из сессии"""
+    return Video(
+        id=video.id,
+        name=video.name,
+        date=video.date,
+        status=video.status,
+        author=video.author,
+    )
+
+
+def _check(video: Video, limiter: TokenBucket) -> VideoInfo | None:
+    """Проверяет доступность видео в потоке пула с учётом лимита запросов"""
+    logger.info("Checking video %s (%s)", video.id, video.name or "Unknown")
+    return check_video_availability(video, limiter=limiter)
+
+
 def check_video_batch() -> None:
-    """Проверяет партию видео на доступность"""
+    """Проверяет партию видео на доступность
+
+    Видео проверяются параллельно в CHECK_WORKERS потоков с общим лимитом
+    CHECK_RATE_LIMIT запросов в секунду на прокси, в который входят и пакетные
+    проверки, и повторы запросов. Уведомления о недоступных видео ставятся
+    в очередь outbox и отправляются отдельной задачей,
+    чтобы медленная загрузка в Telegram не задерживала проверки.
+    В базу пишет только текущий поток.
+    """
     db = get_db_session()
+    checker = YtDlpExecutor(max_workers=settings.CHECK_WORKERS, thread_name_prefix="check")
 
     try:
         if not check_services_availability():
             return
 
-        all_videos = sorted(
-            crud.get_videos(db, status=[VideoStatus.SUCCESS, VideoStatus.DELETED]),
-            key=lambda v: (v.last_checked is not None, v.last_checked),
-        )
+        total = crud.count_videos(db, status=crud.CHECKED_STATUSES)
 
-        if not all_videos:
+        if not total:
             logger.info("No videos to check")
             return
 
         # Рассчитываем, сколько видео проверять в этой партии
         # Формула: всего видео / дней / часов = видео в час
-        videos_per_batch = math.ceil(len(all_videos) / CHECK_INTERVAL_DAYS / 24)
+        videos_per_batch = math.ceil(total / CHECK_INTERVAL_DAYS / 24)
 
-        logger.info("Checking %s videos out of %s total", videos_per_batch, len(all_videos))
+        logger.info("Checking %s videos out of %s total", videos_per_batch, total)
 
-        videos = all_videos[:videos_per_batch]
+        videos = crud.get_videos_to_check(db, limit=videos_per_batch)
         unavailable_count = 0
         restored_count = 0
 
-        for video in videos:
-            logger.info("Checking video %s (%s)", video.id, video.name or "Unknown")
-
-            if not (result := check_video_availability(video)):
-                continue
+        limiter = _check_limiter()
+        # Быстро подтверждаем доступность видео пачками, полностью проверяем только остальные
+        # Удалённые видео проверяем всегда полностью, чтобы не пропустить восстановление
+        probed = (
+            probe_videos_availability(
+                [video.id for video in videos if video.status == VideoStatus.SUCCESS], limiter
+            )
+            if settings.AVAILABILITY_PROBE
+            else {}
+        )
 
-            available = not result.deleted_reason
-            if available:
-                if video.status == VideoStatus.DELETED:
-                    restored_count += 1
-                    if not _handle_restored(db, video):
-                        continue
-            else:
-                if video.status == VideoStatus.SUCCESS:
+        checks: dict[Future, Video] = {
+            checker.submit(_check, _detached(video), limiter): video
+            for video in videos
+            if video.id not in probed
+        }
+        probed_results = ((video, probed[video.id]) for video in videos if video.id in probed)
+        checked_results = ((checks[future], future.result()) for future in as_completed(checks))
+
+        available_ids: list[str] = []
+        with crud.batched_commits(db):
+            for video, result in itertools.chain(probed_results, checked_results):
+                if not result:
+                    continue
+
+                available = not result.deleted_reason
+                if available:
+                    if video.status == VideoStatus.DELETED:
+                        restored_count += 1
+                        if not _handle_restored(db, video):
+                            continue
+                    else:
+                        available_ids.append(video.id)
+                elif video.status == VideoStatus.SUCCESS:
                     unavailable_count += 1
-                    if not _handle_unavailable(db, video):
-                        continue
-
-            crud.update_video(db, video=video, deleted_reason=result.deleted_reason)
-
-        logger.info("Checked %s videos", len(videos))
+                    logger.info("Video %s is no longer available!", video.id)
+                    # Статус DELETED видео получит после отправки уведомления
+                    crud.add_outbox_entry(db, video.id, result.deleted_reason)
+                    crud.update_video(db, video=video)
+                    continue
+
+                crud.update_video(db, video=video, deleted_reason=result.deleted_reason)
+
+            logger.info("Checked %s videos", len(videos))
+        # Видео могло пропасть на прошлой проверке и вернуться до отправки уведомления
+        if cancelled := crud.delete_outbox_entries(db, available_ids):
+            logger.info("Cancelled %s notifications for videos available again", cancelled)
+        if unavailable_count:
+            wake_outbox_sender()
         logger.info("Found %s unavailable videos", unavailable_count)
         logger.info("Found %s restored videos", restored_count)
 
     except Exception as e:
         logger.exception("Error checking videos: %s", e)
     finally:
+        checker.shutdown(wait=True, cancel_futures=True)
+        close_ydl_pool()
         db.close()
 
 
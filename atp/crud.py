@@ -1,8 +1,131 @@
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select, union_all, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.sql import ColumnElement
 
-from atp.models import Video, VideoInfo
+from atp.models import AppState, OutboxEntry, Video, VideoInfo, VideoStatus
+
+# Количество строк в одном запросе (ограничение SQLite на число параметров)
+BULK_CHUNK_SIZE = 500
+
+
+# Сколько изменений накапливать и как долго держать их до commit в batched_commits
+COMMIT_BATCH_SIZE = 50
+COMMIT_BATCH_INTERVAL = 5.0
+
+_BATCH_KEY = "commit_batch"
+
+# Статусы видео, доступность которых проверяется
+CHECKED_STATUSES = [VideoStatus.SUCCESS, VideoStatus.DELETED]
+
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class CommitBatch:
+    """Накопитель изменений сессии: делает commit раз в size изменений или interval секунд.
+
+    :ivar pending: Количество изменений, ещё не записанных в базу
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        size: int = COMMIT_BATCH_SIZE,
+        interval: float = COMMIT_BATCH_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.db = db
+        self.size = size
+        self.interval = interval
+        self.pending = 0
+        self._clock = clock
+        self._committed_at = clock()
+
+    def add(self) -> None:
+        """Учитывает изменение и делает commit, если накопилось достаточно"""
+        # Без flush: отправленные в транзакцию изменения держат блокировку записи SQLite,
+        # пока код ждёт скачивания или сети, и другие задачи получают "database is locked"
+        self.pending += 1
+        if self.pending >= self.size or self._clock() - self._committed_at >= self.interval:
+            self.commit()
+
+    def commit(self) -> None:
+        """Сразу записывает все накопленные изменения"""
+        self.db.commit()
+        self.pending = 0
+        self._committed_at = self._clock()
+
+
+@contextmanager
+def batched_commits(
+    db: Session, size: int = COMMIT_BATCH_SIZE, interval: float = COMMIT_BATCH_INTERVAL
+) -> Iterator[CommitBatch]:
+    """Объединяет commit-ы add_video_to_db и update_video внутри блока.
+
+    Изменения накапливаются в сессии и попадают в базу пачками одной короткой транзакцией,
+    а оставшиеся записываются при выходе из блока. Между commit-ами база не блокируется,
+    поэтому другие задачи могут писать в неё, пока блок ждёт сети.
+    При падении процесса теряются только незаписанные изменения, то есть база
+    откатывается к более раннему, но согласованному состоянию
+    (например, скачанное видео останется NEW и будет скачано ещё раз).
+
+    :param db: Сессия базы данных
+    :param size: Количество изменений в одном commit
+    :param interval: Максимальное время в секундах между commit-ами
+    :return: Накопитель изменений
+    """
+    if _BATCH_KEY in db.info:
+        # Вложенный блок пишет в уже открытую пачку
+        yield db.info[_BATCH_KEY]
+        return
+
+    batch = db.info[_BATCH_KEY] = CommitBatch(db, size, interval)
+    try:
+        yield batch
+        batch.commit()
+    except BaseException:
+        # Накопленные изменения относятся к уже завершённой работе, сохраняем их
+        try:
+            batch.commit()
+        except Exception:
+            db.rollback()
+        raise
+    finally:
+        del db.info[_BATCH_KEY]
+
+
+def commit(db: Session) -> None:
+    """Сразу записывает изменения в базу, в том числе накопленные batched_commits.
+
+    Нужен для изменений, которые нельзя повторять после сбоя (например, отправленных сообщений).
+
+    :param db: Сессия базы данных
+    """
+    if batch := db.info.get(_BATCH_KEY):
+        batch.commit()
+    else:
+        db.commit()
+
+
+def _commit(db: Session) -> None:
+    """Записывает изменения сразу или откладывает их, если открыт batched_commits"""
+    if batch := db.info.get(_BATCH_KEY):
+        batch.add()
+    else:
+        db.commit()
+
+
+def _find_pending_video(db: Session, video_id: str) -> Video | None:
+    """Ищет видео, добавленное в сессию, но ещё не записанное в базу (см. batched_commits)"""
+    return next((obj for obj in db.new if isinstance(obj, Video) and obj.id == video_id), None)
 
 
 def add_video_to_db(
@@ -16,12 +139,14 @@ def add_video_to_db(
 
     :return: Объект видео в базе данных
     """
-    db_video = db.query(Video).filter(Video.id == video_id).first()
+    db_video = _find_pending_video(db, video_id) or (
+        db.query(Video).filter(Video.id == video_id).first()
+    )
 
     if not db_video:
         db_video = Video(id=video_id, date=date, liked=liked, saved=saved)
         db.add(db_video)
-        db.commit()
+        _commit(db)
 
     return db_video
 
@@ -29,14 +154,26 @@ def add_video_to_db(
 def add_videos_bulk(db: Session, videos: list[VideoInfo]) -> None:
     """Добавляет список видео в базу данных.
 
+    Видео, которые уже есть в базе, пропускаются (INSERT ... ON CONFLICT DO NOTHING),
+    поэтому на каждые BULK_CHUNK_SIZE видео приходится один запрос.
+
     :param db: Сессия базы данных
     :param videos: Список объектов VideoInfo
     """
-    for video in videos:
-        if db.query(Video).filter(Video.id == video.id).first():
-            continue
-        db_video = Video(id=video.id, date=video.date, liked=video.liked, saved=video.saved)
-        db.add(db_video)
+    statement = insert(Video).on_conflict_do_nothing(index_elements=[Video.id])
+    for chunk in _chunks(videos):
+        db.execute(
+            statement,
+            [
+                {
+                    "id": video.id,
+                    "date": video.date,
+                    "liked": bool(video.liked),
+                    "saved": bool(video.saved),
+                }
+                for video in chunk
+            ],
+        )
 
     db.commit()
 
@@ -44,34 +181,133 @@ def add_videos_bulk(db: Session, videos: list[VideoInfo]) -> None:
 def update_video_sources_bulk(db: Session, videos: list[VideoInfo]) -> None:
     """Обновляет источники видео в базе данных.
 
+    Выполняется одним UPDATE ... WHERE id IN (...) на каждые BULK_CHUNK_SIZE видео.
+    Видео, которых нет в базе, пропускаются.
+
     :param db: Сессия базы данных
     :param videos: Список объектов VideoInfo
     """
-    for video in videos:
-        db_video = db.query(Video).filter(Video.id == video.id).first()
-        if not db_video:
-            continue
-        if not db_video.liked and video.liked:
-            db_video.liked = True
-        if not db_video.saved and video.saved:
-            db_video.saved = True
+    for column, video_ids in (
+        (Video.liked, [video.id for video in videos if video.liked]),
+        (Video.saved, [video.id for video in videos if video.saved]),
+    ):
+        for chunk in _chunks(video_ids):
+            # Никогда не обновляем liked и saved на False
+            db.execute(
+                update(Video).where(Video.id.in_(chunk), column.is_(False)).values({column: True})
+            )
 
     db.commit()
 
 
-def get_videos(db: Session, status: list[str] | None = None) -> list[Video]:
+def get_videos(
+    db: Session,
+    status: list[str] | None = None,
+    order_by: ColumnElement | None = None,
+    limit: int | None = None,
+) -> list[Video]:
     """Получает список видео из базы данных.
 
     :param db: Сессия базы данных
     :param status: Список статусов видео
+    :param order_by: Выражение сортировки (сортирует база, а не Python)
+    :param limit: Максимальное количество видео
     :return: Список объектов видео
     """
     videos = db.query(Video)
     if status:
         videos = videos.filter(Video.status.in_(status))
+    if order_by is not None:
+        videos = videos.order_by(order_by)
+    if limit is not None:
+        videos = videos.limit(limit)
     return videos.all()
 
 
+def count_videos(db: Session, status: list[str] | None = None) -> int:
+    """Считает видео в базе данных, не загружая их.
+
+    :param db: Сессия базы данных
+    :param status: Список статусов видео
+    :return: Количество видео
+    """
+    query = select(func.count()).select_from(Video)
+    if status:
+        query = query.where(Video.status.in_(status))
+    return db.scalar(query)
+
+
+def get_videos_to_check(db: Session, limit: int) -> list[Video]:
+    """Получает limit самых давно проверенных видео для проверки доступности.
+
+    Сначала идут ни разу не проверенные видео. Условие status IN (...) не даёт
+    использовать порядок индекса (status, last_checked), поэтому для каждого статуса
+    берётся limit первых видео по индексу без сортировки, а общий порядок наводится
+    уже среди них. Загружаются только нужные проверке колонки.
+
+    :param db: Сессия базы данных
+    :param limit: Количество видео
+    :return: Список объектов видео
+    """
+    oldest_checked = Video.last_checked.asc().nulls_first()
+    per_status = [
+        select(Video.id).where(Video.status == status).order_by(oldest_checked).limit(limit)
+        for status in CHECKED_STATUSES
+    ]
+    candidates = union_all(*(select(query.subquery().c.id) for query in per_status))
+    return list(
+        db.scalars(
+            select(Video)
+            .options(
+                load_only(
+                    Video.name,
+                    Video.date,
+                    Video.status,
+                    Video.author,
+                    Video.last_checked,
+                    Video.message_id,
+                )
+            )
+            .where(Video.id.in_(candidates))
+            .order_by(oldest_checked)
+            .limit(limit)
+        )
+    )
+
+
+def get_video_sources(db: Session, video_ids: list[str]) -> dict[str, tuple[bool, bool]]:
+    """Получает источники видео по списку ID.
+
+    :param db: Сессия базы данных
+    :param video_ids: Список ID видео
+    :return: Словарь ID -> (liked, saved) для видео, которые есть в базе
+    """
+    sources: dict[str, tuple[bool, bool]] = {}
+    for chunk in _chunks(video_ids):
+        rows = db.execute(select(Video.id, Video.liked, Video.saved).where(Video.id.in_(chunk)))
+        sources.update({video_id: (liked, saved) for video_id, liked, saved in rows})
+    return sources
+
+
+def get_latest_video_ids(db: Session, status: str, after: datetime, limit: int) -> list[str]:
+    """Получает ID самых новых видео с датой позже after.
+
+    :param db: Сессия базы данных
+    :param status: Статус видео
+    :param after: Видео с датой до этой (включительно) пропускаются
+    :param limit: Максимальное количество видео
+    :return: Список ID, от новых к старым
+    """
+    return list(
+        db.scalars(
+            select(Video.id)
+            .where(Video.status == status, Video.date > after)
+            .order_by(Video.date.desc())
+            .limit(limit)
+        )
+    )
+
+
 def update_video(
     db: Session,
     video: Video,
@@ -104,5 +340,85 @@ def update_video(
         setattr(video, key, value)
     if update_last_checked:
         video.last_checked = datetime.now()
-    db.commit()
+    _commit(db)
     return True
+
+
+def get_state(db: Session, key: str) -> str | None:
+    """Получает значение служебного состояния.
+
+    :param db: Сессия базы данных
+    :param key: Ключ
+    :return: Значение или None, если его нет
+    """
+    return db.scalar(select(AppState.value).where(AppState.key == key))
+
+
+def set_state(db: Session, key: str, value: str) -> None:
+    """Сохраняет значение служебного состояния.
+
+    :param db: Сессия базы данных
+    :param key: Ключ
+    :param value: Значение
+    """
+    db.merge(AppState(key=key, value=value))
+    _commit(db)
+
+
+def add_outbox_entry(db: Session, video_id: str, deleted_reason: str | None) -> None:
+    """Ставит уведомление о недоступном видео в очередь отправки.
+
+    Если уведомление для этого видео уже в очереди, оно не меняется,
+    чтобы не потерять прогресс его отправки.
+    Запрос выполняется сразу, поэтому запись не откладывается batched_commits:
+    иначе открытая транзакция держала бы блокировку базы до конца пачки.
+
+    :param db: Сессия базы данных
+    :param video_id: ID видео
+    :param deleted_reason: Причина недоступности видео
+    """
+    db.execute(
+        insert(OutboxEntry)
+        .values(
+            video_id=video_id,
+            deleted_reason=deleted_reason,
+            sent_parts=0,
+            attempts=0,
+            next_attempt_at=datetime.now(),
+            created_at=datetime.now(),
+        )
+        .on_conflict_do_nothing(index_elements=[OutboxEntry.video_id])
+    )
+    commit(db)
+
+
+def delete_outbox_entries(db: Session, video_ids: list[str]) -> int:
+    """Убирает из очереди уведомления для видео, которые снова доступны.
+
+    Как и add_outbox_entry, записывается сразу, не дожидаясь batched_commits.
+
+    :param db: Сессия базы данных
+    :param video_ids: ID видео
+    :return: Количество удалённых уведомлений
+    """
+    deleted = 0
+    for chunk in _chunks(video_ids):
+        deleted += db.execute(delete(OutboxEntry).where(OutboxEntry.video_id.in_(chunk))).rowcount
+    commit(db)
+    return deleted
+
+
+def get_due_outbox_entries(db: Session, now: datetime) -> list[OutboxEntry]:
+    """Получает уведомления, время отправки которых уже наступило.
+
+    :param db: Сессия базы данных
+    :param now: Текущее время
+    :return: Список записей очереди, от самых давно ожидающих
+    """
+    return list(
+        db.scalars(
+            select(OutboxEntry)
+            .where(OutboxEntry.next_attempt_at <= now)
+            .order_by(OutboxEntry.next_attempt_at, OutboxEntry.id)
+        )
+    )
@@ -1,13 +1,56 @@
+import logging
 from pathlib import Path
 
 from alembic import command
 from alembic import config as alembic_config
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
-from atp.settings import DATABASE_URL
+from atp.settings import (
+    DATABASE_URL,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+)
 
-engine = create_engine(DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+# PRAGMA, которые выставляются на каждое новое соединение
+SQLITE_PRAGMAS: dict[str, str | int] = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT,
+    "mmap_size": SQLITE_MMAP_SIZE,
+}
+
+# Значения PRAGMA synchronous в том виде, в котором их возвращает SQLite
+_SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+
+def _set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(engine: Engine) -> Engine:
+    """Подключает применение SQLITE_PRAGMAS к каждому новому соединению движка.
+
+    :param engine: Движок SQLAlchemy
+    :return: Тот же движок
+    """
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+# Планировщик и потоки работают каждый со своей сессией, поэтому держим небольшой пул
+# постоянных соединений: так сохраняется кэш страниц и mmap между задачами.
+# Если все соединения заняты, ждём освобождения не дольше pool_timeout секунд
+engine = configure_sqlite(create_engine(DATABASE_URL, pool_size=5, max_overflow=5, pool_timeout=30))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -20,6 +63,37 @@ def get_db_session() -> Session:
     return SessionLocal()
 
 
+def check_database_settings(db_engine: Engine = engine) -> dict[str, str | int]:
+    """Проверяет, какие настройки SQLite действительно применились, и пишет их в лог.
+
+    Например, WAL не работает на некоторых сетевых файловых системах,
+    и тогда SQLite молча остаётся в другом режиме.
+
+    :param db_engine: Движок SQLAlchemy
+    :return: Фактические значения PRAGMA
+    """
+    with db_engine.connect() as connection:
+        effective = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in SQLITE_PRAGMAS
+        }
+
+    logger.info(
+        "SQLite settings: %s", ", ".join(f"{name}={value}" for name, value in effective.items())
+    )
+
+    expected = {
+        "journal_mode": SQLITE_JOURNAL_MODE.lower(),
+        "synchronous": _SYNCHRONOUS_LEVELS.get(SQLITE_SYNCHRONOUS, SQLITE_SYNCHRONOUS),
+        "busy_timeout": SQLITE_BUSY_TIMEOUT,
+    }
+    for name, value in expected.items():
+        actual = effective[name]
+        if (actual.lower() if isinstance(actual, str) else actual) != value:
+            logger.warning("SQLite %s is %s, expected %s", name, actual, value)
+
+    return effective
+
+
 def run_migrations() -> None:
     """Запускает миграции Alembic до последней версии.
 
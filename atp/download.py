@@ -1,15 +1,57 @@
 import logging
+from concurrent.futures import as_completed
+
+from sqlalchemy.orm import Session
 
 from atp import crud
 from atp.check_availability import check_services_availability
 from atp.database import get_db_session
-from atp.models import VideoStatus
-from atp.settings import HOPE_MODE
-from atp.tiktok import download_video
+from atp.models import Video, VideoInfo, VideoStatus
+from atp.settings import DOWNLOAD_WORKERS, HOPE_MODE
+from atp.tiktok import YtDlpExecutor, close_ydl_pool, download_video
 
 logger = logging.getLogger(__name__)
 
 
+def _download(video: Video, index: int, total: int) -> VideoInfo | None:
+    """Скачивает видео в потоке пула.
+
+    :param video: Копия видео, не привязанная к сессии базы данных
+    :param index: Порядковый номер видео
+    :param total: Общее количество видео
+    :return: Результат download_video
+    """
+    logger.info("Downloading video %s/%s: %s", index, total, video.id)
+    return download_video(video)
+
+
+def _save_result(db: Session, video: Video, result: VideoInfo) -> bool:
+    """Сохраняет результат скачивания видео в базу данных.
+
+    :param db: Сессия базы данных
+    :param video: Объект видео
+    :param result: Результат скачивания
+    :return: True если видео успешно скачано
+    """
+    success = not result.deleted_reason
+    status = VideoStatus.SUCCESS if success else VideoStatus.FAILED
+    crud.update_video(
+        db,
+        video=video,
+        status=status,
+        name=result.name,
+        author=result.author,
+        type=result.type,
+        deleted_reason=result.deleted_reason,
+    )
+
+    if success:
+        logger.info("Successfully downloaded video %s", video.id)
+    else:
+        logger.warning("Failed to download video %s", video.id)
+    return success
+
+
 def download_new_videos() -> None:
     """Скачивает новые видео TikTok"""
     db = get_db_session()
@@ -18,40 +60,39 @@ def download_new_videos() -> None:
         if not check_services_availability():
             return
 
-        videos = crud.get_videos(db, status=[VideoStatus.NEW])
+        # Файл экспорта читается потоково, поэтому порядок добавления в базу не хронологический
+        videos = crud.get_videos(db, status=[VideoStatus.NEW], order_by=Video.date)
         if HOPE_MODE:
             logger.info(
                 "HOPE_MODE is enabled, will try to download failed videos. This may take a while."
             )
-            videos.extend(crud.get_videos(db, status=[VideoStatus.FAILED]))
+            videos.extend(crud.get_videos(db, status=[VideoStatus.FAILED], order_by=Video.date))
         if not videos:
             return
 
         logger.info("Found %s new%s videos", len(videos), " or failed" if HOPE_MODE else "")
 
+        # Скачиваем в DOWNLOAD_WORKERS потоков, а в базу пишем только из текущего,
+        # чтобы не устраивать конкуренцию за SQLite и не делить сессию между потоками.
+        # В потоки передаём копии видео: ORM объекты после commit перечитываются из сессии
         success_count = 0
-        for i, video in enumerate(videos):
-            logger.info("Downloading video %s/%s: %s", i + 1, len(videos), video.id)
-
-            if not (result := download_video(video)):
-                continue
-            success = not result.deleted_reason
-            status = VideoStatus.SUCCESS if success else VideoStatus.FAILED
-            crud.update_video(
-                db,
-                video=video,
-                status=status,
-                name=result.name,
-                author=result.author,
-                type=result.type,
-                deleted_reason=result.deleted_reason,
-            )
-
-            if success:
-                success_count += 1
-                logger.info("Successfully downloaded video %s", video.id)
-            else:
-                logger.warning("Failed to download video %s", video.id)
+        executor = YtDlpExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="download")
+        try:
+            futures = {
+                executor.submit(
+                    _download, Video(id=video.id, status=video.status), i + 1, len(videos)
+                ): video
+                for i, video in enumerate(videos)
+            }
+            # Статус пишется только после того, как файл скачан, а commit-ы идут пачками
+            with crud.batched_commits(db):
+                for future in as_completed(futures):
+                    if not (result := future.result()):
+                        continue
+                    if _save_result(db, futures[future], result):
+                        success_count += 1
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
         logger.info("Downloaded %s/%s videos", success_count, len(videos))
         if new_left := crud.get_videos(db, status=[VideoStatus.NEW]):
@@ -62,6 +103,8 @@ def download_new_videos() -> None:
     except Exception as e:
         logger.exception("Error downloading videos: %s", e)
     finally:
+        # Экземпляры YoutubeDL этого потока (проверка доступности) сохраняют cookies при закрытии
+        close_ydl_pool()
         db.close()
 
 
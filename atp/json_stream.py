@@ -0,0 +1,168 @@
+"""
+Потоковое чтение JSON
+
+Позволяет пройти по большому JSON-файлу, разбирая только нужные поддеревья,
+а остальные значения пропуская без загрузки в память.
+Память ограничена размером буфера и самым большим разбираемым значением.
+"""
+
+import json
+import re
+from collections.abc import Iterator
+from typing import Any, TextIO
+
+# Сколько символов читать из файла за раз
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_BODY = re.compile(r'[^"\\]*')
+# Всё, кроме скобок, вместе с целыми строками (строки могут содержать скобки)
+_CONTAINER_BODY = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_SCALAR = re.compile(r"[^,}\]\s]*")
+
+
+class JsonStream:
+    """Потоковый читатель JSON.
+
+    Методы iter_object и iter_array возвращают управление на каждом ключе/элементе,
+    после чего вызывающий код обязан прочитать значение одним из методов:
+    read_value, skip_value, iter_object или iter_array.
+
+    :ivar file: Текстовый файл с JSON
+    :ivar chunk_size: Сколько символов читать из файла за раз
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._mark: int | None = None
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Дочитывает файл в буфер, отбрасывая уже разобранную часть.
+
+        :return: False, если файл закончился
+        """
+        if self._eof:
+            return False
+        start = self._pos if self._mark is None else self._mark
+        data = self.file.read(self.chunk_size)
+        self._buffer = self._buffer[start:] + data
+        self._pos -= start
+        if self._mark is not None:
+            self._mark = 0
+        if not data:
+            self._eof = True
+        return bool(data)
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def peek(self) -> str:
+        """Пропускает пробелы и возвращает следующий символ, не забирая его"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f"Expecting {char!r}")
+        self._pos += 1
+
+    def _scan(self, pattern: re.Pattern) -> str:
+        """Продвигается по символам, подходящим под pattern, и возвращает следующий символ"""
+        while True:
+            self._pos = pattern.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _skip_string(self) -> None:
+        self._expect('"')
+        while True:
+            char = self._scan(_STRING_BODY)
+            if char == '"':
+                self._pos += 1
+                return
+            if char == "\\":
+                # Экранированный символ может оказаться в следующем куске файла
+                if self._pos + 1 >= len(self._buffer) and not self._fill():
+                    raise self._error("Unterminated string")
+                self._pos += 2
+            else:
+                raise self._error("Unterminated string")
+
+    def _skip_container(self) -> None:
+        depth = 0
+        while True:
+            char = self._scan(_CONTAINER_BODY)
+            if char == '"':
+                # Строка не поместилась в буфер целиком
+                self._skip_string()
+                continue
+            if not char:
+                raise self._error("Unterminated object or array")
+            self._pos += 1
+            depth += 1 if char in "{[" else -1
+            if depth == 0:
+                return
+
+    def skip_value(self) -> None:
+        """Пропускает следующее значение, не разбирая его"""
+        char = self.peek()
+        if char == '"':
+            self._skip_string()
+        elif char in ("{", "["):
+            self._skip_container()
+        elif char:
+            self._scan(_SCALAR)
+        else:
+            raise self._error("Expecting value")
+
+    def read_value(self) -> Any:
+        """Читает и разбирает следующее значение целиком"""
+        self.peek()
+        self._mark = self._pos
+        try:
+            self.skip_value()
+            return json.loads(self._buffer[self._mark : self._pos])
+        finally:
+            self._mark = None
+
+    def iter_object(self) -> Iterator[str]:
+        """Проходит по ключам объекта. Значение каждого ключа нужно прочитать до следующего"""
+        self._expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise self._error("Expecting property name")
+            self._expect(":")
+            yield key
+            if self.peek() == "}":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def iter_array(self) -> Iterator[int]:
+        """Проходит по элементам массива. Каждый элемент нужно прочитать до следующего"""
+        self._expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == "]":
+                self._pos += 1
+                return
+            self._expect(",")
@@ -1,18 +1,42 @@
 import io
+import itertools
 import logging
 import os
 import random
 import shutil
+import tempfile
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
 from pathlib import Path
 
 import ffmpeg
 
 from atp import settings
-from atp.settings import DOWNLOADS_DIR, PARTS_TMP_DIR, SLIDESHOW_TMP_DIR
+from atp.settings import DOWNLOADS_DIR, WORKSPACES_DIR
 
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def workspace(video_id: str) -> Iterator[Path]:
+    """Создаёт временную рабочую директорию для обработки одного видео.
+
+    У каждой задачи своя директория, поэтому несколько видео можно обрабатывать
+    одновременно. Директория удаляется вместе со всем содержимым при выходе из контекста.
+
+    :param video_id: ID видео, используется как префикс имени директории
+    :return: Путь к рабочей директории
+    """
+    path = Path(tempfile.mkdtemp(prefix=f"{video_id}_", dir=WORKSPACES_DIR))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
 def _ffmpeg_stderr_message(error: ffmpeg.Error) -> str:
     if isinstance(error.stderr, bytes):
         return error.stderr.decode("utf-8", errors="replace")
@@ -44,19 +68,132 @@ def _slide_duration(
     return slide_duration
 
 
+# Размер кадра слайдшоу
+SLIDE_WIDTH = 1080
+SLIDE_HEIGHT = 1920
+# Частота кадров concat-рендера: кадры статичны, поэтому много кадров не нужно
+CONCAT_FRAMERATE = 5
+
+
+def _fit_to_frame(stream):
+    return stream.filter(
+        "scale", SLIDE_WIDTH, SLIDE_HEIGHT, force_original_aspect_ratio="decrease"
+    ).filter("pad", SLIDE_WIDTH, SLIDE_HEIGHT, "(ow-iw)/2", "(oh-ih)/2")
+
+
 def _prepare_slide(path: Path, duration: float):
     return (
-        ffmpeg.input(str(path), loop=1, t=duration, framerate=30)
-        .filter("scale", 1080, 1920, force_original_aspect_ratio="decrease")
-        .filter("pad", 1080, 1920, "(ow-iw)/2", "(oh-ih)/2")
+        _fit_to_frame(ffmpeg.input(str(path), loop=1, t=duration, framerate=30))
         .filter("format", "yuv420p")
         .filter("setsar", 1)
     )
 
 
-def render_slideshow(video_id: str) -> bool:
-    """Рендерит слайдшоу из изображений и аудио"""
-    image_files: list[str] = [f for f in os.listdir(SLIDESHOW_TMP_DIR) if f.endswith(".jpg")]
+def _render_filtergraph(
+    image_paths: list[Path], durations: list[float], audio_path: Path, output_path: Path
+) -> None:
+    """Рендерит слайдшоу одним графом фильтров: по входу и цепочке фильтров на изображение"""
+    slides = [
+        _prepare_slide(path, duration)
+        for path, duration in zip(image_paths, durations, strict=True)
+    ]
+    video = ffmpeg.concat(*slides, v=1, a=0)
+    (
+        ffmpeg.output(
+            video,
+            ffmpeg.input(str(audio_path)),
+            str(output_path),
+            g=900,
+            acodec="aac",
+            vcodec="libx264",
+            tune="stillimage",
+            t=sum(durations),
+            loglevel="error",
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+def _prepare_still(image_path: Path, stills_dir: Path) -> Path:
+    """Масштабирует изображение под кадр один раз и сохраняет готовый кадр
+
+    :param image_path: Исходное изображение
+    :param stills_dir: Директория готовых кадров
+    :return: Путь к кадру, уже готовый кадр переиспользуется
+    """
+    still_path = stills_dir / f"{image_path.stem}.png"
+    if not still_path.exists():
+        (
+            _fit_to_frame(ffmpeg.input(str(image_path)))
+            .filter("setsar", 1)
+            .output(str(still_path), vframes=1, loglevel="error")
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    return still_path
+
+
+def _concat_entry(path: Path) -> str:
+    escaped = str(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def _write_concat_list(stills: list[Path], durations: list[float], list_path: Path) -> None:
+    """Записывает список для concat demuxer с длительностью каждого кадра"""
+    with open(list_path, "w") as file:
+        file.write("ffconcat version 1.0\n")
+        for still, duration in zip(stills, durations, strict=True):
+            file.write(_concat_entry(still))
+            file.write(f"duration {duration:.3f}\n")
+        # Длительность последней записи concat demuxer учитывает, только если за ней есть ещё одна
+        file.write(_concat_entry(stills[-1]))
+
+
+def _render_concat(
+    image_paths: list[Path], durations: list[float], audio_path: Path, output_path: Path
+) -> None:
+    """Рендерит слайдшоу из готовых кадров через concat demuxer с низкой частотой кадров"""
+    stills_dir = output_path.parent / "stills"
+    stills_dir.mkdir(exist_ok=True)
+    stills = [_prepare_still(path, stills_dir) for path in image_paths]
+
+    list_path = output_path.parent / "slides.ffconcat"
+    _write_concat_list(stills, durations, list_path)
+
+    (
+        ffmpeg.output(
+            ffmpeg.input(str(list_path), f="concat", safe=0),
+            ffmpeg.input(str(audio_path)),
+            str(output_path),
+            r=CONCAT_FRAMERATE,
+            g=CONCAT_FRAMERATE * 30,
+            pix_fmt="yuv420p",
+            acodec="aac",
+            vcodec="libx264",
+            tune="stillimage",
+            t=sum(durations),
+            loglevel="error",
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+SLIDESHOW_RENDERERS = {
+    "filter": _render_filtergraph,
+    "concat": _render_concat,
+}
+
+
+def render_slideshow(video_id: str, slideshow_dir: Path, renderer: str | None = None) -> bool:
+    """Рендерит слайдшоу из изображений и аудио
+
+    :param video_id: ID видео
+    :param slideshow_dir: Директория с изображениями и аудио слайдшоу
+    :param renderer: Способ рендера из SLIDESHOW_RENDERERS, по умолчанию SLIDESHOW_RENDERER
+    """
+    image_files: list[str] = [f for f in os.listdir(slideshow_dir) if f.endswith(".jpg")]
     image_files.sort(key=lambda f: int(os.path.splitext(f)[0]))
     image_count = len(image_files)
 
@@ -64,7 +201,7 @@ def render_slideshow(video_id: str) -> bool:
         logger.error("No images were found")
         return False
 
-    audio_path = Path(SLIDESHOW_TMP_DIR) / "audio.mp3"
+    audio_path = slideshow_dir / "audio.mp3"
     sound_len = _probe_duration(audio_path)
     if sound_len is None:
         # Звук скорее всего недоступен, попробуйте скачать видео заново
@@ -78,40 +215,28 @@ def render_slideshow(video_id: str) -> bool:
     total_video_len = max(slideshow_len, sound_len)
     hold_last_frame = total_video_len - slideshow_len
 
-    slides = [
-        _prepare_slide(
-            SLIDESHOW_TMP_DIR / name,
-            _slide_duration(index, image_count, t, hold_last_frame),
-        )
-        for index, name in enumerate(image_files)
+    durations = [
+        _slide_duration(index, image_count, t, hold_last_frame) for index in range(image_count)
     ]
-    video = ffmpeg.concat(*slides, v=1, a=0)
+    renderer = renderer or settings.SLIDESHOW_RENDERER
+    render = SLIDESHOW_RENDERERS.get(renderer)
+    if render is None:
+        logger.warning("Unknown slideshow renderer %s, using filter", renderer)
+        render = _render_filtergraph
 
     logger.info("Rendering slideshow: %d images, %d seconds total", image_count, total_video_len)
 
+    output_file_path = slideshow_dir / "output.mp4"
     try:
-        (
-            ffmpeg.output(
-                video,
-                ffmpeg.input(str(audio_path)),
-                str(SLIDESHOW_TMP_DIR / "output.mp4"),
-                g=900,
-                acodec="aac",
-                vcodec="libx264",
-                tune="stillimage",
-                t=total_video_len,
-                loglevel="error",
-            )
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
+        render(
+            [slideshow_dir / name for name in image_files], durations, audio_path, output_file_path
         )
     except ffmpeg.Error as e:
         logger.error("Error rendering slideshow: %s", _ffmpeg_stderr_message(e))
         return False
 
-    if (Path(SLIDESHOW_TMP_DIR) / "output.mp4").exists():
+    if output_file_path.exists():
         # Копирование результата в директорию загрузок
-        output_file_path = Path(SLIDESHOW_TMP_DIR) / "output.mp4"
         target_path = Path(DOWNLOADS_DIR) / f"{video_id}.mp4"
         shutil.copy(output_file_path, target_path)
         logger.info("Slideshow saved: %s.mp4", video_id)
@@ -131,57 +256,362 @@ def generate_bmp(seed: int | str) -> io.BytesIO:
     return io.BytesIO(bmp_data)
 
 
-def split_video(video_path: Path, parts: int) -> list[Path]:
+def _available_cores() -> int:
+    """Количество ядер, доступных процессу (с учётом ограничений контейнера)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Доля лимита Telegram, на которую рассчитывается битрейт части
+INITIAL_BITRATE_COEF = 0.95
+# Длительность пробного фрагмента для оценки размера части
+SAMPLE_DURATION = 10.0
+# Максимальное количество полных кодирований одной части
+MAX_ENCODE_ATTEMPTS = 4
+
+# Метрика: сколько полных кодирований понадобилось части -> количество таких частей
+# Части, так и не поместившиеся в лимит, не учитываются
+encode_attempts: Counter[int] = Counter()
+_encode_attempts_lock = threading.Lock()
+
+
+def _record_encode_attempts(attempts: int) -> None:
+    with _encode_attempts_lock:
+        encode_attempts[attempts] += 1
+
+
+def _log_encode_attempts() -> None:
+    """Пишет в лог накопленную с запуска метрику encode_attempts"""
+    with _encode_attempts_lock:
+        summary = ", ".join(
+            f"{attempts}: {count}" for attempts, count in sorted(encode_attempts.items())
+        )
+    if summary:
+        logger.info("Full encodes per part since start (attempts: parts): %s", summary)
+
+
+def _part_bitrate_k(part_duration: float, bitrate_coef: float) -> int:
+    """Битрейт видео в кбит/с, чтобы часть заняла bitrate_coef от лимита Telegram"""
+    max_bits = int(settings.TELEGRAM_MAX_VIDEO_SIZE * bitrate_coef) * 8
+    total_bitrate = int(max_bits / part_duration)
+
+    audio_bitrate = 64_000
+    return max(total_bitrate - audio_bitrate, 200_000) // 1000
+
+
+def _encode_segment(
+    video_path: Path,
+    start_time: float,
+    duration: float,
+    output_path: Path,
+    video_bitrate_k: int,
+    threads: int,
+) -> int:
+    """Кодирует фрагмент видео с заданным битрейтом и возвращает размер результата"""
+    (
+        ffmpeg.input(str(video_path), ss=f"{start_time:.3f}", t=f"{duration:.3f}")
+        .output(
+            str(output_path),
+            vcodec="libx265",
+            acodec="copy",
+            movflags="+faststart",
+            **{
+                "b:v": f"{video_bitrate_k}k",
+                "maxrate": f"{video_bitrate_k}k",
+                "bufsize": f"{video_bitrate_k * 2}k",
+                # Части кодируются параллельно, делим ядра между ними
+                "x265-params": f"pools={threads}",
+            },
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return get_file_size(output_path)
+
+
+def _estimate_bitrate_coef(
+    video_path: Path, start_time: float, part_duration: float, output_path: Path, threads: int
+) -> float:
+    """Подбирает коэффициент битрейта по пробному фрагменту из середины части
+
+    Кодировщик может превышать заданный битрейт (а звук копируется как есть),
+    поэтому размер части предсказывается по размеру короткого фрагмента.
+    Короткие части кодируются быстро, для них проба не делается.
+
+    :return: Коэффициент битрейта для первого кодирования части
+    """
+    bitrate_coef = INITIAL_BITRATE_COEF
+    if part_duration < SAMPLE_DURATION * 3:
+        return bitrate_coef
+
+    sample_path = output_path.with_name(f"{output_path.stem}_sample{output_path.suffix}")
+    sample_start = start_time + (part_duration - SAMPLE_DURATION) / 2
+    try:
+        sample_size = _encode_segment(
+            video_path,
+            sample_start,
+            SAMPLE_DURATION,
+            sample_path,
+            _part_bitrate_k(part_duration, bitrate_coef),
+            threads,
+        )
+    finally:
+        sample_path.unlink(missing_ok=True)
+
+    predicted_size = sample_size * part_duration / SAMPLE_DURATION
+    target_size = settings.TELEGRAM_MAX_VIDEO_SIZE * bitrate_coef
+    logger.debug("Predicted part size: %d bytes, target: %d bytes", predicted_size, target_size)
+    if predicted_size > target_size:
+        bitrate_coef *= target_size / predicted_size
+    return bitrate_coef
+
+
+def _encode_part(
+    video_path: Path,
+    index: int,
+    parts: int,
+    start_time: float,
+    part_duration: float,
+    output_path: Path,
+    threads: int,
+) -> bool:
+    """Кодирует одну часть видео так, чтобы она поместилась в лимит Telegram
+
+    Битрейт подбирается по пробному фрагменту, а при промахе снижается
+    пропорционально превышению размера.
+
+    :param video_path: Путь к видео
+    :param index: Номер части, начиная с 0
+    :param parts: Количество частей
+    :param start_time: Начало части
+    :param part_duration: Длительность части
+    :param output_path: Куда сохранить часть
+    :param threads: Количество потоков кодировщика
+    :return: Поместилась ли часть в лимит
+    """
+    logger.info("Rendering %s/%s part", index + 1, parts)
+    bitrate_coef = _estimate_bitrate_coef(
+        video_path, start_time, part_duration, output_path, threads
+    )
+    for attempt in range(1, MAX_ENCODE_ATTEMPTS + 1):
+        video_len = _encode_segment(
+            video_path,
+            start_time,
+            part_duration,
+            output_path,
+            _part_bitrate_k(part_duration, bitrate_coef),
+            threads,
+        )
+        if video_len <= settings.TELEGRAM_MAX_VIDEO_SIZE:
+            _record_encode_attempts(attempt)
+            logger.info("Part %s/%s encoded in %s attempt(s)", index + 1, parts, attempt)
+            return True
+        bitrate_coef *= settings.TELEGRAM_MAX_VIDEO_SIZE / video_len * INITIAL_BITRATE_COEF
+        logger.warning("Video is too large: %s bytes. Trying again with lower bitrate.", video_len)
+
+    logger.error("Part %s/%s does not fit after %s attempts", index + 1, parts, MAX_ENCODE_ATTEMPTS)
+    return False
+
+
+def _probe_keyframes(video_path: Path) -> tuple[list[tuple[float, int]], int]:
+    """Находит ключевые кадры видео по списку пакетов, не декодируя кадры
+
+    :param video_path: Путь к видео
+    :return: Список (время ключевого кадра, сколько байт пакетов до него) и размер всех пакетов
+    """
+    probe = ffmpeg.probe(str(video_path), show_entries="packet=stream_index,pts_time,size,flags")
+    video_streams = {
+        stream["index"] for stream in probe.get("streams", []) if stream["codec_type"] == "video"
+    }
+    packets = sorted(
+        (
+            float(packet["pts_time"]),
+            int(packet.get("size", 0)),
+            packet["stream_index"] in video_streams and "K" in packet.get("flags", ""),
+        )
+        for packet in probe.get("packets", [])
+        if packet.get("pts_time", "N/A") != "N/A"
+    )
+
+    keyframes = []
+    offset = 0
+    for time, size, is_keyframe in packets:
+        if is_keyframe:
+            keyframes.append((time, offset))
+        offset += size
+    return keyframes, offset
+
+
+def _copy_cut_points(
+    keyframes: list[tuple[float, int]], total_size: int, parts: int
+) -> list[float]:
+    """Выбирает ключевые кадры, делящие видео на части примерно одинакового размера
+
+    Точки, попавшие на уже выбранный ключевой кадр, пропускаются, поэтому точек
+    может быть меньше parts - 1.
+    """
+    cuts: list[float] = []
+    for i in range(1, parts):
+        target = total_size * i / parts
+        time, _ = min(keyframes, key=lambda keyframe: abs(keyframe[1] - target))
+        if time > 0 and (not cuts or time > cuts[-1]):
+            cuts.append(time)
+    return cuts
+
+
+def _copy_segments(
+    video_path: Path, parts: int, total_duration: float, work_dir: Path
+) -> list[tuple[float, float, Path]]:
+    """Режет видео на части по ключевым кадрам без перекодирования
+
+    :param video_path: Путь к видео
+    :param parts: Желаемое количество частей
+    :param total_duration: Длительность видео
+    :param work_dir: Рабочая директория задачи, куда сохраняются части
+    :return: Части (начало, длительность, путь), их может быть меньше parts,
+        или пустой список, если резать нужно кодированием
+    """
+    try:
+        keyframes, total_size = _probe_keyframes(video_path)
+    except ffmpeg.Error as e:
+        logger.warning("Error probing keyframes: %s", _ffmpeg_stderr_message(e))
+        return []
+
+    cuts = _copy_cut_points(keyframes, total_size, parts) if keyframes else []
+    if not cuts:
+        return []
+    if len(cuts) + 1 < parts:
+        logger.info(
+            "Too few keyframes, splitting into %s parts instead of %s", len(cuts) + 1, parts
+        )
+
+    bounds = [0.0, *cuts, total_duration]
+    segments = [
+        (start, end - start, work_dir / f"{video_path.stem}_part{i + 1}.mp4")
+        for i, (start, end) in enumerate(itertools.pairwise(bounds))
+    ]
+    try:
+        (
+            ffmpeg.input(str(video_path))
+            .output(
+                str(work_dir / f"{video_path.stem}_part%d.mp4"),
+                c="copy",
+                f="segment",
+                # Сегмент начинается с первого ключевого кадра после указанного времени
+                segment_times=",".join(f"{cut - 0.001:.6f}" for cut in cuts),
+                segment_start_number=1,
+                reset_timestamps=1,
+                segment_format_options="movflags=+faststart",
+                loglevel="error",
+            )
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        logger.warning("Error splitting video without re-encoding: %s", _ffmpeg_stderr_message(e))
+        for _, _, path in segments:
+            path.unlink(missing_ok=True)
+        return []
+
+    if not all(path.exists() for _, _, path in segments):
+        logger.warning("Stream copy produced unexpected parts, falling back to re-encoding")
+        for path in work_dir.glob(f"{video_path.stem}_part*.mp4"):
+            path.unlink()
+        return []
+    return segments
+
+
+def _encode_parts(
+    video_path: Path, segments: list[tuple[float, float, Path]], indexes: list[int]
+) -> dict[int, bool]:
+    """Кодирует выбранные части параллельно в SPLIT_WORKERS потоков (по умолчанию по числу ядер)
+
+    :param video_path: Путь к видео
+    :param segments: Все части (начало, длительность, путь)
+    :param indexes: Номера частей, которые нужно закодировать
+    :return: Номер части -> поместилась ли она в лимит
+    """
+    if not indexes:
+        return {}
+
+    cores = _available_cores()
+    workers = max(1, min(len(indexes), settings.SPLIT_WORKERS or cores))
+    threads = max(1, cores // workers)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="split") as pool:
+        futures = {
+            pool.submit(_encode_part, video_path, i, len(segments), *segments[i], threads): i
+            for i in indexes
+        }
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except ffmpeg.Error:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            raise
+    return {i: future.result() for future, i in futures.items()}
+
+
+def split_video(video_path: Path, parts: int, work_dir: Path) -> list[Path]:
+    """Разбивает видео на части, которые помещаются в лимит Telegram
+
+    Сначала видео режется по ключевым кадрам без перекодирования (SPLIT_STREAM_COPY),
+    перекодируются только части, которые всё равно не поместились в лимит.
+    Если несколько точек разреза попали на один ключевой кадр, частей получается меньше,
+    чем запрошено, поэтому количество частей нужно брать из результата, а не из parts.
+
+    :param video_path: Путь к видео
+    :param parts: Желаемое количество частей
+    :param work_dir: Рабочая директория задачи, куда сохраняются части
+    :return: Список путей ко всем частям видео по порядку
+        или пустой список при ошибке, в том числе если какая-то часть не поместилась в лимит
+    """
     total_duration = _probe_duration(video_path)
     if total_duration is None:
         return []
 
-    part_duration = total_duration / parts
-
-    output_paths = []
-    for i in range(parts):
-        logger.info("Rendering %s/%s part", i + 1, parts)
-        start_time = i * part_duration
-        output_path = PARTS_TMP_DIR / f"{video_path.stem}_part{i + 1}.mp4"
-        bitrate_coef = 0.95
-        while bitrate_coef > 0.5:
-            max_bits = int(settings.TELEGRAM_MAX_VIDEO_SIZE * bitrate_coef) * 8
-            total_bitrate = int(max_bits / part_duration)
-
-            audio_bitrate = 64_000
-            video_bitrate_k = max(total_bitrate - audio_bitrate, 200_000) // 1000
-
-            try:
-                (
-                    ffmpeg.input(str(video_path), ss=f"{start_time:.3f}", t=f"{part_duration:.3f}")
-                    .output(
-                        str(output_path),
-                        vcodec="libx265",
-                        acodec="copy",
-                        movflags="+faststart",
-                        **{
-                            "b:v": f"{video_bitrate_k}k",
-                            "maxrate": f"{video_bitrate_k}k",
-                            "bufsize": f"{video_bitrate_k * 2}k",
-                        },
-                    )
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True)
-                )
-            except ffmpeg.Error:
-                temp_files_cleanup()
-                return []
-            video_len = get_file_size(output_path)
-            if video_len > settings.TELEGRAM_MAX_VIDEO_SIZE:
-                bitrate_coef -= 0.05
-                logger.warning(
-                    "Video is too large: %s bytes. Trying again with lower bitrate.", video_len
-                )
-                continue
-            output_paths.append(output_path)
-            break
-
-    return output_paths
+    segments = []
+    if settings.SPLIT_STREAM_COPY:
+        segments = _copy_segments(video_path, parts, total_duration, work_dir)
+    if segments:
+        oversized = [
+            i
+            for i, (_, _, path) in enumerate(segments)
+            if get_file_size(path) > settings.TELEGRAM_MAX_VIDEO_SIZE
+        ]
+        logger.info(
+            "Video split by keyframes, %s of %s parts need re-encoding",
+            len(oversized),
+            len(segments),
+        )
+    else:
+        part_duration = total_duration / parts
+        segments = [
+            (i * part_duration, part_duration, work_dir / f"{video_path.stem}_part{i + 1}.mp4")
+            for i in range(parts)
+        ]
+        oversized = list(range(parts))
+
+    try:
+        encoded = _encode_parts(video_path, segments, oversized)
+    except ffmpeg.Error as e:
+        logger.error("Error splitting video: %s", _ffmpeg_stderr_message(e))
+        for _, _, path in segments:
+            path.unlink(missing_ok=True)
+        return []
+
+    if oversized:
+        _log_encode_attempts()
+    if not all(encoded.values()):
+        # Без одной из частей видео отправится неполным
+        logger.error("Some parts of the video do not fit the Telegram limit")
+        for _, _, path in segments:
+            path.unlink(missing_ok=True)
+        return []
+    return [path for _, _, path in segments]
 
 
 def get_file_size(file_path: Path) -> int:
@@ -190,9 +620,15 @@ def get_file_size(file_path: Path) -> int:
 
 
 def temp_files_cleanup() -> None:
-    for dir in [SLIDESHOW_TMP_DIR, PARTS_TMP_DIR]:
-        for file in dir.iterdir():
-            try:
-                os.remove(file)
-            except Exception as e:
-                logger.warning("Error deleting %s: %s", file, e)
+    """Удаляет рабочие директории, оставшиеся после аварийного завершения.
+
+    Вызывается при запуске, пока ни одна задача ещё не создала свою директорию.
+    """
+    for path in WORKSPACES_DIR.iterdir():
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except Exception as e:
+            logger.warning("Error deleting %s: %s", path, e)
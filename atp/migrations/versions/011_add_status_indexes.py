@@ -0,0 +1,25 @@
+"""add status indexes
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_videos_status_last_checked", "videos", ["status", "last_checked"])
+    op.create_index("ix_videos_status_date", "videos", ["status", "date"])
+
+
+def downgrade():
+    op.drop_index("ix_videos_status_date", table_name="videos")
+    op.drop_index("ix_videos_status_last_checked", table_name="videos")
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String
 
 from atp.database import Base
 
@@ -46,6 +46,12 @@ class Video(Base):
     """
 
     __tablename__ = "videos"
+    __table_args__ = (
+        # Выборка видео для проверки доступности (самые давно проверенные)
+        Index("ix_videos_status_last_checked", "status", "last_checked"),
+        # Выборка последних видео для проверки доступности сервисов
+        Index("ix_videos_status_date", "status", "date"),
+    )
 
     id: str = Column(String, primary_key=True)
     name: str | None = Column(String, nullable=True)
@@ -66,3 +72,60 @@ class Video(Base):
         :return: Строка с основными параметрами видео
         """
         return f"<Video(id={self.id}, status={self.status})>"
+
+
+class AppState(Base):
+    """Служебное состояние приложения в формате ключ-значение.
+
+    :ivar key: Ключ
+    :ivar value: Значение (обычно JSON)
+    :ivar updated_at: Дата последнего изменения
+    """
+
+    __tablename__ = "app_state"
+
+    key: str = Column(String, primary_key=True)
+    value: str = Column(String, nullable=False)
+    updated_at: datetime = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(), onupdate=lambda: datetime.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<AppState(key={self.key})>"
+
+
+class OutboxEntry(Base):
+    """Уведомление о недоступном видео, ожидающее отправки в Telegram.
+
+    Запись хранит прогресс отправки, поэтому после ошибки или перезапуска
+    отправка продолжается с того же места, а части видео не рендерятся заново.
+
+    :ivar id: Идентификатор записи
+    :ivar video_id: ID недоступного видео
+    :ivar deleted_reason: Причина недоступности видео
+    :ivar source: Ключ кэша частей, если видео пришлось разбить
+    :ivar message_ids: ID уже отправленных сообщений (JSON список)
+    :ivar sent_parts: Количество заглушек, уже заменённых на части видео
+    :ivar attempts: Количество неудачных попыток отправки подряд
+    :ivar next_attempt_at: Время следующей попытки отправки
+    :ivar last_error: Текст последней ошибки
+    :ivar created_at: Дата создания записи
+    """
+
+    __tablename__ = "outbox"
+
+    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    video_id: str = Column(String, nullable=False, unique=True)
+    deleted_reason: str | None = Column(String, nullable=True)
+    source: str | None = Column(String, nullable=True)
+    message_ids: str | None = Column(String, nullable=True)
+    sent_parts: int = Column(Integer, nullable=False, default=0)
+    attempts: int = Column(Integer, nullable=False, default=0)
+    next_attempt_at: datetime = Column(
+        DateTime, nullable=False, index=True, default=lambda: datetime.now()
+    )
+    last_error: str | None = Column(String, nullable=True)
+    created_at: datetime = Column(DateTime, nullable=False, default=lambda: datetime.now())
+
+    def __repr__(self) -> str:
+        return f"<OutboxEntry(video_id={self.video_id}, attempts={self.attempts})>"
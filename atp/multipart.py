@@ -0,0 +1,116 @@
+"""
+Потоковое тело multipart/form-data
+
+requests при передаче files= собирает всё тело запроса в памяти.
+MultipartEncoder читает файлы по кускам во время отправки,
+поэтому загрузка видео на 50 МБ занимает в памяти только размер куска.
+"""
+
+import io
+import os
+import secrets
+from collections.abc import Iterator
+from typing import BinaryIO
+
+# Сколько байт читать из файла за раз
+CHUNK_SIZE = 64 * 1024
+
+
+def _remaining_size(file: BinaryIO) -> int:
+    """Сколько байт осталось прочитать из файла от текущей позиции"""
+    position = file.tell()
+    end = file.seek(0, io.SEEK_END)
+    file.seek(position)
+    return end - position
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "").replace("\n", "")
+
+
+class MultipartEncoder:
+    """Тело запроса multipart/form-data, читаемое из файлов по кускам.
+
+    Передаётся в requests как data= вместе с заголовком Content-Type из content_type.
+    Длина тела известна заранее, поэтому запрос уходит с Content-Length, а не chunked.
+    Файлы читаются с текущей позиции; вызов reset() позволяет отправить тело ещё раз.
+
+    :ivar fields: Текстовые поля формы
+    :ivar files: Файлы формы, открытые в бинарном режиме
+    :ivar content_type: Значение заголовка Content-Type
+    """
+
+    def __init__(
+        self,
+        fields: dict[str, object],
+        files: dict[str, BinaryIO],
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self.fields = fields
+        self.files = files
+        self.chunk_size = chunk_size
+        self.boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        # Части тела: байты заголовков/полей или (файл, начало, размер)
+        self._parts: list[bytes | tuple[BinaryIO, int, int]] = []
+        for name, value in fields.items():
+            self._parts.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"'
+                f"\r\n\r\n{value}\r\n".encode()
+            )
+        for name, file in files.items():
+            file_name = getattr(file, "name", None)
+            file_name = os.path.basename(file_name) if isinstance(file_name, str) else name
+            self._parts.append(
+                f"--{self.boundary}\r\nContent-Disposition: form-data; "
+                f'name="{_quote(name)}"; filename="{_quote(file_name)}"\r\n'
+                "Content-Type: application/octet-stream\r\n\r\n".encode()
+            )
+            self._parts.append((file, file.tell(), _remaining_size(file)))
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+
+        self._length = sum(
+            len(part) if isinstance(part, bytes) else part[2] for part in self._parts
+        )
+        self.reset()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _chunks(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            file, start, size = part
+            file.seek(start)
+            while size > 0:
+                data = file.read(min(self.chunk_size, size))
+                if not data:
+                    raise OSError(f"File {getattr(file, 'name', '')} was truncated during upload")
+                size -= len(data)
+                yield data
+
+    def reset(self) -> None:
+        """Перематывает тело в начало для повторной отправки"""
+        self._iterator = self._chunks()
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        """Читает следующие size байт тела (все оставшиеся, если size < 0)"""
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        while data := self.read(self.chunk_size):
+            yield data
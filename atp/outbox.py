@@ -0,0 +1,198 @@
+"""
+Очередь уведомлений о недоступных видео
+
+Проверка доступности только ставит уведомление в таблицу outbox,
+а отдельная задача планировщика (send_outbox) отправляет его в Telegram.
+Прогресс отправки (готовые части видео, отправленные сообщения, заменённые заглушки)
+записывается в базу после каждого шага, поэтому при ошибке отправка повторяется
+с паузой с того же места.
+Части большого видео берутся из кэша частей (part_cache) и не делаются заново.
+"""
+
+import json
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from atp import crud, settings
+from atp.database import get_db_session
+from atp.media import generate_bmp, get_file_size
+from atp.models import OutboxEntry, Video, VideoStatus
+from atp.part_cache import get_cached_parts, get_video_parts, key_parts
+from atp.telegram import edit_media, send_media
+
+logger = logging.getLogger(__name__)
+
+# Будит задачу отправки, когда в очереди появились новые уведомления
+sender_wakeup = threading.Event()
+
+
+def _get_caption(video: Video) -> str:
+    """Возвращает описание видео, ограничив его 1024 символами"""
+    MAX_LENGTH = 1024
+    author = video.author + "\n" if video.author else ""
+    cut_name = video.name or ""
+    total_length = len(author) + len(cut_name) + 11
+    if total_length > MAX_LENGTH:
+        diff = total_length - MAX_LENGTH
+        cut_name = cut_name[: -diff - 3] + "..."
+    caption = author + cut_name + "\n" + video.date.strftime("%d.%m.%Y")
+    return caption
+
+
+def _remove_entry(db: Session, entry: OutboxEntry) -> None:
+    db.delete(entry)
+    crud.commit(db)
+
+
+def _retry_delay(attempts: int) -> float:
+    """Пауза перед следующей попыткой: удваивается после каждой ошибки"""
+    return min(settings.OUTBOX_MAX_RETRY_DELAY, settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _prepare_parts(db: Session, entry: OutboxEntry, video_path: Path, video_len: int) -> list[Path]:
+    """Возвращает части видео из кэша частей, разбивая видео, только если их там нет.
+
+    :param db: Сессия базы данных
+    :param entry: Запись очереди
+    :param video_path: Путь к видео
+    :param video_len: Размер видео
+    :return: Список путей к частям по порядку
+    :raises RuntimeError: Если видео не удалось разбить
+    """
+    if entry.source:
+        # Видео уже разбивали: частей может быть меньше запрошенного,
+        # поэтому ищем их по сохранённому ключу, а не по количеству заглушек
+        if parts := get_cached_parts(entry.source, video_path):
+            return parts
+        count = key_parts(entry.source)
+    else:
+        count = math.ceil(video_len / (settings.TELEGRAM_MAX_VIDEO_SIZE * 0.9))
+        count = max(2, min(10, count))  # от 2 до 10 частей
+
+    parts = get_video_parts(entry.video_id, video_path, count)
+    if not parts:
+        raise RuntimeError("Failed to split video. This should never happen. Create a GitHub issue")
+
+    # Ключ кэша содержит хэш исходного файла: если он изменился, части другие
+    source = parts[0].parent.name
+    if entry.source != source:
+        entry.source = source
+        # Новые части ещё не отправлены, даже если старые уже заменили заглушки
+        entry.sent_parts = 0
+        crud.commit(db)
+    return parts
+
+
+def _send_parts(db: Session, entry: OutboxEntry, parts: list[Path], caption: str) -> None:
+    """У телеграма есть ограничение для ботов на размер видео в 50МБ
+    Поэтому если видео больше 50МБ, то его нужно разбить на части и отправить как медиа-группу
+    Только вот ограничение на самом деле распространяется не на каждое видео, на весь POST запрос
+    Поэтому нам приходится сначала отправить BMP заглушки,
+    а потом, по одному заменять их на реальные видео части.
+    """
+    if not entry.message_ids:
+        bmp_photos = [generate_bmp(str(part)) for part in parts]
+        result = send_media(caption=caption, photos=bmp_photos)
+        messages = result if isinstance(result, list) else [result]
+        entry.message_ids = json.dumps([msg["message_id"] for msg in messages])
+        crud.commit(db)
+
+    message_ids = json.loads(entry.message_ids)
+    for i in range(entry.sent_parts, len(parts)):
+        part_caption = caption if i == 0 else ""
+        # Темп задаёт клиент Telegram: лимит запросов в чат и паузы по ответам 429
+        with open(parts[i], "rb") as video_file:
+            if not edit_media(message_id=message_ids[i], caption=part_caption, video=video_file):
+                raise RuntimeError(f"Failed to replace placeholder with video part {i + 1}")
+        entry.sent_parts = i + 1
+        crud.commit(db)
+
+
+def _deliver(db: Session, entry: OutboxEntry) -> bool:
+    """Отправляет уведомление, продолжая с последнего записанного шага.
+
+    :param db: Сессия базы данных
+    :param entry: Запись очереди
+    :return: True если уведомление отправлено, False если оно больше не нужно
+    :raises Exception: При ошибке отправки, уже сделанные шаги сохранены
+    """
+    video = db.get(Video, entry.video_id)
+    if video is None or video.status != VideoStatus.SUCCESS:
+        logger.info("Video %s is no longer waiting for a notification", entry.video_id)
+        _remove_entry(db, entry)
+        return False
+
+    logger.info("Sending Telegram notification for video %s", video.id)
+    video_path = Path(settings.DOWNLOADS_DIR) / f"{video.id}.mp4"
+    if not video_path.exists():
+        # Без файла уведомление отправить нельзя, повторять бесполезно
+        logger.error("Video file not found: %s", video_path)
+        _remove_entry(db, entry)
+        return False
+
+    caption = _get_caption(video)
+    video_len = get_file_size(video_path)
+    if video_len > settings.TELEGRAM_MAX_VIDEO_SIZE:
+        parts = _prepare_parts(db, entry, video_path, video_len)
+        _send_parts(db, entry, parts, caption)
+    elif not entry.message_ids:
+        with open(video_path, "rb") as video_file:
+            result = send_media(caption=caption, video=video_file)
+        entry.message_ids = json.dumps([result["message_id"]])
+
+    video.message_id = json.loads(entry.message_ids)[0]
+    video.status = VideoStatus.DELETED
+    video.deleted_reason = entry.deleted_reason
+    # Видео и очередь меняются одной транзакцией, поэтому сообщение не отправится повторно
+    _remove_entry(db, entry)
+    logger.info("Telegram notification sent successfully.")
+    return True
+
+
+def send_outbox() -> int:
+    """Отправляет все уведомления, время отправки которых наступило.
+
+    Если отправка не удалась, уведомление откладывается на OUTBOX_RETRY_DELAY секунд,
+    и пауза удваивается после каждой следующей ошибки.
+
+    :return: Количество отправленных уведомлений
+    """
+    db = get_db_session()
+    sent = 0
+    try:
+        for entry in crud.get_due_outbox_entries(db, datetime.now()):
+            video_id = entry.video_id
+            try:
+                sent += _deliver(db, entry)
+            except StaleDataError:
+                # Проверка отменила уведомление, пока оно отправлялось: видео снова доступно
+                db.rollback()
+                logger.info("Notification for video %s was cancelled", video_id)
+            except Exception as e:
+                db.rollback()
+                entry.attempts += 1
+                entry.last_error = str(e)
+                entry.next_attempt_at = datetime.now() + timedelta(
+                    seconds=_retry_delay(entry.attempts)
+                )
+                crud.commit(db)
+                logger.exception(
+                    "Failed to send Telegram notification for video %s (attempt %s): %s",
+                    entry.video_id,
+                    entry.attempts,
+                    e,
+                )
+    finally:
+        db.close()
+    return sent
+
+
+def wake_outbox_sender() -> None:
+    """Просит задачу отправки проверить очередь, не дожидаясь OUTBOX_POLL_INTERVAL"""
+    sender_wakeup.set()
@@ -0,0 +1,151 @@
+"""
+Кэш частей больших видео
+
+Разбивка видео на части для Telegram может занимать минуты, поэтому готовые части
+сохраняются в PART_CACHE_DIR под ключом из хэша содержимого исходного файла,
+лимита размера части и количества частей. Повторная отправка (в том числе после
+перезапуска) берёт части из кэша. Кэш ограничен PART_CACHE_SIZE мегабайт:
+при переполнении удаляются давно не использованные записи.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from atp import settings
+from atp.media import split_video, workspace
+
+logger = logging.getLogger(__name__)
+
+# Сколько байт читать из файла за раз при подсчёте хэша
+HASH_CHUNK_SIZE = 1024 * 1024
+# Префикс директорий, в которые записываются ещё не готовые записи
+_TMP_PREFIX = ".tmp-"
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=128)
+def _file_hash(path: str, size: int, mtime_ns: int) -> str:  # noqa: ARG001
+    """SHA-256 содержимого файла. Размер и время изменения входят в ключ lru_cache,
+    поэтому неизменённый файл не перечитывается при каждой попытке отправки.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(video_path: Path, parts: int) -> str:
+    """Ключ кэша для частей видео.
+
+    :param video_path: Путь к видео
+    :param parts: Запрошенное количество частей
+    :return: Ключ: хэш содержимого, лимит размера части и количество частей
+    """
+    stat = video_path.stat()
+    source_hash = _file_hash(str(video_path), stat.st_size, stat.st_mtime_ns)
+    return f"{source_hash}-{settings.TELEGRAM_MAX_VIDEO_SIZE}-{parts}"
+
+
+def key_parts(key: str) -> int:
+    """Количество частей, запрошенное для ключа кэша.
+
+    Видео может разбиться на меньшее количество частей, поэтому для повторного
+    поиска в кэше нужно именно запрошенное количество, а не количество готовых частей.
+    """
+    return int(key.rsplit("-", 1)[1])
+
+
+def _entry_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.iterdir() if file.is_file())
+
+
+def _evict(keep: Path) -> None:
+    """Удаляет давно не использованные записи, пока кэш больше PART_CACHE_SIZE.
+
+    Запись keep сейчас используется и не удаляется, даже если одна она больше лимита.
+    """
+    entries = []
+    for path in settings.PART_CACHE_DIR.iterdir():
+        if path == keep or not path.is_dir() or path.name.startswith(_TMP_PREFIX):
+            continue
+        entries.append((path.stat().st_mtime, _entry_size(path), path))
+
+    limit = settings.PART_CACHE_SIZE * 1024 * 1024 - _entry_size(keep)
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        logger.info("Evicting cached video parts %s", path.name)
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def get_cached_parts(key: str, video_path: Path) -> list[Path]:
+    """Возвращает части видео из кэша по ключу, не читая исходный файл.
+
+    Хэш не пересчитывается, поэтому изменение файла определяется по времени:
+    части, сделанные раньше последнего изменения файла, не возвращаются.
+
+    :param key: Ключ кэша из cache_key
+    :param video_path: Путь к видео
+    :return: Список путей к частям по порядку или пустой список, если записи нет
+    """
+    entry = settings.PART_CACHE_DIR / key
+    with _lock:
+        parts = sorted(entry.iterdir()) if entry.is_dir() else []
+        if not parts or parts[0].stat().st_mtime_ns < video_path.stat().st_mtime_ns:
+            return []
+        # Время изменения записи - время последнего использования для вытеснения
+        os.utime(entry)
+        return parts
+
+
+def get_video_parts(video_id: str, video_path: Path, parts: int) -> list[Path]:
+    """Возвращает части видео из кэша, разбивая видео, только если их там нет.
+
+    :param video_id: ID видео, используется для рабочей директории
+    :param video_path: Путь к видео
+    :param parts: Количество частей
+    :return: Список путей к частям по порядку или пустой список при ошибке
+    """
+    key = cache_key(video_path, parts)
+    entry = settings.PART_CACHE_DIR / key
+
+    with _lock:
+        if entry.is_dir():
+            # Время изменения записи - время последнего использования для вытеснения
+            os.utime(entry)
+            logger.info("Using cached parts of video %s", video_id)
+            return sorted(entry.iterdir())
+
+    with workspace(video_id) as work_dir:
+        rendered = split_video(video_path, parts, work_dir)
+        if not rendered:
+            return []
+        # Запись появляется в кэше целиком: части собираются рядом и переименовываются разом
+        tmp_dir = Path(tempfile.mkdtemp(prefix=_TMP_PREFIX, dir=settings.PART_CACHE_DIR))
+        for i, part in enumerate(rendered, start=1):
+            # Номер с нулями, чтобы части сортировались по имени
+            shutil.move(part, tmp_dir / f"part{i:02d}{part.suffix}")
+
+    with _lock:
+        if entry.is_dir():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, entry)
+        _evict(keep=entry)
+        return sorted(entry.iterdir())
+
+
+def cache_cleanup() -> None:
+    """Удаляет недописанные записи, оставшиеся после аварийного завершения"""
+    for path in settings.PART_CACHE_DIR.glob(f"{_TMP_PREFIX}*"):
+        shutil.rmtree(path, ignore_errors=True)
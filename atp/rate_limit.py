@@ -0,0 +1,82 @@
+import threading
+import time
+from collections.abc import Callable
+
+
+class TokenBucket:
+    """Потокобезопасный ограничитель частоты запросов (token bucket).
+
+    Токены восполняются со скоростью rate в секунду, но не больше capacity.
+    Каждый запрос забирает один токен, если токенов нет - ждём.
+
+    :ivar rate: Количество запросов в секунду, 0 - без ограничений
+    :ivar capacity: Максимальное количество запросов подряд без ожидания
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._paused_until = self._updated
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Забирает токен и возвращает, сколько секунд нужно подождать до его появления"""
+        with self._lock:
+            now = self._clock()
+            # Во время паузы токены не выдаются и не восполняются
+            ready = max(now, self._paused_until)
+            if self.rate <= 0:
+                return ready - now
+            elapsed = max(0.0, ready - self._updated)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = max(self._updated, ready)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return ready - now
+            return ready - now - self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Блокирует поток, пока не освободится токен"""
+        if wait := self._reserve():
+            self._sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Приостанавливает выдачу токенов (например, когда сервер ответил 429 с retry_after).
+
+        Первый запрос после паузы проходит сразу, следующие - не чаще rate в секунду.
+
+        :param seconds: Длительность паузы в секундах
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self._updated = max(self._updated, self._paused_until)
+            self._tokens = min(self.capacity, 1)
+
+
+_limiters: dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, rate: float, capacity: float = 1) -> TokenBucket:
+    """Возвращает общий ограничитель для ключа (например, прокси или чата).
+
+    :param key: Ключ ограничителя
+    :param rate: Количество запросов в секунду
+    :param capacity: Максимальное количество запросов подряд без ожидания
+    :return: Ограничитель частоты запросов
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None or limiter.rate != rate or limiter.capacity != capacity:
+            limiter = _limiters[key] = TokenBucket(rate, capacity)
+        return limiter
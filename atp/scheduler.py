@@ -0,0 +1,141 @@
+"""
+Асинхронный планировщик задач
+
+Каждая задача приложения (импорт, скачивание, проверка, отправка уведомлений)
+работает в своей asyncio-задаче, а блокирующий код (yt-dlp, ffmpeg, запросы к Telegram)
+выполняет в собственном пуле потоков. Поэтому долгое скачивание не задерживает
+проверку доступности, а при отмене планировщика отменяются все задачи сразу.
+"""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Как часто (в секундах) задача, ожидающая события, проверяет его
+WAKEUP_POLL_INTERVAL = 1.0
+
+
+def next_run_at(now: datetime, minute: int) -> datetime:
+    """Ближайшее время после now, когда минуты часа равны minute.
+
+    :param now: Текущее время
+    :param minute: Минута часа
+    :return: Время следующего запуска
+    """
+    run_at = now.replace(minute=minute, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(hours=1)
+    return run_at
+
+
+async def _wait(wakeup: threading.Event | None, timeout: float | None) -> None:
+    """Ждёт timeout секунд (None - бесконечно) или пока не будет выставлено событие wakeup.
+
+    Событие выставляется из обычных потоков, поэтому проверяется раз в WAKEUP_POLL_INTERVAL.
+    """
+    if wakeup is None:
+        await asyncio.sleep(timeout)
+        return
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while not wakeup.is_set():
+        remaining = WAKEUP_POLL_INTERVAL if deadline is None else deadline - loop.time()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(WAKEUP_POLL_INTERVAL, remaining))
+
+
+class Scheduler:
+    """Запускает блокирующие задачи по расписанию в asyncio.
+
+    У каждой задачи свой пул из одного потока: запуски одной задачи не пересекаются,
+    а разные задачи не ждут друг друга. Ошибка в задаче пишется в лог
+    и не останавливает ни её следующие запуски, ни другие задачи.
+
+    :ivar jobs: Имена зарегистрированных задач
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        self._clock = clock
+        self._jobs: dict[str, Callable[[ThreadPoolExecutor], Awaitable[None]]] = {}
+
+    @property
+    def jobs(self) -> list[str]:
+        return list(self._jobs)
+
+    def _add(self, name: str, job: Callable[[ThreadPoolExecutor], Awaitable[None]]) -> None:
+        if name in self._jobs:
+            raise ValueError(f"Job {name} is already scheduled")
+        self._jobs[name] = job
+
+    async def _run_job(self, name: str, func: Callable[[], object], executor: ThreadPoolExecutor):
+        try:
+            await asyncio.get_running_loop().run_in_executor(executor, func)
+        except Exception as e:
+            logger.exception("Job %s failed: %s", name, e)
+
+    def hourly(self, name: str, func: Callable[[], object], minute: int) -> None:
+        """Запускает func каждый час в minute минут.
+
+        Если запуск длился дольше часа, пропущенные запуски не наверстываются.
+
+        :param name: Имя задачи
+        :param func: Блокирующая функция
+        :param minute: Минута часа
+        """
+
+        async def job(executor: ThreadPoolExecutor) -> None:
+            while True:
+                now = self._clock()
+                await asyncio.sleep((next_run_at(now, minute) - now).total_seconds())
+                await self._run_job(name, func, executor)
+
+        self._add(name, job)
+
+    def loop(
+        self,
+        name: str,
+        func: Callable[[], object],
+        interval: float | None = None,
+        wakeup: threading.Event | None = None,
+    ) -> None:
+        """Запускает func сразу, а затем через interval секунд после окончания
+        предыдущего запуска или раньше, как только будет выставлено событие wakeup.
+
+        :param name: Имя задачи
+        :param func: Блокирующая функция
+        :param interval: Пауза между запусками (None - только по событию wakeup)
+        :param wakeup: Событие, которое запускает задачу без ожидания
+        """
+        if interval is None and wakeup is None:
+            raise ValueError("Either interval or wakeup must be provided")
+
+        async def job(executor: ThreadPoolExecutor) -> None:
+            while True:
+                if wakeup is not None:
+                    # Событие, выставленное во время запуска, запустит задачу ещё раз
+                    wakeup.clear()
+                await self._run_job(name, func, executor)
+                await _wait(wakeup, interval)
+
+        self._add(name, job)
+
+    async def run(self) -> None:
+        """Запускает все задачи и работает, пока его не отменят.
+
+        При отмене задачи перестают запускаться, а ещё не начатые запуски отменяются.
+        Уже работающая функция дорабатывает в своём потоке.
+        """
+        executors = {
+            name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=name) for name in self._jobs
+        }
+        try:
+            await asyncio.gather(*(job(executors[name]) for name, job in self._jobs.items()))
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
@@ -300,6 +300,144 @@ def version_11() -> None:
         f.write("\nCHECK_TIKTOK_AVAILABILITY=true\n")
 
 
+def version_12() -> None:
+    """Обновляет конфигурацию до версии 12."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write("\n# Количество видео, скачиваемых параллельно\nDOWNLOAD_WORKERS=1\n")
+
+
+def version_13() -> None:
+    """Обновляет конфигурацию до версии 13."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Количество видео, проверяемых параллельно, и лимит запросов в секунду"
+            "\nCHECK_WORKERS=1"
+            "\nCHECK_RATE_LIMIT=2\n"
+        )
+
+
+def version_14() -> None:
+    """Обновляет конфигурацию до версии 14."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Пакетная проверка доступности через мобильный API TikTok"
+            "\n# и его app_info: iid/app_name/app_version/manifest_app_version/aid"
+            "\nAVAILABILITY_PROBE=false"
+            '\nTIKTOK_APP_INFO=""\n'
+        )
+
+
+def version_15() -> None:
+    """Обновляет конфигурацию до версии 15."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Настройки SQLite"
+            "\nSQLITE_JOURNAL_MODE=WAL"
+            "\nSQLITE_SYNCHRONOUS=NORMAL"
+            "\nSQLITE_BUSY_TIMEOUT=5000"
+            "\nSQLITE_MMAP_SIZE=268435456\n"
+        )
+
+
+def version_16() -> None:
+    """Обновляет конфигурацию до версии 16."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Количество изображений слайдшоу, скачиваемых параллельно (0 - по одному)"
+            "\nSLIDESHOW_DOWNLOAD_WORKERS=0\n"
+        )
+
+
+def version_17() -> None:
+    """Обновляет конфигурацию до версии 17."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write("\n# Способ рендера слайдшоу: filter или concat\nSLIDESHOW_RENDERER=filter\n")
+
+
+def version_18() -> None:
+    """Обновляет конфигурацию до версии 18."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Количество частей большого видео, кодируемых параллельно (0 - по числу ядер)"
+            "\nSPLIT_WORKERS=0\n"
+        )
+
+
+def version_19() -> None:
+    """Обновляет конфигурацию до версии 19."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Резать большие видео по ключевым кадрам без перекодирования"
+            "\nSPLIT_STREAM_COPY=true\n"
+        )
+
+
+def version_20() -> None:
+    """Обновляет конфигурацию до версии 20."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Адрес Telegram Bot API (например, локальный telegram-bot-api) и таймаут в секундах"
+            "\nTELEGRAM_API_URL=https://api.telegram.org"
+            "\nTELEGRAM_TIMEOUT=180\n"
+        )
+
+
+def version_21() -> None:
+    """Обновляет конфигурацию до версии 21."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Лимит запросов в секунду в один чат Telegram (0 - без ограничений)"
+            "\nTELEGRAM_RATE_LIMIT=1\n"
+        )
+
+
+def version_22() -> None:
+    """Обновляет конфигурацию до версии 22."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Очередь уведомлений: как часто её проверять и пауза перед повторной отправкой"
+            "\n# в секундах (удваивается после каждой ошибки до OUTBOX_MAX_RETRY_DELAY)"
+            "\nOUTBOX_POLL_INTERVAL=30"
+            "\nOUTBOX_RETRY_DELAY=60"
+            "\nOUTBOX_MAX_RETRY_DELAY=21600\n"
+        )
+
+
+def version_23() -> None:
+    """Обновляет конфигурацию до версии 23."""
+    config_dir = get_config_dir()
+    settings_file = config_dir / "settings.conf"
+    with open(settings_file, "a") as f:
+        f.write(
+            "\n# Кэш частей больших видео: директория (пусто - ~/.cache/atp/part_cache)"
+            "\n# и размер в мегабайтах"
+            '\nPART_CACHE_DIR=""'
+            "\nPART_CACHE_SIZE=2048\n"
+        )
+
+
 VERSIONS = [
     None,
     version_2,
@@ -312,6 +450,18 @@ VERSIONS = [
     version_9,
     version_10,
     version_11,
+    version_12,
+    version_13,
+    version_14,
+    version_15,
+    version_16,
+    version_17,
+    version_18,
+    version_19,
+    version_20,
+    version_21,
+    version_22,
+    version_23,
 ]
 
 
@@ -335,9 +485,23 @@ DOWNLOAD_SAVED_VIDEOS: bool = os.getenv("DOWNLOAD_SAVED_VIDEOS", "false").lower(
 TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID: str = os.getenv("TELEGRAM_CHAT_ID", "")
 TELEGRAM_MAX_VIDEO_SIZE = 1024 * 1024 * 50 - 2048
+# Адрес Bot API (например, локальный telegram-bot-api) и таймаут запросов в секундах
+TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+TELEGRAM_TIMEOUT: float = float(os.getenv("TELEGRAM_TIMEOUT", "180"))
+# Лимит запросов в секунду в один чат (0 - без ограничений), при ответе 429 чат ставится на паузу
+TELEGRAM_RATE_LIMIT: float = float(os.getenv("TELEGRAM_RATE_LIMIT", "1"))
+# Как часто (в секундах) проверять очередь уведомлений
+OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "30"))
+# Пауза перед повторной отправкой уведомления, удваивается после каждой ошибки до максимума
+OUTBOX_RETRY_DELAY: float = float(os.getenv("OUTBOX_RETRY_DELAY", "60"))
+OUTBOX_MAX_RETRY_DELAY: float = float(os.getenv("OUTBOX_MAX_RETRY_DELAY", str(6 * 60 * 60)))
 
 # Настройки проверки доступности
 CHECK_INTERVAL_DAYS: int = int(os.getenv("CHECK_INTERVAL_DAYS", "7"))
+# Количество видео, проверяемых параллельно
+CHECK_WORKERS: int = max(1, int(os.getenv("CHECK_WORKERS", "1")))
+# Лимит запросов проверки в секунду через один прокси (0 - без ограничений)
+CHECK_RATE_LIMIT: float = float(os.getenv("CHECK_RATE_LIMIT", "2"))
 
 # Пытаться скачать failed видео, вдруг их восстановили
 HOPE_MODE: bool = os.getenv("HOPE_MODE", "false").lower() == "true"
@@ -345,6 +509,21 @@ HOPE_MODE: bool = os.getenv("HOPE_MODE", "false").lower() == "true"
 # Количество попыток при скачивании/проверке видео
 MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
 
+# Количество видео, скачиваемых параллельно
+DOWNLOAD_WORKERS: int = max(1, int(os.getenv("DOWNLOAD_WORKERS", "1")))
+# Количество изображений слайдшоу, скачиваемых параллельно (0 - по одному через gallery_dl)
+# Потоки делят одну HTTP-сессию gallery_dl и не выдерживают паузу между запросами
+# (sleep-request), поэтому TikTok может чаще отвечать ошибками или ограничивать запросы
+SLIDESHOW_DOWNLOAD_WORKERS: int = max(0, int(os.getenv("SLIDESHOW_DOWNLOAD_WORKERS", "0")))
+# Способ рендера слайдшоу: filter - все изображения в одном графе фильтров,
+# concat - изображения подготавливаются по одному и склеиваются concat demuxer'ом
+# (быстрее и требует меньше памяти на слайдшоу из многих изображений)
+SLIDESHOW_RENDERER: str = os.getenv("SLIDESHOW_RENDERER", "filter").lower()
+# Количество частей большого видео, кодируемых параллельно (0 - по числу ядер)
+SPLIT_WORKERS: int = max(0, int(os.getenv("SPLIT_WORKERS", "0")))
+# Сначала резать большое видео по ключевым кадрам без перекодирования
+SPLIT_STREAM_COPY: bool = os.getenv("SPLIT_STREAM_COPY", "true").lower() == "true"
+
 # Настройки прокси и user-agent
 PROXY: str = os.getenv("PROXY", "")
 if PROXY:
@@ -352,12 +531,28 @@ if PROXY:
 USER_AGENT = os.getenv("USER_AGENT", "")
 CHECK_TIKTOK_AVAILABILITY: bool = os.getenv("CHECK_TIKTOK_AVAILABILITY", "false").lower() == "true"
 
+# Пакетная проверка доступности через мобильный API TikTok
+# Недоступные и непонятные видео всё равно проверяются полностью
+AVAILABILITY_PROBE: bool = os.getenv("AVAILABILITY_PROBE", "false").lower() == "true"
+# app_info для мобильного API в формате yt-dlp: iid/app_name/app_version/manifest_app_version/aid
+TIKTOK_APP_INFO: str = os.getenv("TIKTOK_APP_INFO", "")
+
 # Настройки папок и базы
 DATABASE_FILE = os.getenv("DATABASE", "tiktok_videos.db")
 if not os.path.isabs(DATABASE_FILE):
     DATABASE_FILE = str(config_dir / DATABASE_FILE)
 DATABASE_URL: str = f"sqlite:///{DATABASE_FILE}"
 
+# Настройки SQLite, применяются к каждому соединению (PRAGMA)
+# WAL позволяет читать базу (например, статистику) не блокируя планировщик
+SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()
+# В режиме WAL NORMAL безопасен: при сбое теряются только последние транзакции
+SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+# Сколько миллисекунд ждать, пока база занята другим соединением
+SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+# Размер отображаемой в память части базы в байтах (0 - отключено)
+SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
 if DOCKER:
     DOWNLOADS_DIR = "/downloads"
 else:
@@ -399,11 +594,19 @@ KNOWN_GOOD_TIKTOKS = [
 ]
 
 
-SLIDESHOW_TMP_DIR: Path = Path(tempfile.gettempdir()) / "gallery_dl"
-PARTS_TMP_DIR: Path = Path(tempfile.gettempdir()) / "video_parts"
+# Временные рабочие директории для обработки видео (по одной на задачу)
+WORKSPACES_DIR: Path = Path(tempfile.gettempdir()) / "atp_workspaces"
+# Кэш частей больших видео для отправки в Telegram, переживает перезапуск.
+# По умолчанию в пользовательском кэше, а не в config: там может набраться PART_CACHE_SIZE МБ
+_CACHE_HOME = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+PART_CACHE_DIR: Path = Path(os.getenv("PART_CACHE_DIR") or _CACHE_HOME / "atp" / "part_cache")
+if not PART_CACHE_DIR.is_absolute():
+    PART_CACHE_DIR = config_dir / PART_CACHE_DIR
+# Размер кэша частей в мегабайтах (используемые сейчас части хранятся всегда)
+PART_CACHE_SIZE: int = max(0, int(os.getenv("PART_CACHE_SIZE", "2048")))
 
-os.makedirs(SLIDESHOW_TMP_DIR, exist_ok=True)
-os.makedirs(PARTS_TMP_DIR, exist_ok=True)
+os.makedirs(WORKSPACES_DIR, exist_ok=True)
+os.makedirs(PART_CACHE_DIR, exist_ok=True)
 os.makedirs(DOWNLOADS_DIR, exist_ok=True)
 
 check_dir_permission(get_config_dir())
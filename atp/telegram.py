@@ -1,31 +1,155 @@
-import io
 import json
 import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import BinaryIO
 
 import requests
 
 from atp import settings
+from atp.multipart import MultipartEncoder
+from atp.rate_limit import TokenBucket, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Таймаут установки соединения, таймаут ответа задаётся TELEGRAM_TIMEOUT
+CONNECT_TIMEOUT = 10
+# Сколько раз повторять запрос, если Telegram ответил 429 Too Many Requests
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+def _retry_after(response: requests.Response, attempt: int) -> float:
+    """Сколько ждать перед повтором после ответа 429 (retry_after, Retry-After или backoff)"""
+    try:
+        retry_after = response.json()["parameters"]["retry_after"]
+    except (ValueError, KeyError, TypeError):
+        retry_after = response.headers.get("Retry-After")
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return float(2**attempt)
+
+
+class TelegramClient:
+    """Клиент Bot API с общей keep-alive сессией.
+
+    Соединения с Telegram переиспользуются между запросами и потоками.
+    Запросы в один чат идут не чаще TELEGRAM_RATE_LIMIT в секунду, а на ответ 429
+    чат ставится на паузу на указанное Telegram время и запрос повторяется.
+
+    :ivar api_url: Адрес Bot API
+    :ivar timeout: Таймаут ответа в секундах
+    :ivar session: HTTP сессия, можно подменить в тестах
+    """
+
+    def __init__(
+        self,
+        api_url: str | None = None,
+        timeout: float | None = None,
+        session: requests.Session | None = None,
+        max_retries: int = MAX_RATE_LIMIT_RETRIES,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.api_url = api_url or settings.TELEGRAM_API_URL
+        self.timeout = timeout or settings.TELEGRAM_TIMEOUT
+        self.max_retries = max_retries
+        self._sleep = sleep
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def _chat_limiter(self, data: dict | None) -> TokenBucket | None:
+        """Общий ограничитель запросов для чата, которому адресован запрос"""
+        if not data or "chat_id" not in data or settings.TELEGRAM_RATE_LIMIT <= 0:
+            return None
+        return get_rate_limiter(f"telegram:{data['chat_id']}", settings.TELEGRAM_RATE_LIMIT)
+
+    def call(
+        self,
+        method: str,
+        data: dict | None = None,
+        files: dict[str, BinaryIO] | None = None,
+        timeout: float | None = None,
+    ) -> requests.Response:
+        """Вызывает метод Bot API, файлы отправляются потоково
+
+        :param method: Метод Bot API, например sendVideo
+        :param data: Параметры метода
+        :param files: Файлы для загрузки
+        :param timeout: Таймаут ответа, по умолчанию timeout клиента
+        :return: Ответ Telegram (последний, если лимит так и не прошёл)
+        """
+        url = f"{self.api_url}/bot{settings.TELEGRAM_BOT_TOKEN}/{method}"
+        body = MultipartEncoder(data or {}, files) if files else data
+        headers = {"Content-Type": body.content_type} if files else None
+        limiter = self._chat_limiter(data)
+
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire()
+            response = self.session.post(
+                url,
+                data=body,
+                headers=headers,
+                timeout=(CONNECT_TIMEOUT, timeout or self.timeout),
+            )
+            if response.status_code != 429 or attempt >= self.max_retries:
+                return response
+            attempt += 1
+            delay = _retry_after(response, attempt)
+            logger.warning("Telegram rate limit on %s, retrying in %s s", method, delay)
+            if limiter:
+                # Пауза действует на все запросы в этот чат, в том числе из других потоков
+                limiter.pause(delay)
+            else:
+                self._sleep(delay)
+            if files:
+                body.reset()
+
+
+_client: TelegramClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> TelegramClient:
+    """Возвращает общий клиент Telegram, создавая его при первом вызове"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TelegramClient()
+        return _client
+
+
+def set_client(client: TelegramClient | None) -> None:
+    """Подменяет общий клиент (например, на клиент к тестовому серверу)"""
+    global _client
+    with _client_lock:
+        _client = client
+
 
 def send_media(
     caption: str,
-    video: io.BytesIO | None = None,
-    photos: list[io.BytesIO] | None = None,
+    video: BinaryIO | None = None,
+    photos: list[BinaryIO] | None = None,
 ) -> dict:
     """Отправляет медиа в Telegram (видео или фото).
 
+    Файлы не читаются в память целиком, можно передавать открытые файлы.
+
     :param caption: Подпись к медиа
-    :param video: Путь к видео файлу (Path) или список путей для медиа-группы
-    :param photos: Список фото в виде BytesIO
+    :param video: Видео в виде открытого файла или BytesIO
+    :param photos: Список фото в виде открытых файлов или BytesIO
     :return: Результат ответа от Telegram API (dict)
     :raises: Exception с текстом ответа при ошибке
     """
     if not settings.TELEGRAM_BOT_TOKEN or not settings.TELEGRAM_CHAT_ID:
         raise Exception("Telegram parameters not configured (token or chat ID)")
 
-    base_url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}"
     chat_id = settings.TELEGRAM_CHAT_ID
 
     if video:
@@ -47,15 +171,15 @@ def send_media(
 
         media[0]["caption"] = caption
         data = {"chat_id": chat_id, "media": json.dumps(media)}
-        url = f"{base_url}/sendMediaGroup"
+        method = "sendMediaGroup"
     else:
         files = {media_type: media_items[0]}
         data = {"chat_id": chat_id, "caption": caption}
         if media_type == "video":
             data["supports_streaming"] = True
-        url = f"{base_url}/send{media_type.capitalize()}"
+        method = f"send{media_type.capitalize()}"
 
-    response = requests.post(url, data=data, files=files, timeout=180)
+    response = get_client().call(method, data, files)
 
     if response.status_code != 200:
         raise Exception(f"Failed to send Telegram media: {response.text}")
@@ -66,16 +190,16 @@ def send_media(
 def edit_media(
     message_id: int,
     caption: str,
-    video: io.BytesIO | None = None,
-    photo: io.BytesIO | None = None,
+    video: BinaryIO | None = None,
+    photo: BinaryIO | None = None,
     parse_mode: str | None = None,
 ) -> bool:
     """Редактирует медиа в сообщении Telegram.
 
     :param message_id: ID сообщения для редактирования
     :param caption: Новая подпись к медиа
-    :param video: Видео в виде BytesIO
-    :param photo: Фото в виде BytesIO
+    :param video: Видео в виде открытого файла или BytesIO
+    :param photo: Фото в виде открытого файла или BytesIO
     :param parse_mode: Режим парсинга (например, "Markdown")
     :return: True если успешно, False иначе
     """
@@ -105,13 +229,7 @@ def edit_media(
             "media": json.dumps(media),
         }
 
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/editMessageMedia"
-        response = requests.post(
-            url,
-            data=payload,
-            files={media_type: file_obj},
-            timeout=180,
-        )
+        response = get_client().call("editMessageMedia", payload, {media_type: file_obj})
 
         if response.status_code == 200:
             logger.info("Telegram message media edited successfully.")
@@ -130,8 +248,7 @@ def discover_chat_id() -> None:
     if not settings.TELEGRAM_BOT_TOKEN or settings.TELEGRAM_CHAT_ID:
         return
     try:
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/getUpdates"
-        response = requests.get(url, timeout=60)
+        response = get_client().call("getUpdates", timeout=60)
         if response.status_code != 200:
             logger.error("Failed to get Telegram chat ID: %s", response.text)
             return
@@ -151,10 +268,9 @@ def discover_chat_id() -> None:
             logger.warning("Can't find chat ID, try sending any message to a channel")
             return
 
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-        response = requests.post(
-            url,
-            data={"chat_id": chat_id, "text": "Удаленные видео будут публиковаться в этом чате"},
+        response = get_client().call(
+            "sendMessage",
+            {"chat_id": chat_id, "text": "Удаленные видео будут публиковаться в этом чате"},
             timeout=60,
         )
         if response.status_code == 200:
@@ -1,27 +1,40 @@
 import itertools
 import logging
+import os
 import re
+import threading
 import time
 import urllib.parse
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
 
 import yt_dlp
 from gallery_dl import config, job
+from gallery_dl.extractor import find as find_extractor
+from gallery_dl.extractor.common import Extractor
+from gallery_dl.extractor.message import Message
 from yt_dlp.extractor.tiktok import TikTokIE, TikTokUserIE
 from yt_dlp.utils import (
     ExtractorError,
     int_or_none,
+    smuggle_url,
+    unsmuggle_url,
+    urlencode_postdata,
 )
 from yt_dlp.utils.traversal import traverse_obj
 
-from atp.media import render_slideshow, temp_files_cleanup
+from atp.media import render_slideshow, workspace
 from atp.models import Video, VideoInfo, VideoStatus, VideoType
+from atp.rate_limit import TokenBucket
 from atp.settings import (
     COOKIES_FILE,
     DOWNLOADS_DIR,
     MAX_RETRIES,
-    SLIDESHOW_TMP_DIR,
+    SLIDESHOW_DOWNLOAD_WORKERS,
+    TIKTOK_APP_INFO,
     USER_AGENT,
 )
 
@@ -30,7 +43,6 @@ logger = logging.getLogger(__name__)
 # Настройка gallery_dl
 config.load()
 config.set((), "directory", "")
-config.set(("extractor",), "base-directory", str(SLIDESHOW_TMP_DIR))
 config.set(
     ("extractor", "tiktok"),
     "filename",
@@ -145,11 +157,16 @@ class TikTokUserBaseIE(TikTokUserIE):
             return None
         return universal_data
 
-    def _entries(self, sec_uid, user_name, fail_early=False):
+    def _entries(self, sec_uid, user_name, fail_early=False, cursor=None):
+        """Лениво листает список видео, начиная с cursor (по умолчанию с текущего момента).
+
+        В каждую запись добавляется page_cursor - курсор страницы, с которой она получена,
+        чтобы импорт можно было продолжить с этого места.
+        """
         display_id = user_name or sec_uid
         seen_ids = set()
 
-        cursor = int(time.time() * self._CURSOR_SCALE)
+        cursor = cursor or int(time.time() * self._CURSOR_SCALE)
         for page in itertools.count(1):
             for retry in self.RetryManager():
                 response = self._download_json(
@@ -186,6 +203,7 @@ class TikTokUserBaseIE(TikTokUserIE):
                 yield self.url_result(
                     webpage_url,
                     TikTokIE,
+                    page_cursor=cursor,
                     **self._parse_aweme_video_web(video, webpage_url, video_id, extract_flat=True),
                 )
 
@@ -225,6 +243,7 @@ class TikTokLikedIE(TikTokUserBaseIE):
     _API_BASE_URL = "https://www.tiktok.com/api/favorite/item_list/"
 
     def _real_extract(self, url):
+        url, data = unsmuggle_url(url, {})
         user_name, user_name2 = self._match_valid_url(url).group("username", "username2")
         user_name, sec_uid = user_name or user_name2, None
         if re.fullmatch(r"MS4wLjABAAAA[\w-]{64}", user_name):
@@ -264,7 +283,7 @@ class TikTokLikedIE(TikTokUserBaseIE):
             )
 
         return self.playlist_result(
-            self._entries(sec_uid, user_name, fail_early), sec_uid, user_name
+            self._entries(sec_uid, user_name, fail_early, data.get("cursor")), sec_uid, user_name
         )
 
 
@@ -274,7 +293,8 @@ class TikTokSavedIE(TikTokUserBaseIE):
     _CURSOR_SCALE = 1  # cursor is in seconds
     _API_BASE_URL = "https://www.tiktok.com/api/user/collect/item_list/"
 
-    def _real_extract(self, _url):
+    def _real_extract(self, url):
+        _, data = unsmuggle_url(url, {})
         universal_data = self._extract_universal_data(self._WEBPAGE_HOST, fatal=False) or {}
 
         user_name = traverse_obj(universal_data, ("webapp.app-context", "user", "uniqueId", {str}))
@@ -284,7 +304,32 @@ class TikTokSavedIE(TikTokUserBaseIE):
             self.raise_login_required("You are not logged in. Log into an account that has access")
 
         return self.playlist_result(
-            self._entries(sec_uid, user_name, fail_early=True), sec_uid, user_name
+            self._entries(sec_uid, user_name, fail_early=True, cursor=data.get("cursor")),
+            sec_uid,
+            user_name,
+        )
+
+
+class TikTokProbeIE(TikTokIE):
+    """Пакетная проверка существования видео через мобильный API (multi/aweme/detail)"""
+
+    IE_NAME = "tiktok:probe"
+    _VALID_URL = r"tiktokprobe:(?P<ids>\d+(?:,\d+)*)"
+
+    def _real_extract(self, url):
+        video_ids = self._match_valid_url(url).group("ids").split(",")
+        response = self._call_api(
+            "multi/aweme/detail",
+            video_ids[0],
+            data=urlencode_postdata(
+                {"aweme_ids": f"[{','.join(video_ids)}]", "request_source": "0"}
+            ),
+            headers={"X-Argus": ""},
+            fatal=False,
+            note=f"Probing {len(video_ids)} videos",
+        )
+        return self.playlist_result(
+            traverse_obj(response, ("aweme_details", lambda _, v: v["aweme_id"])) or []
         )
 
 
@@ -299,12 +344,136 @@ def get_error_message(e: Exception) -> str:
     return str(e)
 
 
+class _YtDlpPool:
+    """Долгоживущие экземпляры YoutubeDL одного потока.
+
+    Создание YoutubeDL загружает экстракторы, cookies и сессии curl_cffi,
+    поэтому экземпляр переиспользуется между запросами с одинаковыми опциями
+    (проверка, скачивание, запросы с cookies). YoutubeDL не потокобезопасен,
+    поэтому у каждого потока свой пул.
+    """
+
+    def __init__(self) -> None:
+        self.instances: dict[str, tuple[ExitStack, yt_dlp.YoutubeDL]] = {}
+        self.fingerprint: tuple | None = None
+
+
+# Пулы потоков по threading.get_ident(): пул потока можно закрыть из другого потока,
+# когда он уже завершил работу (см. YtDlpExecutor)
+_ydl_pools: dict[int, _YtDlpPool] = {}
+_ydl_pools_lock = threading.Lock()
+
+
+def _current_pool() -> _YtDlpPool:
+    with _ydl_pools_lock:
+        return _ydl_pools.setdefault(threading.get_ident(), _YtDlpPool())
+
+
+def _cookies_mtime() -> float | None:
+    if COOKIES_FILE and os.path.exists(COOKIES_FILE):
+        return os.path.getmtime(COOKIES_FILE)
+    return None
+
+
+def _pool_fingerprint() -> tuple:
+    """Состояние окружения, при изменении которого пул нужно пересоздать"""
+    return (COOKIES_FILE, _cookies_mtime(), os.getenv("ALL_PROXY"), USER_AGENT)
+
+
+def _pool_key(ydl_opts: dict[str, any]) -> str:
+    return repr(sorted((key, value) for key, value in ydl_opts.items() if key != "logger"))
+
+
+def _close_ydl(stack: ExitStack, ydl: yt_dlp.YoutubeDL, save_cookies: bool) -> None:
+    if not save_cookies and isinstance(getattr(ydl, "params", None), dict):
+        # Файл cookies изменили снаружи, не перезаписываем его старыми cookies
+        ydl.params.pop("cookiefile", None)
+    try:
+        stack.close()
+    except Exception as e:
+        logger.warning("Error closing yt-dlp instance: %s", e)
+
+
+def _close_pool(pool: _YtDlpPool) -> None:
+    save_cookies = pool.fingerprint is None or pool.fingerprint[1] == _cookies_mtime()
+    for stack, ydl in pool.instances.values():
+        _close_ydl(stack, ydl, save_cookies)
+    pool.instances.clear()
+    pool.fingerprint = None
+
+
+def close_ydl_pool(thread_id: int | None = None) -> None:
+    """Закрывает экземпляры YoutubeDL потока. При закрытии YoutubeDL сохраняет cookies в файл.
+
+    :param thread_id: threading.get_ident() потока, по умолчанию текущий поток.
+        Пул другого потока можно закрывать, только когда тот больше не делает запросов
+    """
+    with _ydl_pools_lock:
+        pool = _ydl_pools.pop(threading.get_ident() if thread_id is None else thread_id, None)
+    if pool:
+        _close_pool(pool)
+
+
+class YtDlpExecutor(ThreadPoolExecutor):
+    """Пул потоков для запросов yt-dlp.
+
+    Потоки пула живут одну партию, поэтому при shutdown(wait=True) пул закрывает
+    экземпляры YoutubeDL своих потоков: освобождаются сессии, а cookies сохраняются в файл.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = ""):
+        self._thread_ids: set[int] = set()
+        super().__init__(
+            max_workers=max_workers,
+            thread_name_prefix=thread_name_prefix,
+            initializer=self._register_thread,
+        )
+
+    def _register_thread(self) -> None:
+        self._thread_ids.add(threading.get_ident())
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+        if wait:
+            # Потоки завершились, их экземпляры больше никто не использует
+            for thread_id in self._thread_ids:
+                close_ydl_pool(thread_id)
+            self._thread_ids.clear()
+
+
+def _get_ydl(ydl_opts: dict[str, any]) -> yt_dlp.YoutubeDL:
+    """Возвращает экземпляр YoutubeDL из пула, создавая его при необходимости.
+
+    :param ydl_opts: Опции для yt-dlp
+    :return: Экземпляр YoutubeDL
+    """
+    pool = _current_pool()
+    if pool.fingerprint != _pool_fingerprint():
+        # Поменялись cookies или прокси
+        _close_pool(pool)
+        pool.fingerprint = _pool_fingerprint()
+
+    key = _pool_key(ydl_opts)
+    if key not in pool.instances:
+        stack = ExitStack()
+        ydl = stack.enter_context(yt_dlp.YoutubeDL(ydl_opts.copy()))
+        pool.instances[key] = (stack, ydl)
+    return pool.instances[key][1]
+
+
+def _discard_ydl(ydl_opts: dict[str, any]) -> None:
+    """Убирает экземпляр из пула, например после сетевой ошибки"""
+    if entry := _current_pool().instances.pop(_pool_key(ydl_opts), None):
+        _close_ydl(*entry, save_cookies=True)
+
+
 def yt_dlp_request(
     ydl_opts: dict[str, any],
     url: str,
     download: bool = False,
     use_cookies: bool = False,
     always_retry: bool = False,
+    limiter: TokenBucket | None = None,
 ) -> dict[str, any] | list[dict[str, any]]:
     """Выполняет запрос к yt-dlp с обработкой сетевых ошибок.
 
@@ -313,6 +482,7 @@ def yt_dlp_request(
     :param download: Флаг скачивания
     :param use_cookies: Флаг использования cookies
     :param always_retry: Retry при не сетевых ошибках
+    :param limiter: Ограничитель частоты, токен берётся перед каждой попыткой
     :return: Информация о видео или список видео
 
     :raises NetworkError: При сетевых ошибках
@@ -324,26 +494,34 @@ def yt_dlp_request(
 
     attempt = 0
     while attempt < MAX_RETRIES:
+        if limiter:
+            limiter.acquire()
         if COOKIES_FILE and use_cookies:
             # используем cookies только когда это необходимо
             ydl_opts["cookiefile"] = COOKIES_FILE
         try:
-            with yt_dlp.YoutubeDL(ydl_opts.copy()) as ydl:
-                match url:  # tmp пока код не замерджили в yt-dlp
-                    case url if url.startswith("https://www.tiktok.com/@/video/"):
-                        return ydl.extract_info(url, process=download)
-                    case url if url.startswith("tiktokliked:"):
-                        return TikTokLikedIE(ydl).extract(url)
-                    case url if url.startswith(":tiktoksaved"):
-                        return TikTokSavedIE(ydl).extract(url)
-                    case _:
-                        raise ValueError(f"Invalid URL: {url}")
+            ydl = _get_ydl(ydl_opts)
+            match url:  # tmp пока код не замерджили в yt-dlp
+                case url if url.startswith("https://www.tiktok.com/@/video/"):
+                    return ydl.extract_info(url, process=download)
+                case url if url.startswith("tiktokliked:"):
+                    return TikTokLikedIE(ydl).extract(url)
+                case url if url.startswith(":tiktoksaved"):
+                    return TikTokSavedIE(ydl).extract(url)
+                case url if url.startswith("tiktokprobe:"):
+                    return TikTokProbeIE(ydl).extract(url)
+                case _:
+                    raise ValueError(f"Invalid URL: {url}")
         except Exception as e:
             error_msg = get_error_message(e)
             is_cookies_error = any(err in error_msg for err in COOKIE_ERRORS)
             is_network_error = any(err in str(e) for err in NETWORK_ERRORS)
             is_last_attempt = attempt + 1 >= MAX_RETRIES
 
+            if is_network_error:
+                # Соединение могло сломаться, следующая попытка начнёт с чистого экземпляра
+                _discard_ydl(ydl_opts)
+
             if is_cookies_error and COOKIES_FILE and not use_cookies:
                 # если ошибка из-за логина, добавляем cookies и пробуем снова не тратя attempt
                 use_cookies = True
@@ -373,11 +551,14 @@ def yt_dlp_request(
     raise NetworkError
 
 
-def check_video_availability(video: Video, no_errors: bool = False) -> VideoInfo | None:
+def check_video_availability(
+    video: Video, no_errors: bool = False, limiter: TokenBucket | None = None
+) -> VideoInfo | None:
     """Проверяет доступность видео TikTok.
 
     :param video: Видео
     :param no_errors: Не выводить ошибки
+    :param limiter: Ограничитель частоты запросов
 
     :return: Информация о видео или None при сетевой ошибке
     """
@@ -392,6 +573,7 @@ def check_video_availability(video: Video, no_errors: bool = False) -> VideoInfo
             ydl_opts,
             url=f"https://www.tiktok.com/@/video/{video.id}",
             always_retry=video.status == VideoStatus.SUCCESS,
+            limiter=limiter,
         )
         return VideoInfo(
             deleted_reason=None,
@@ -408,6 +590,66 @@ def check_video_availability(video: Video, no_errors: bool = False) -> VideoInfo
         return VideoInfo(deleted_reason=error_msg)
 
 
+PROBE_BATCH_SIZE = 20
+
+
+def _is_probe_available(detail: dict) -> bool:
+    status = detail.get("status") or {}
+    return (
+        not status.get("is_delete")
+        and not status.get("is_prohibited")
+        and not status.get("private_status")
+    )
+
+
+def probe_videos_availability(
+    video_ids: list[str], limiter: TokenBucket | None = None
+) -> dict[str, VideoInfo]:
+    """Быстро проверяет доступность видео пачками через мобильный API TikTok.
+
+    Один запрос проверяет PROBE_BATCH_SIZE видео без загрузки страницы каждого.
+    Возвращаются только видео, доступность которых подтверждена. Остальные
+    (удалённые, приватные, отсутствующие в ответе, ошибки запроса) нужно
+    проверять через check_video_availability.
+
+    :param video_ids: Список ID видео
+    :param limiter: Ограничитель частоты запросов
+    :return: Словарь ID видео -> информация о доступном видео
+    """
+    ydl_opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "no_errors": True,
+    }
+    if TIKTOK_APP_INFO:
+        ydl_opts["extractor_args"] = {"tiktok": {"app_info": [TIKTOK_APP_INFO]}}
+
+    available: dict[str, VideoInfo] = {}
+    for i in range(0, len(video_ids), PROBE_BATCH_SIZE):
+        batch = video_ids[i : i + PROBE_BATCH_SIZE]
+        try:
+            info = yt_dlp_request(
+                dict(ydl_opts), url=f"tiktokprobe:{','.join(batch)}", limiter=limiter
+            )
+        except Exception as e:
+            logger.debug("Error probing videos: %s", get_error_message(e))
+            continue
+
+        details = {str(detail["aweme_id"]): detail for detail in info.get("entries", [])}
+        for video_id in batch:
+            detail = details.get(video_id)
+            if not detail or not _is_probe_available(detail):
+                continue
+            create_time = int_or_none(detail.get("create_time"))
+            available[video_id] = VideoInfo(
+                deleted_reason=None,
+                date=datetime.fromtimestamp(create_time) if create_time is not None else None,
+            )
+
+    logger.debug("Probe confirmed %s/%s videos available", len(available), len(video_ids))
+    return available
+
+
 def download_video(video: Video) -> VideoInfo | None:
     """Загружает видео TikTok.
 
@@ -417,7 +659,8 @@ def download_video(video: Video) -> VideoInfo | None:
     """
     ydl_opts = {
         "format": "best",
-        "outtmpl": str(Path(DOWNLOADS_DIR) / f"{video.id}.mp4"),
+        # шаблон не зависит от видео, чтобы один экземпляр YoutubeDL качал все видео
+        "outtmpl": str(Path(DOWNLOADS_DIR) / "%(id)s.mp4"),
         "quiet": False,
         "no_warnings": False,
     }
@@ -447,12 +690,21 @@ def download_video(video: Video) -> VideoInfo | None:
         return VideoInfo(deleted_reason=error_msg)
 
 
-def get_user_liked_videos(username: str) -> list[dict]:
-    """Получает список видео, которые пользователь отметил как понравившиеся.
+def _with_cursor(url: str, cursor: int | None) -> str:
+    """Передаёт экстрактору курсор, с которого начинать листать список"""
+    return smuggle_url(url, {"cursor": cursor}) if cursor else url
+
+
+def get_user_liked_videos(username: str, cursor: int | None = None) -> Iterable[dict]:
+    """Получает ленту видео, которые пользователь отметил как понравившиеся.
+
+    Лента ленивая: следующая страница запрашивается, только когда до неё дочитали,
+    поэтому её нельзя превращать в список целиком.
 
     :param username: Имя пользователя
+    :param cursor: Курсор страницы, с которой начать (по умолчанию с самых новых)
 
-    :return: Список видео
+    :return: Лента видео
     """
     ydl_opts = {
         "quiet": False,
@@ -460,7 +712,9 @@ def get_user_liked_videos(username: str) -> list[dict]:
     }
 
     try:
-        info = yt_dlp_request(ydl_opts, url=f"tiktokliked:{username}", use_cookies=True)
+        info = yt_dlp_request(
+            ydl_opts, url=_with_cursor(f"tiktokliked:{username}", cursor), use_cookies=True
+        )
         return info.get("entries", [])
     except Exception as e:
         error_msg = get_error_message(e)
@@ -468,12 +722,17 @@ def get_user_liked_videos(username: str) -> list[dict]:
         return []
 
 
-def get_user_saved_videos(_username: str | None = None) -> list[dict]:
-    """Получает список видео, которые пользователь сохранил.
+def get_user_saved_videos(
+    _username: str | None = None, cursor: int | None = None
+) -> Iterable[dict]:
+    """Получает ленту видео, которые пользователь сохранил.
+
+    Лента ленивая, как и в get_user_liked_videos.
 
     :param _username: Имя пользователя (не используется, нужен для совместимости с get_liked_videos)
+    :param cursor: Курсор страницы, с которой начать (по умолчанию с самых новых)
 
-    :return: Список видео
+    :return: Лента видео
     """
     ydl_opts = {
         "quiet": False,
@@ -485,7 +744,7 @@ def get_user_saved_videos(_username: str | None = None) -> list[dict]:
         return []
 
     try:
-        info = yt_dlp_request(ydl_opts, url=":tiktoksaved", use_cookies=True)
+        info = yt_dlp_request(ydl_opts, url=_with_cursor(":tiktoksaved", cursor), use_cookies=True)
         return info.get("entries", [])
     except Exception as e:
         error_msg = get_error_message(e)
@@ -493,17 +752,108 @@ def get_user_saved_videos(_username: str | None = None) -> list[dict]:
         return []
 
 
-def download_slideshow(video_id: str) -> bool:
-    logger.info("Processing slideshow: %s", video_id)
+def _slideshow_asset_name(data: dict) -> str:
+    """Имя файла ресурса слайдшоу, как в шаблоне filename для gallery_dl"""
+    if data["extension"] == "mp3":
+        return "audio.mp3"
+    return f"{data['num']}.{data['extension']}"
 
-    temp_files_cleanup()
 
-    # Загрузка изображений и аудио
-    try:
-        job.DownloadJob(f"https://www.tiktok.com/@/photo/{video_id}").run()
-    except Exception as e:
-        logger.error("Error downloading images for the slideshow: %s", e)
+def _resolve_slideshow_assets(extractor: Extractor) -> list[tuple[str, str]]:
+    """Получает ссылки на изображения и аудио слайдшоу одним запросом страницы
+
+    :param extractor: Экстрактор gallery_dl для слайдшоу
+    :return: Список пар (ссылка, имя файла)
+    """
+    return [
+        (message[1], _slideshow_asset_name(message[2]))
+        for message in extractor
+        if message[0] == Message.Url
+    ]
+
+
+def _download_asset(extractor: Extractor, url: str, path: Path) -> None:
+    """Скачивает один ресурс слайдшоу, повторяя запрос при ошибке
+
+    :param extractor: Экстрактор gallery_dl, его сессия содержит куки, прокси и заголовки
+    :param url: Ссылка на ресурс
+    :param path: Куда сохранить файл
+    """
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            # interval=False: пауза между запросами gallery_dl выстроила бы потоки в очередь.
+            # requests.Session экстрактора общая для потоков: CookieJar защищён блокировкой,
+            # а пул соединений urllib3 потокобезопасен
+            response = extractor.request(url, retries=0, interval=False, stream=True)
+            with open(path, "wb") as file:
+                for chunk in response.iter_content(64 * 1024):
+                    file.write(chunk)
+            return
+        except Exception as e:
+            if attempt >= MAX_RETRIES:
+                raise
+            logger.warning("Error downloading %s (%s/%s): %s", path.name, attempt, MAX_RETRIES, e)
+            time.sleep(attempt)
+
+
+def _download_slideshow_assets(video_id: str, work_dir: Path) -> bool:
+    """Скачивает изображения и аудио слайдшоу параллельно в SLIDESHOW_DOWNLOAD_WORKERS потоков
+
+    :param video_id: ID видео
+    :param work_dir: Рабочая директория задачи
+    :return: Удалось ли скачать все ресурсы
+    """
+    extractor = find_extractor(f"https://www.tiktok.com/@/photo/{video_id}")
+    assets = _resolve_slideshow_assets(extractor)
+    if not assets:
+        logger.error("No images were found for the slideshow %s", video_id)
         return False
 
-    # Создание слайдшоу
-    return render_slideshow(video_id)
+    workers = min(SLIDESHOW_DOWNLOAD_WORKERS, len(assets))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slideshow") as pool:
+        futures = [
+            pool.submit(_download_asset, extractor, url, work_dir / name) for url, name in assets
+        ]
+        for future in futures:
+            future.result()
+    return True
+
+
+def _set_base_directory(extractor: Extractor, base_directory: Path) -> None:
+    """Задаёт base-directory только для одного экстрактора gallery_dl.
+
+    Глобальный конфиг gallery_dl общий для всех потоков, поэтому опция подменяется
+    в config экземпляра, как gallery_dl сам делает для дочерних задач.
+
+    :param extractor: Экстрактор задачи
+    :param base_directory: Директория, куда сохранять файлы
+    """
+    extractor_config = extractor.config
+
+    def config(key: str, default: any = None) -> any:
+        if key == "base-directory":
+            return str(base_directory)
+        return extractor_config(key, default)
+
+    extractor.config = config
+
+
+def download_slideshow(video_id: str) -> bool:
+    logger.info("Processing slideshow: %s", video_id)
+
+    with workspace(video_id) as work_dir:
+        # Загрузка изображений и аудио
+        try:
+            if SLIDESHOW_DOWNLOAD_WORKERS:
+                if not _download_slideshow_assets(video_id, work_dir):
+                    return False
+            else:
+                download_job = job.DownloadJob(f"https://www.tiktok.com/@/photo/{video_id}")
+                _set_base_directory(download_job.extractor, work_dir)
+                download_job.run()
+        except Exception as e:
+            logger.error("Error downloading images for the slideshow: %s", e)
+            return False
+
+        # Создание слайдшоу
+        return render_slideshow(video_id, work_dir)
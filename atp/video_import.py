@@ -7,19 +7,24 @@
 - Запуск процесса скачивания
 """
 
+import hashlib
+import itertools
 import json
 import logging
 import os
 import sys
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from datetime import datetime
 from pathlib import Path
 from typing import Literal
 
+from sqlalchemy.orm import Session
+
 from atp import crud
 from atp.database import get_db_session, run_migrations
 from atp.download import download_new_videos
+from atp.json_stream import JsonStream
 from atp.models import Video, VideoInfo
 from atp.settings import (
     DOWNLOAD_LIKED_VIDEOS,
@@ -27,64 +32,186 @@ from atp.settings import (
     TIKTOK_DATA_FILE,
     TIKTOK_USER,
 )
-from atp.tiktok import get_user_liked_videos, get_user_saved_videos
+from atp.tiktok import close_ydl_pool, get_user_liked_videos, get_user_saved_videos
 
 logger = logging.getLogger(__name__)
 
 
-def parse_tiktok_json_file(file: str) -> list[VideoInfo] | None:
-    """Загружает список видео из JSON-файла экспорта TikTok.
+# Ключ app_state с отпечатком последнего импортированного файла экспорта
+IMPORT_FILE_STATE_KEY = "import_file_fingerprint"
 
-    :param file: Путь к JSON-файлу с данными экспорта
+# Сколько самых новых видео запоминать как отметку, до которой импортировать из TikTok
+# (несколько, на случай если с самого нового видео сняли лайк)
+IMPORT_MARK_SIZE = 10
+
+# Разделы экспорта с активностью пользователя (в разных версиях экспорта называются по-разному)
+ACTIVITY_SECTIONS = ("Likes and Favorites", "Your Activity", "Activity")
+
+
+def iter_tiktok_json_file(file: str) -> Iterator[VideoInfo]:
+    """Потоково читает видео из JSON-файла экспорта TikTok.
 
-    :return: Список объектов VideoInfo
+    Разбираются только списки лайкнутых и сохранённых видео, остальные разделы
+    (история просмотров, комментарии, сообщения) пропускаются без загрузки в память.
+    Одно и то же видео может встретиться несколько раз (например, лайкнутое и сохранённое).
+
+    :param file: Путь к JSON-файлу с данными экспорта
+    :raises KeyError: Если в файле нет нужного списка видео
+    :raises ValueError: Если файл не является корректным JSON
+    :return: Генератор объектов VideoInfo в порядке файла
     """
-    with open(file, encoding="utf-8") as f:
-        data = json.load(f)
+    # Раздел -> (ключ списка, liked, saved)
+    sources = {}
+    if DOWNLOAD_LIKED_VIDEOS:
+        sources["Like List"] = ("ItemFavoriteList", True, False)
+    if DOWNLOAD_SAVED_VIDEOS:
+        sources["Favorite Videos"] = ("FavoriteVideoList", False, True)
+    found: set[str] = set()
 
+    with open(file, encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for section in stream.iter_object():
+            if found or section not in ACTIVITY_SECTIONS or stream.peek() != "{":
+                stream.skip_value()
+                continue
+
+            for name in stream.iter_object():
+                if name not in sources or stream.peek() != "{":
+                    stream.skip_value()
+                    continue
+
+                list_key, liked, saved = sources[name]
+                for key in stream.iter_object():
+                    if key != list_key or stream.peek() != "[":
+                        stream.skip_value()
+                        continue
+
+                    found.add(name)
+                    for _ in stream.iter_array():
+                        video = stream.read_value()
+                        date_str = video.get("date") or video["Date"]
+                        video_link = video.get("link") or video["Link"]
+                        yield VideoInfo(
+                            id=video_link.split("/")[-2],
+                            date=datetime.fromisoformat(date_str),
+                            liked=liked,
+                            saved=saved,
+                        )
+
+    if missing := set(sources) - found:
+        raise KeyError(", ".join(sorted(missing)))
+
+
+def _merge_sources(videos: Iterable[VideoInfo]) -> dict[str, VideoInfo]:
+    """Объединяет повторы одного видео, складывая источники"""
+    merged: dict[str, VideoInfo] = {}
+    for video in videos:
+        info = merged.get(video.id)
+        if info:
+            info.liked = info.liked or video.liked
+            info.saved = info.saved or video.saved
+        else:
+            merged[video.id] = video
+    return merged
+
+
+def _batched(videos: Iterable[VideoInfo], size: int) -> Iterator[list[VideoInfo]]:
+    batch: list[VideoInfo] = []
+    for video in videos:
+        batch.append(video)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _import_chunk(db: Session, chunk: list[VideoInfo]) -> tuple[int, int]:
+    """Добавляет новые видео из пачки и обновляет источники существующих.
+
+    :return: Количество добавленных и обновлённых видео
+    """
+    videos = _merge_sources(chunk)
+    db_sources = crud.get_video_sources(db, list(videos))
+
+    videos_to_add: list[VideoInfo] = []
+    videos_to_update: list[VideoInfo] = []
+    for video in videos.values():
+        if video.id not in db_sources:
+            videos_to_add.append(video)
+            continue
+        liked, saved = db_sources[video.id]
+        if (video.liked and not liked) or (video.saved and not saved):
+            # Никогда не обновляем liked и saved на False
+            videos_to_update.append(video)
+
+    if videos_to_add:
+        crud.add_videos_bulk(db, videos_to_add)
+    if videos_to_update:
+        crud.update_video_sources_bulk(db, videos_to_update)
+    return len(videos_to_add), len(videos_to_update)
+
+
+def _file_sha256(file: str) -> str:
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        while data := f.read(1024 * 1024):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _file_fingerprint(file: str) -> dict | None:
+    """Возвращает отпечаток файла экспорта без хеша содержимого.
+
+    В отпечаток входят и включённые источники: если включить, например,
+    DOWNLOAD_SAVED_VIDEOS, файл нужно импортировать заново.
+
+    :param file: Путь к файлу
+    :return: Словарь с размером, временем изменения и источниками или None при ошибке
+    """
     try:
-        activity = (
-            data.get("Likes and Favorites") or data.get("Your Activity") or data.get("Activity")
-        )
-        saved_videos = (
-            activity["Favorite Videos"]["FavoriteVideoList"] if DOWNLOAD_SAVED_VIDEOS else []
-        )
-        liked_videos = (
-            activity["Like List"]["ItemFavoriteList"] if DOWNLOAD_LIKED_VIDEOS else []
-        )  # fmt: skip
-    except (KeyError, TypeError) as e:
-        logger.error("JSON error: %s", e)
+        stat = os.stat(file)
+    except OSError:
         return None
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "liked": DOWNLOAD_LIKED_VIDEOS,
+        "saved": DOWNLOAD_SAVED_VIDEOS,
+    }
 
-    videos: dict[str, VideoInfo] = {}
-    for source_videos, liked, saved in (
-        (liked_videos, True, False),
-        (saved_videos, False, True),
-    ):
-        for video in source_videos:
-            date_str = video.get("date") or video["Date"]
-            video_link = video.get("link") or video["Link"]
-
-            date = datetime.fromisoformat(date_str)
-            video_id = video_link.split("/")[-2]
-            info = videos.get(video_id)
-            if info:
-                info.liked = info.liked or liked
-                info.saved = info.saved or saved
-            else:
-                videos[video_id] = VideoInfo(id=video_id, date=date, liked=liked, saved=saved)
 
-    return sorted(videos.values(), key=lambda v: v.date)
+def _is_imported(db: Session, file: str, fingerprint: dict) -> bool:
+    """Проверяет, импортирован ли уже файл с таким отпечатком.
+
+    Если размер и время изменения совпадают с сохранёнными, файл не читается.
+    Иначе сравнивается хеш содержимого (например, файл скопировали заново без изменений),
+    и он добавляется в отпечаток для сохранения после импорта.
+
+    :param db: Сессия базы данных
+    :param file: Путь к файлу
+    :param fingerprint: Отпечаток из _file_fingerprint
+    :return: True, если файл можно не импортировать
+    """
+    stored = json.loads(crud.get_state(db, IMPORT_FILE_STATE_KEY) or "{}")
+    if stored and all(stored.get(key) == value for key, value in fingerprint.items()):
+        return True
+
+    fingerprint["sha256"] = _file_sha256(file)
+    same_content = stored.get("sha256") == fingerprint["sha256"] and all(
+        stored.get(key) == fingerprint[key] for key in ("liked", "saved")
+    )
+    if same_content:
+        crud.set_state(db, IMPORT_FILE_STATE_KEY, json.dumps(fingerprint))
+    return same_content
 
 
 def import_from_file() -> None:
     db = get_db_session()
 
     try:
-        db_videos: dict[str, Video] = {v.id: v for v in crud.get_videos(db)}
-
         if not os.path.exists(TIKTOK_DATA_FILE):
-            if db_videos:
+            if crud.count_videos(db):
                 logger.info("File %s does not exist, skipping import", Path(TIKTOK_DATA_FILE).name)
             else:
                 logger.error(
@@ -96,36 +223,44 @@ def import_from_file() -> None:
                 )
             return
 
-        videos = parse_tiktok_json_file(TIKTOK_DATA_FILE)
-        if not videos:
-            logger.warning(
-                "No videos were imported from %s\n"
-                "Check DOWNLOAD_SAVED_VIDEOS/DOWNLOAD_LIKED_VIDEOS settings "
-                "or re-request ALL your data from TikTok\n"
-                "https://github.com/skrepkaq/ATP#экспорт-данных-из-tiktok",
+        fingerprint = _file_fingerprint(TIKTOK_DATA_FILE)
+        if fingerprint and _is_imported(db, TIKTOK_DATA_FILE, fingerprint):
+            logger.info(
+                "File %s has not changed since last import, skipping",
                 Path(TIKTOK_DATA_FILE).name,
             )
             return
 
+        # Читаем файл потоково и пишем в базу пачками, не держа весь экспорт в памяти
+        parsed = added = updated = 0
         try:
-            videos_to_add: list[VideoInfo] = []
-            videos_to_update: list[VideoInfo] = []
-
-            for video in videos:
-                db_video = db_videos.get(video.id)
-                if not db_video:
-                    videos_to_add.append(video)
-                elif (video.liked and not db_video.liked) or (video.saved and not db_video.saved):
-                    # Никогда не обновляем liked и saved на False
-                    videos_to_update.append(video)
-            if videos_to_add:
-                crud.add_videos_bulk(db, videos_to_add)
-                logger.info("Added %s videos", len(videos_to_add))
-            if videos_to_update:
-                crud.update_video_sources_bulk(db, videos_to_update)
-                logger.info("Updated sources for %s videos", len(videos_to_update))
+            for chunk in _batched(iter_tiktok_json_file(TIKTOK_DATA_FILE), crud.BULK_CHUNK_SIZE):
+                parsed += len(chunk)
+                chunk_added, chunk_updated = _import_chunk(db, chunk)
+                added += chunk_added
+                updated += chunk_updated
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error("JSON error: %s", e)
+            return
         except Exception as e:
             logger.exception("Error importing videos: %s", e)
+            return
+        finally:
+            if added:
+                logger.info("Added %s videos", added)
+            if updated:
+                logger.info("Updated sources for %s videos", updated)
+
+        if not parsed:
+            logger.warning(
+                "No videos were imported from %s\n"
+                "Check DOWNLOAD_SAVED_VIDEOS/DOWNLOAD_LIKED_VIDEOS settings "
+                "or re-request ALL your data from TikTok\n"
+                "https://github.com/skrepkaq/ATP#экспорт-данных-из-tiktok",
+                Path(TIKTOK_DATA_FILE).name,
+            )
+        elif fingerprint:
+            crud.set_state(db, IMPORT_FILE_STATE_KEY, json.dumps(fingerprint))
 
     except Exception as e:
         logger.exception("Error importing from file: %s", e)
@@ -133,14 +268,93 @@ def import_from_file() -> None:
         db.close()
 
 
+def _newest(*ids: list[str]) -> list[str]:
+    """Объединяет списки ID от новых к старым и оставляет IMPORT_MARK_SIZE самых новых"""
+    return list(dict.fromkeys(itertools.chain(*ids)))[:IMPORT_MARK_SIZE]
+
+
+def _import_entries(
+    db: Session,
+    entries: Iterable[dict],
+    source: Literal["liked", "saved"],
+    videos: dict[str, Video],
+    existing_same_source_videos: set[str],
+    stop_ids: set[str],
+    progress: dict,
+    resume_cursor: int | None = None,
+) -> None:
+    """Импортирует видео из ленты TikTok, пока не дойдёт до уже известных.
+
+    Ленту читаем лениво: после остановки следующие страницы не запрашиваются.
+    Останавливаемся на видео из stop_ids (отметка прошлого импорта), а если отметки нет
+    или её видео пропали из ленты - по эвристикам из import_from_tiktok_source.
+
+    :param db: Сессия базы данных
+    :param entries: Лента видео
+    :param source: Источник видео (liked или saved)
+    :param videos: Видео, которые были в БД до начала импорта
+    :param existing_same_source_videos: ID видео из БД с тем же источником
+    :param stop_ids: ID видео, на которых закончился прошлый импорт
+    :param progress: Сюда пишутся количество полученных видео (seen),
+        ID импортированных видео (ids) и курсор их страницы (cursor)
+    :param resume_cursor: Курсор страницы, на которой остановился прерванный импорт.
+        Её видео уже импортированы, поэтому не учитываются эвристиками остановки
+    """
+    new_videos: list[str] = []
+    for entry in entries:
+        progress["seen"] += 1
+        video = VideoInfo(
+            id=entry["id"],
+            date=datetime.fromtimestamp(entry["timestamp"]),
+            liked=source == "liked",
+            saved=source == "saved",
+        )
+        if video.id in stop_ids:
+            logger.info("Reached %s videos from the previous import, exiting", source)
+            return
+        if resume_cursor is None or entry.get("page_cursor") != resume_cursor:
+            new_videos.append(video.id)
+
+        if video.id not in videos:
+            logger.info("Importing video %s", video.id)
+            crud.add_video_to_db(
+                db,
+                video.id,
+                video.date,
+                liked=video.liked,
+                saved=video.saved,
+            )
+        elif video.id not in existing_same_source_videos:
+            logger.info("Updating video sources for %s", video.id)
+            crud.update_video(
+                db,
+                videos[video.id],
+                update_last_checked=False,
+                liked=video.liked,
+                saved=video.saved,
+            )
+        progress["ids"].append(video.id)
+        progress["cursor"] = entry.get("page_cursor") or progress["cursor"]
+
+        if len(new_videos) >= 10 and set(new_videos[-10:]).issubset(existing_same_source_videos):
+            # Все 10 последних видео c тем же источником уже есть в БД, ливаем
+            logger.info("No new %s videos, exiting", source)
+            return
+        if len(new_videos) >= 100 and set(new_videos[-100:]).issubset(videos):
+            # Все 100 последних видео уже есть в БД, ливаем
+            logger.info("No new %s videos, exiting (long import)", source)
+            return
+
+
 def import_from_tiktok_source(
-    importer: Callable[[str], list[dict]], source: Literal["liked", "saved"]
+    importer: Callable[..., Iterable[dict]], source: Literal["liked", "saved"]
 ) -> None:
     """Импортирует видео из источника TikTok.
-    :param importer: Функция для получения списка видео
+    :param importer: Функция для получения ленты видео (username, cursor=None)
     :param source: Источник видео (liked или saved)
 
-    Импортируем до тех пор пока видео не закончатся
+    Импортируем до тех пор пока видео не закончатся,
+    или пока не дойдём до самых новых видео прошлого импорта (хранятся в БД),
     или пока не наткнёмся на 10 видео подряд которые уже есть в БД с тем же источником
       (видео уже были импортированы как лайкнутые/сохранённые)
     или пока не наткнёмся на 100 видео подряд которые уже есть в БД
@@ -150,12 +364,16 @@ def import_from_tiktok_source(
        Тогда те самые N видео не будут импортированы.
        Если бы мы импортировали пока все статусы не будут актуальны
        первый импорт, когда у видео нет статуса, занял бы вечность)
+
+    Если импорт прервался на середине, запоминаем самые новые видео и курсор страницы,
+    до которой дошли. В следующий раз импортируем новые видео до этой отметки,
+    а затем продолжаем с сохранённого курсора до отметки прошлого успешного импорта.
     """
     db = get_db_session()
+    state_key = f"tiktok_import:{source}"
 
     try:
         videos = {v.id: v for v in crud.get_videos(db)}
-        existing_videos: set[str] = set(videos.keys())
         existing_same_source_videos: set[str] = {
             id for id, video in videos.items() if getattr(video, source) is True
         }
@@ -164,45 +382,61 @@ def import_from_tiktok_source(
             logger.info("No %s videos in DB. Please import using import_from_file.py", source)
             return
 
-        new_videos: list[str] = []
-        for video in importer(TIKTOK_USER):
-            video = VideoInfo(
-                id=video["id"],
-                date=datetime.fromtimestamp(video["timestamp"]),
-                liked=source == "liked",
-                saved=source == "saved",
-            )
-            new_videos.append(video.id)
+        state = json.loads(crud.get_state(db, state_key) or "{}")
+        newest_ids: list[str] = state.get("newest_ids", [])
+        pending: dict | None = state.get("pending")
 
-            if video.id not in existing_videos:
-                logger.info("Importing video %s", video.id)
-                crud.add_video_to_db(
-                    db,
-                    video.id,
-                    video.date,
-                    liked=video.liked,
-                    saved=video.saved,
-                )
-            elif video.id not in existing_same_source_videos:
-                logger.info("Updating video sources for %s", video.id)
-                crud.update_video(
+        # Сначала от самых новых видео до отметки прошлого (или прерванного) импорта
+        head = {"seen": 0, "ids": [], "cursor": None}
+        tail = {"seen": 0, "ids": [], "cursor": None}
+        stage = head
+        try:
+            with crud.batched_commits(db):
+                stop_ids = set(pending["newest_ids"] if pending else newest_ids)
+                _import_entries(
                     db,
-                    videos[video.id],
-                    update_last_checked=False,
-                    liked=video.liked,
-                    saved=video.saved,
+                    importer(TIKTOK_USER),
+                    source,
+                    videos,
+                    existing_same_source_videos,
+                    stop_ids,
+                    head,
                 )
-
-            if len(new_videos) >= 10 and set(new_videos[-10:]).issubset(
-                existing_same_source_videos
-            ):
-                # Все 10 последних видео c тем же источником уже есть в БД, ливаем
-                logger.info("No new %s videos, exiting", source)
-                return
-            if len(new_videos) >= 100 and set(new_videos[-100:]).issubset(existing_videos):
-                # Все 100 последних видео уже есть в БД, ливаем
-                logger.info("No new %s videos, exiting (long import)", source)
-                return
+                if pending:
+                    # Затем продолжаем прерванный импорт с сохранённого курсора
+                    logger.info("Resuming interrupted %s import", source)
+                    stage = tail
+                    _import_entries(
+                        db,
+                        importer(TIKTOK_USER, cursor=pending["cursor"]),
+                        source,
+                        videos,
+                        existing_same_source_videos,
+                        set(newest_ids),
+                        tail,
+                        resume_cursor=pending["cursor"],
+                    )
+        except Exception:
+            if stage is tail:
+                pending = {
+                    "newest_ids": _newest(head["ids"], pending["newest_ids"]),
+                    "cursor": tail["cursor"] or pending["cursor"],
+                }
+            elif not pending and head["ids"] and head["cursor"]:
+                pending = {"newest_ids": _newest(head["ids"]), "cursor": head["cursor"]}
+            crud.set_state(
+                db, state_key, json.dumps({"newest_ids": newest_ids, "pending": pending})
+            )
+            raise
+
+        if pending and not tail["seen"]:
+            # Лента после курсора пустая - скорее всего, ошибка запроса, продолжим в другой раз
+            logger.warning("Could not resume interrupted %s import, will retry later", source)
+            pending["newest_ids"] = _newest(head["ids"], pending["newest_ids"])
+        else:
+            newest_ids = _newest(head["ids"], pending["newest_ids"] if pending else [], newest_ids)
+            pending = None
+        crud.set_state(db, state_key, json.dumps({"newest_ids": newest_ids, "pending": pending}))
     except Exception as e:
         logger.exception("Error importing %s videos from TikTok: %s", source, e)
     finally:
@@ -210,10 +444,14 @@ def import_from_tiktok_source(
 
 
 def import_from_tiktok() -> None:
-    if DOWNLOAD_LIKED_VIDEOS:
-        import_from_tiktok_source(get_user_liked_videos, "liked")
-    if DOWNLOAD_SAVED_VIDEOS:
-        import_from_tiktok_source(get_user_saved_videos, "saved")
+    try:
+        if DOWNLOAD_LIKED_VIDEOS:
+            import_from_tiktok_source(get_user_liked_videos, "liked")
+        if DOWNLOAD_SAVED_VIDEOS:
+            import_from_tiktok_source(get_user_saved_videos, "saved")
+    finally:
+        # Запросы ленты идут с cookies: при закрытии YoutubeDL сохраняет обновлённые cookies
+        close_ydl_pool()
 
 
 def deprecated_run() -> None:
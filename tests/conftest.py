@@ -24,6 +24,25 @@ def disable_tiktok_availability_check(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr("atp.settings.CHECK_TIKTOK_AVAILABILITY", False)
 
 
+@pytest.fixture(autouse=True)
+def disable_check_rate_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("atp.settings.CHECK_RATE_LIMIT", 0)
+
+
+@pytest.fixture(autouse=True)
+def disable_telegram_rate_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("atp.settings.TELEGRAM_RATE_LIMIT", 0)
+
+
+@pytest.fixture(autouse=True)
+def reset_ydl_pool() -> Generator[None, None, None]:
+    from atp import tiktok
+
+    tiktok.close_ydl_pool()
+    yield
+    tiktok.close_ydl_pool()
+
+
 @pytest.fixture
 def tmp_workspace(tmp_path: Path) -> Path:
     root = tmp_path / "workspace"
@@ -1,27 +1,38 @@
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
-from atp import app, crud, video_import
+from atp import app, check_availability, crud, database, download, scheduler, video_import
+from atp.database import Base
+from atp.models import Video, VideoStatus, VideoType
 
 
-class _FakeJob:
+class _FakeScheduler:
+    """Записывает зарегистрированные задачи вместо запуска"""
+
     def __init__(self, scheduled: list):
         self.scheduled = scheduled
-        self.ts = None
 
-    def at(self, ts: str):
-        self.ts = ts
-        return self
+    def hourly(self, name: str, func, minute: int) -> None:
+        self.scheduled.append((name, func.__name__, f"{minute:02d}:00"))
+
+    def loop(self, name: str, func, interval=None, wakeup=None) -> None:  # noqa: ARG002
+        self.scheduled.append((name, func.__name__, interval))
+
+    async def run(self) -> None:
+        self.scheduled.append("run")
 
-    def do(self, fn):
-        self.scheduled.append((self.ts, fn.__name__))
-        return self
 
-    @property
-    def hour(self):
-        return self
+def _patch_scheduler(monkeypatch: pytest.MonkeyPatch) -> list:
+    scheduled: list = []
+    monkeypatch.setattr(app, "Scheduler", lambda: _FakeScheduler(scheduled))
+    return scheduled
 
 
 @pytest.mark.integration
@@ -29,27 +40,36 @@ def test_run_scheduler_registers_jobs_and_bootstraps(
     sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
 ) -> None:
     called: list[str] = []
-    scheduled: list[tuple[str, str]] = []
-    monkeypatch.setattr(app, "run_download_from_file", lambda: None)
+    monkeypatch.setattr(app, "import_from_file", lambda: called.append("import_from_file"))
     monkeypatch.setattr(app, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(crud, "get_videos", lambda _db: [object()])
     monkeypatch.setattr(app, "run_migrations", lambda: called.append("migrations"))
+    monkeypatch.setattr(app, "check_database_settings", lambda: called.append("database"))
+    monkeypatch.setattr(app, "temp_files_cleanup", lambda: called.append("cleanup"))
+    monkeypatch.setattr(app, "cache_cleanup", lambda: called.append("cache_cleanup"))
     monkeypatch.setattr(app, "discover_chat_id", lambda: called.append("discover"))
     monkeypatch.setattr(app, "TIKTOK_USER", "u")
-    monkeypatch.setattr(app.schedule, "every", lambda: _FakeJob(scheduled))
-    monkeypatch.setattr(
-        app.schedule,
-        "run_pending",
-        lambda: (_ for _ in ()).throw(KeyboardInterrupt()),
-    )
-    monkeypatch.setattr(app.time, "sleep", lambda _s: None)
-
-    with pytest.raises(KeyboardInterrupt):
-        app.run_scheduler()
-
-    assert called == ["migrations", "discover"]
-    assert ("00:00", "check_video_batch") in scheduled
-    assert ("30:00", "run_download_from_tiktok") in scheduled
+    monkeypatch.setattr(app, "DOWNLOAD_LIKED_VIDEOS", True)
+    monkeypatch.setattr(app.settings, "OUTBOX_POLL_INTERVAL", 15)
+    scheduled = _patch_scheduler(monkeypatch)
+
+    app.run_scheduler()
+
+    assert called == [
+        "migrations",
+        "database",
+        "cleanup",
+        "cache_cleanup",
+        "discover",
+        "import_from_file",
+    ]
+    assert scheduled == [
+        ("download", "download_new_videos", None),
+        ("check", "check_video_batch", "00:00"),
+        ("notify", "send_outbox", 15),
+        ("import", "run_import_from_tiktok", "30:00"),
+        "run",
+    ]
 
 
 @pytest.mark.integration
@@ -74,27 +94,19 @@ def test_run_scheduler_without_tiktok_user_warns_and_skips_tiktok_job(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     called: list[str] = []
-    scheduled: list[tuple[str, str]] = []
     monkeypatch.setattr(app, "run_migrations", lambda: called.append("migrations"))
     monkeypatch.setattr(app, "discover_chat_id", lambda: called.append("discover"))
-    monkeypatch.setattr(app, "run_download_from_file", lambda: called.append("download_from_file"))
+    monkeypatch.setattr(app, "import_from_file", lambda: called.append("import_from_file"))
     monkeypatch.setattr(app, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(crud, "get_videos", lambda _db: [object()])
     monkeypatch.setattr(app, "TIKTOK_USER", "")
-    monkeypatch.setattr(app.schedule, "every", lambda: _FakeJob(scheduled))
-    monkeypatch.setattr(
-        app.schedule,
-        "run_pending",
-        lambda: (_ for _ in ()).throw(KeyboardInterrupt()),
-    )
-    monkeypatch.setattr(app.time, "sleep", lambda _s: None)
+    scheduled = _patch_scheduler(monkeypatch)
 
-    with pytest.raises(KeyboardInterrupt):
-        app.run_scheduler()
+    app.run_scheduler()
 
-    assert called == ["migrations", "discover", "download_from_file"]
-    assert ("00:00", "check_video_batch") in scheduled
-    assert not any(job_name == "run_download_from_tiktok" for _ts, job_name in scheduled)
+    assert called == ["migrations", "discover", "import_from_file"]
+    assert ("check", "check_video_batch", "00:00") in scheduled
+    assert not any(job[0] == "import" for job in scheduled[:-1])
 
 
 @pytest.mark.integration
@@ -103,29 +115,21 @@ def test_run_scheduler_without_download_liked_and_saved_warns_and_skips_tiktok_j
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     called: list[str] = []
-    scheduled: list[tuple[str, str]] = []
     monkeypatch.setattr(app, "DOWNLOAD_LIKED_VIDEOS", False)
     monkeypatch.setattr(app, "DOWNLOAD_SAVED_VIDEOS", False)
     monkeypatch.setattr(app, "run_migrations", lambda: called.append("migrations"))
     monkeypatch.setattr(app, "discover_chat_id", lambda: called.append("discover"))
-    monkeypatch.setattr(app, "run_download_from_file", lambda: called.append("download_from_file"))
+    monkeypatch.setattr(app, "import_from_file", lambda: called.append("import_from_file"))
     monkeypatch.setattr(app, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(crud, "get_videos", lambda _db: [object()])
     monkeypatch.setattr(app, "TIKTOK_USER", "u")
-    monkeypatch.setattr(app.schedule, "every", lambda: _FakeJob(scheduled))
-    monkeypatch.setattr(
-        app.schedule,
-        "run_pending",
-        lambda: (_ for _ in ()).throw(KeyboardInterrupt()),
-    )
-    monkeypatch.setattr(app.time, "sleep", lambda _s: None)
+    scheduled = _patch_scheduler(monkeypatch)
 
-    with pytest.raises(KeyboardInterrupt):
-        app.run_scheduler()
+    app.run_scheduler()
 
-    assert called == ["migrations", "discover", "download_from_file"]
-    assert ("00:00", "check_video_batch") in scheduled
-    assert not any(job_name == "run_download_from_tiktok" for _ts, job_name in scheduled)
+    assert called == ["migrations", "discover", "import_from_file"]
+    assert ("check", "check_video_batch", "00:00") in scheduled
+    assert not any(job[0] == "import" for job in scheduled[:-1])
 
 
 @pytest.mark.integration
@@ -135,7 +139,7 @@ def test_run_scheduler_exits_when_no_videos_after_bootstrap(
 ) -> None:
     monkeypatch.setattr(app, "run_migrations", lambda: None)
     monkeypatch.setattr(app, "discover_chat_id", lambda: None)
-    monkeypatch.setattr(app, "run_download_from_file", lambda: None)
+    monkeypatch.setattr(app, "import_from_file", lambda: None)
     monkeypatch.setattr(app, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(crud, "get_videos", lambda _db: [])
 
@@ -156,3 +160,86 @@ def test_main_default_runs_scheduler(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(app, "run_scheduler", lambda: called.append("scheduler"))
     app.main()
     assert called == ["scheduler"]
+
+
+@pytest.mark.integration
+def test_scheduled_download_and_check_write_to_database_at_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Проверка пишет в базу, пока скачивание ждёт следующее видео посреди своей пачки"""
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "busy_timeout", 200)
+    engine = database.configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}"))
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with make_session() as db:
+        date = datetime(2025, 1, 1)
+        db.add_all(
+            [
+                Video(id="new1", date=date, status=VideoStatus.NEW),
+                Video(id="new2", date=date, status=VideoStatus.NEW),
+                Video(id="old", date=date, status=VideoStatus.SUCCESS),
+            ]
+        )
+        db.commit()
+
+    monkeypatch.setattr(download, "get_db_session", make_session)
+    monkeypatch.setattr(check_availability, "get_db_session", make_session)
+    monkeypatch.setattr(download, "DOWNLOAD_WORKERS", 2)
+    monkeypatch.setattr(download, "HOPE_MODE", False)
+    monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
+    monkeypatch.setattr(scheduler, "WAKEUP_POLL_INTERVAL", 0.01)
+
+    saved, checked = threading.Event(), threading.Event()
+    downloaded, check_done = threading.Event(), threading.Event()
+    save_result = download._save_result
+
+    def save_and_signal(db: Session, video: Video, result) -> bool:
+        success = save_result(db, video, result)
+        saved.set()
+        return success
+
+    def fake_download(video: Video) -> SimpleNamespace:
+        if video.id == "new2":
+            # Первое видео уже в пачке скачивания, второе ждёт, пока проверка запишет своё
+            checked.wait(timeout=5)
+        return SimpleNamespace(name="n", author="a", type=VideoType.VIDEO, deleted_reason=None)
+
+    def fake_check(_video: Video, **_kwargs) -> SimpleNamespace:
+        saved.wait(timeout=5)
+        return SimpleNamespace(deleted_reason=None)
+
+    monkeypatch.setattr(download, "_save_result", save_and_signal)
+    monkeypatch.setattr(download, "download_video", fake_download)
+    monkeypatch.setattr(check_availability, "check_video_availability", fake_check)
+
+    def run_download() -> None:
+        download.download_new_videos()
+        downloaded.set()
+
+    def run_check() -> None:
+        check_availability.check_video_batch()
+        checked.set()
+        check_done.set()
+
+    sched = scheduler.Scheduler()
+    sched.loop("download", run_download, interval=3600)
+    sched.loop("check", run_check, interval=3600)
+
+    async def run_until_done() -> None:
+        task = asyncio.create_task(sched.run())
+        while not (downloaded.is_set() and check_done.is_set()):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(asyncio.wait_for(run_until_done(), timeout=10))
+
+        with make_session() as db:
+            videos = {video.id: video for video in crud.get_videos(db)}
+        assert videos["new1"].status == VideoStatus.SUCCESS
+        assert videos["new2"].status == VideoStatus.SUCCESS
+        assert videos["old"].last_checked is not None
+    finally:
+        engine.dispose()
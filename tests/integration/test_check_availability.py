@@ -1,39 +1,12 @@
+import threading
 from datetime import datetime, timedelta
-from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
 from sqlalchemy.orm import Session
 
 from atp import check_availability, crud, settings
-from atp.models import Video, VideoStatus
-
-
-@pytest.mark.integration
-def test_handle_unavailable_splits_large_video_and_marks_deleted(
-    sqlite_session: Session,
-    downloads_dir: Path,
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    video = Video(id="big", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS, name="name")
-    sqlite_session.add(video)
-    sqlite_session.commit()
-
-    video_file = downloads_dir / "big.mp4"
-    video_file.write_bytes(b"x" * int(1.5 * 1024 * 1024))
-
-    monkeypatch.setattr(settings, "DOWNLOADS_DIR", str(downloads_dir))
-    monkeypatch.setattr(settings, "TELEGRAM_MAX_VIDEO_SIZE", 1024 * 1024)
-    monkeypatch.setattr(check_availability, "split_video", lambda *_args, **_kwargs: [video_file])
-    monkeypatch.setattr(check_availability, "_send_multipart_video", lambda *_args, **_kwargs: 42)
-    monkeypatch.setattr(check_availability, "temp_files_cleanup", lambda: None)
-
-    ok = check_availability._handle_unavailable(sqlite_session, video)
-    assert ok is True
-
-    refreshed = crud.get_videos(sqlite_session, [VideoStatus.DELETED])[0]
-    assert refreshed.message_id == 42
-    assert refreshed.status == VideoStatus.DELETED
+from atp.models import OutboxEntry, Video, VideoStatus
 
 
 @pytest.mark.integration
@@ -55,13 +28,8 @@ def test_check_video_batch_handles_unavailable_and_restored(
 
     monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
-    monkeypatch.setattr(
-        check_availability,
-        "_handle_unavailable",
-        lambda db, video: crud.update_video(
-            db, video=video, message_id=1, status=VideoStatus.DELETED
-        ),
-    )
+    woken: list[bool] = []
+    monkeypatch.setattr(check_availability, "wake_outbox_sender", lambda: woken.append(True))
     monkeypatch.setattr(
         check_availability,
         "_handle_restored",
@@ -70,7 +38,7 @@ def test_check_video_batch_handles_unavailable_and_restored(
         ),
     )
 
-    def fake_check(video: Video):
+    def fake_check(video: Video, **_kwargs):
         if video.id == "to_delete":
             return SimpleNamespace(deleted_reason="not found")
         return SimpleNamespace(deleted_reason=None)
@@ -79,14 +47,22 @@ def test_check_video_batch_handles_unavailable_and_restored(
 
     check_availability.check_video_batch()
 
-    videos = crud.get_videos(sqlite_session, [VideoStatus.SUCCESS, VideoStatus.DELETED])
+    videos = crud.get_videos(
+        sqlite_session, [VideoStatus.SUCCESS, VideoStatus.DELETED], order_by=Video.id
+    )
 
     assert len(videos) == 2
 
+    # Недоступное видео станет DELETED только после отправки уведомления
     assert videos[0].id == "to_delete"
-    assert videos[0].status == VideoStatus.DELETED
-    assert videos[0].message_id == 1
+    assert videos[0].status == VideoStatus.SUCCESS
+    assert videos[0].message_id is None
     assert videos[0].last_checked is not None
+    entries = sqlite_session.query(OutboxEntry).all()
+    assert [(entry.video_id, entry.deleted_reason) for entry in entries] == [
+        ("to_delete", "not found")
+    ]
+    assert woken == [True]
 
     assert videos[1].id == "to_restore"
     assert videos[1].status == VideoStatus.SUCCESS
@@ -95,57 +71,86 @@ def test_check_video_batch_handles_unavailable_and_restored(
 
 
 @pytest.mark.integration
-def test_check_video_batch_no_changes_on_handlers_errors(
+def test_check_video_batch_no_changes_on_restore_error(
     sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
 ) -> None:
-    sqlite_session.add_all(
-        [
-            Video(id="to_delete", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS),
-            Video(
-                id="to_restore",
-                date=datetime(2025, 1, 1),
-                status=VideoStatus.DELETED,
-                message_id=10,
-            ),
-        ]
+    sqlite_session.add(
+        Video(id="to_restore", date=datetime(2025, 1, 1), status=VideoStatus.DELETED, message_id=10)
     )
     sqlite_session.commit()
 
     monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
+    monkeypatch.setattr(check_availability, "_handle_restored", lambda _db, _video: False)
     monkeypatch.setattr(
         check_availability,
-        "_handle_unavailable",
-        lambda _db, _video: False,
+        "check_video_availability",
+        lambda _video, **_kwargs: SimpleNamespace(deleted_reason=None),
     )
+
+    check_availability.check_video_batch()
+
+    video = crud.get_videos(sqlite_session)[0]
+    assert video.status == VideoStatus.DELETED
+    assert video.message_id == 10
+    assert video.last_checked is None
+
+
+@pytest.mark.integration
+def test_check_video_batch_does_not_duplicate_queued_notifications(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sqlite_session.add(Video(id="gone", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS))
+    sqlite_session.commit()
+    crud.add_outbox_entry(sqlite_session, "gone", "first")
+    sqlite_session.query(OutboxEntry).one().message_ids = "[5]"
+    sqlite_session.commit()
+
+    monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
+    monkeypatch.setattr(check_availability, "wake_outbox_sender", lambda: None)
     monkeypatch.setattr(
         check_availability,
-        "_handle_restored",
-        lambda _db, _video: False,
+        "check_video_availability",
+        lambda _video, **_kwargs: SimpleNamespace(deleted_reason="second"),
     )
 
-    def fake_check(video: Video):
-        if video.id == "to_delete":
-            return SimpleNamespace(deleted_reason="not found")
-        return SimpleNamespace(deleted_reason=None)
+    check_availability.check_video_batch()
 
-    monkeypatch.setattr(check_availability, "check_video_availability", fake_check)
+    # Прогресс уже начатой отправки не теряется
+    entry = sqlite_session.query(OutboxEntry).one()
+    assert (entry.deleted_reason, entry.message_ids) == ("first", "[5]")
 
-    check_availability.check_video_batch()
 
-    videos = crud.get_videos(sqlite_session, [VideoStatus.SUCCESS, VideoStatus.DELETED])
+@pytest.mark.integration
+def test_check_video_batch_cancels_notification_when_video_is_back(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sqlite_session.add_all(
+        [
+            Video(id="back", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS),
+            Video(id="gone", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS),
+        ]
+    )
+    sqlite_session.commit()
+    crud.add_outbox_entry(sqlite_session, "back", "not found")
 
-    assert len(videos) == 2
+    monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
+    monkeypatch.setattr(check_availability, "wake_outbox_sender", lambda: None)
+    monkeypatch.setattr(
+        check_availability,
+        "check_video_availability",
+        lambda video, **_kwargs: SimpleNamespace(
+            deleted_reason="not found" if video.id == "gone" else None
+        ),
+    )
 
-    assert videos[0].id == "to_delete"
-    assert videos[0].status == VideoStatus.SUCCESS
-    assert videos[0].message_id is None
-    assert videos[0].last_checked is None
+    check_availability.check_video_batch()
 
-    assert videos[1].id == "to_restore"
-    assert videos[1].status == VideoStatus.DELETED
-    assert videos[1].message_id == 10
-    assert videos[1].last_checked is None
+    # Уведомление о вернувшемся видео убрано из очереди, о новом недоступном - поставлено
+    assert [entry.video_id for entry in sqlite_session.query(OutboxEntry)] == ["gone"]
+    assert {video.status for video in crud.get_videos(sqlite_session)} == {VideoStatus.SUCCESS}
 
 
 @pytest.mark.integration
@@ -157,7 +162,7 @@ def test_check_video_batch_no_videos_logs_and_returns(
     monkeypatch.setattr(
         check_availability,
         "check_video_availability",
-        lambda _video: called.__setitem__("checked", True),
+        lambda _video, **_kwargs: called.__setitem__("checked", True),
     )
     check_availability.check_video_batch()
     assert called["checked"] is False
@@ -203,7 +208,7 @@ def test_check_video_batch_selects_least_recently_checked_first(
     monkeypatch.setattr(
         check_availability,
         "check_video_availability",
-        lambda _video: SimpleNamespace(deleted_reason=None),
+        lambda _video, **_kwargs: SimpleNamespace(deleted_reason=None),
     )
 
     checked_ids: list[str] = []
@@ -277,12 +282,103 @@ def test_check_video_batch_skips_on_network_none(
     sqlite_session.commit()
     monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
-    monkeypatch.setattr(check_availability, "check_video_availability", lambda _video: None)
-    calls = {"unavailable": False}
     monkeypatch.setattr(
-        check_availability,
-        "_handle_unavailable",
-        lambda *_args, **_kwargs: calls.__setitem__("unavailable", True),
+        check_availability, "check_video_availability", lambda _video, **_kwargs: None
     )
     check_availability.check_video_batch()
-    assert calls["unavailable"] is False
+    assert sqlite_session.query(OutboxEntry).count() == 0
+
+
+@pytest.mark.integration
+def test_check_video_batch_falls_back_to_full_check_for_unconfirmed_videos(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sqlite_session.add_all(
+        [
+            Video(id="probed", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS),
+            Video(id="unknown", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS),
+            Video(id="deleted", date=datetime(2025, 1, 1), status=VideoStatus.DELETED),
+        ]
+    )
+    sqlite_session.commit()
+
+    monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
+    monkeypatch.setattr(settings, "AVAILABILITY_PROBE", True)
+    monkeypatch.setattr(check_availability, "_handle_restored", lambda *_args: True)
+
+    probe_calls: list[list[str]] = []
+
+    def fake_probe(video_ids: list[str], _limiter):
+        probe_calls.append(sorted(video_ids))
+        return {"probed": SimpleNamespace(deleted_reason=None)}
+
+    full_checks: list[str] = []
+
+    def fake_check(video: Video, **_kwargs):
+        full_checks.append(video.id)
+        return SimpleNamespace(deleted_reason=None)
+
+    monkeypatch.setattr(check_availability, "probe_videos_availability", fake_probe)
+    monkeypatch.setattr(check_availability, "check_video_availability", fake_check)
+
+    check_availability.check_video_batch()
+
+    # Удалённые видео не отправляются в пакетную проверку
+    assert probe_calls == [["probed", "unknown"]]
+    assert sorted(full_checks) == ["deleted", "unknown"]
+    videos = crud.get_videos(sqlite_session)
+    assert all(video.last_checked is not None for video in videos)
+
+
+@pytest.mark.integration
+def test_check_video_batch_checks_in_parallel_and_queues_notifications(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ids = [f"v{i}" for i in range(6)]
+    sqlite_session.add_all(
+        [
+            Video(id=video_id, date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS)
+            for video_id in ids
+        ]
+    )
+    sqlite_session.commit()
+
+    monkeypatch.setattr(check_availability, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(check_availability, "CHECK_INTERVAL_DAYS", 0.01)
+    monkeypatch.setattr(settings, "CHECK_WORKERS", 3)
+
+    main_thread = threading.get_ident()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_check(video: Video, **_kwargs):
+        if video.id in ids[:3]:
+            # Первые 3 видео проверяются одновременно
+            barrier.wait()
+        return SimpleNamespace(deleted_reason="gone" if video.id in ids[:2] else None)
+
+    update_threads: set[int] = set()
+    original_update = crud.update_video
+
+    def recording_update(db, video, **kwargs):
+        update_threads.add(threading.get_ident())
+        return original_update(db, video, **kwargs)
+
+    woken: list[bool] = []
+    monkeypatch.setattr(check_availability, "check_video_availability", fake_check)
+    monkeypatch.setattr(check_availability, "wake_outbox_sender", lambda: woken.append(True))
+    monkeypatch.setattr(check_availability.crud, "update_video", recording_update)
+
+    check_availability.check_video_batch()
+
+    assert update_threads == {main_thread}
+    # Поток отправки будится один раз на всю партию
+    assert woken == [True]
+    entries = sqlite_session.query(OutboxEntry).order_by(OutboxEntry.video_id).all()
+    assert [(entry.video_id, entry.deleted_reason) for entry in entries] == [
+        ("v0", "gone"),
+        ("v1", "gone"),
+    ]
+    for video in crud.get_videos(sqlite_session):
+        assert video.status == VideoStatus.SUCCESS
+        assert video.last_checked is not None
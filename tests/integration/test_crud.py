@@ -1,10 +1,14 @@
+import math
+from collections.abc import Callable
 from datetime import datetime
 
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import Session, sessionmaker
 
-from atp import crud
-from atp.models import VideoInfo, VideoStatus
+from atp import crud, database
+from atp.database import Base
+from atp.models import Video, VideoInfo, VideoStatus
 
 
 @pytest.mark.integration
@@ -121,3 +125,309 @@ def test_update_video_updates_source(
     updated = crud.get_videos(sqlite_session)[0]
     assert updated.liked == result_val
     assert updated.saved == result_val
+
+
+def _count_statements(session: Session, action: Callable[[], None]) -> int:
+    statements: list[str] = []
+
+    def record(_conn, _cursor, statement, *_args) -> None:
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+@pytest.mark.integration
+def test_add_videos_bulk_fills_defaults(sqlite_session: Session) -> None:
+    crud.add_videos_bulk(
+        sqlite_session, [VideoInfo(id="a", date=datetime(2025, 1, 1), liked=None, saved=True)]
+    )
+
+    video = crud.get_videos(sqlite_session)[0]
+    assert video.status == VideoStatus.NEW
+    assert video.created_at is not None
+    assert video.liked is False
+    assert video.saved is True
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("size", [500, 2000, 8000])
+def test_bulk_operations_scale_linearly(sqlite_session: Session, size: int) -> None:
+    """Количество запросов растёт линейно от числа чанков, а не от числа видео."""
+    chunks = math.ceil(size / crud.BULK_CHUNK_SIZE)
+    existing = [
+        VideoInfo(id=f"old{i}", date=datetime(2025, 1, 1), liked=False, saved=False)
+        for i in range(size)
+    ]
+    crud.add_videos_bulk(sqlite_session, existing)
+
+    new = [
+        VideoInfo(id=f"new{i}", date=datetime(2025, 1, 1), liked=True, saved=False)
+        for i in range(size)
+    ]
+    insert_statements = _count_statements(
+        sqlite_session, lambda: crud.add_videos_bulk(sqlite_session, existing + new)
+    )
+    assert insert_statements <= 2 * chunks + 2
+
+    updated = [
+        VideoInfo(id=f"old{i}", date=datetime(2025, 1, 1), liked=True, saved=True)
+        for i in range(size)
+    ]
+    update_statements = _count_statements(
+        sqlite_session, lambda: crud.update_video_sources_bulk(sqlite_session, updated)
+    )
+    assert update_statements <= 2 * chunks + 2
+
+    videos = crud.get_videos(sqlite_session)
+    assert len(videos) == 2 * size
+    assert all(video.liked for video in videos)
+    assert sum(video.saved for video in videos) == size
+
+
+def _count_commits(session: Session) -> list[None]:
+    commits: list[None] = []
+    event.listen(session, "after_commit", lambda _session: commits.append(None))
+    return commits
+
+
+@pytest.mark.integration
+def test_batched_commits_groups_updates(sqlite_session: Session) -> None:
+    crud.add_videos_bulk(
+        sqlite_session,
+        [VideoInfo(id=str(i), date=datetime(2025, 1, 1)) for i in range(7)],
+    )
+    videos = crud.get_videos(sqlite_session)
+    commits = _count_commits(sqlite_session)
+
+    with crud.batched_commits(sqlite_session, size=3, interval=3600) as batch:
+        for video in videos:
+            crud.update_video(sqlite_session, video, status=VideoStatus.SUCCESS)
+        assert len(commits) == 2
+        assert batch.pending == 1
+
+    assert len(commits) == 3
+    assert all(v.status == VideoStatus.SUCCESS for v in crud.get_videos(sqlite_session))
+
+
+@pytest.mark.integration
+def test_batched_commits_sees_pending_videos(sqlite_session: Session) -> None:
+    with crud.batched_commits(sqlite_session, size=100, interval=3600):
+        crud.add_video_to_db(sqlite_session, "a", datetime(2025, 1, 1))
+        # Повторное добавление видит ещё не записанное видео и не падает на дубликате
+        crud.add_video_to_db(sqlite_session, "a", datetime(2025, 1, 1))
+
+    assert [v.id for v in crud.get_videos(sqlite_session)] == ["a"]
+
+
+@pytest.mark.integration
+def test_batched_commits_saves_pending_on_error(sqlite_session: Session) -> None:
+    video = crud.add_video_to_db(sqlite_session, "a", datetime(2025, 1, 1))
+
+    with (
+        pytest.raises(RuntimeError),
+        crud.batched_commits(sqlite_session, size=100, interval=3600),
+    ):
+        crud.update_video(sqlite_session, video, status=VideoStatus.SUCCESS)
+        raise RuntimeError("boom")
+
+    sqlite_session.expire_all()
+    assert crud.get_videos(sqlite_session)[0].status == VideoStatus.SUCCESS
+    assert crud._BATCH_KEY not in sqlite_session.info
+
+
+@pytest.mark.integration
+def test_batched_commits_not_visible_until_commit(tmp_path) -> None:
+    """Пока пачка не записана, другие соединения видят старый статус (как после сбоя)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    writer, reader = make_session(), make_session()
+    try:
+        video = crud.add_video_to_db(writer, "a", datetime(2025, 1, 1))
+
+        with crud.batched_commits(writer, size=100, interval=3600):
+            crud.update_video(writer, video, status=VideoStatus.SUCCESS)
+            assert crud.get_videos(reader)[0].status == VideoStatus.NEW
+            reader.rollback()
+
+            crud.commit(writer)
+            assert crud.get_videos(reader)[0].status == VideoStatus.SUCCESS
+    finally:
+        writer.close()
+        reader.close()
+        engine.dispose()
+
+
+@pytest.mark.integration
+def test_batched_commits_does_not_lock_database_for_other_sessions(
+    tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Пока пачка ждёт (например, скачивания), другая сессия может писать в базу"""
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "busy_timeout", 100)
+    engine = database.configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}"))
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    first, second = make_session(), make_session()
+    try:
+        video_a = crud.add_video_to_db(first, "a", datetime(2025, 1, 1))
+        video_b = crud.add_video_to_db(second, "b", datetime(2025, 1, 1))
+
+        with crud.batched_commits(first, size=100, interval=3600):
+            crud.update_video(first, video_a, status=VideoStatus.SUCCESS)
+            crud.add_video_to_db(first, "c", datetime(2025, 1, 1))
+            crud.update_video(second, video_b, status=VideoStatus.FAILED)
+
+        second.expire_all()
+        statuses = {video.id: video.status for video in crud.get_videos(second)}
+        assert statuses == {"a": VideoStatus.SUCCESS, "b": VideoStatus.FAILED, "c": VideoStatus.NEW}
+    finally:
+        first.close()
+        second.close()
+        engine.dispose()
+
+
+@pytest.mark.integration
+def test_get_videos_orders_and_limits_in_sql(sqlite_session: Session) -> None:
+    sqlite_session.add_all(
+        [
+            Video(
+                id="checked",
+                date=datetime(2025, 1, 1),
+                status=VideoStatus.SUCCESS,
+                last_checked=datetime(2025, 2, 1),
+            ),
+            Video(
+                id="old",
+                date=datetime(2025, 1, 1),
+                status=VideoStatus.DELETED,
+                last_checked=datetime(2025, 1, 1),
+            ),
+            Video(id="never", date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS),
+            Video(id="new", date=datetime(2025, 1, 1), status=VideoStatus.NEW),
+        ]
+    )
+    sqlite_session.commit()
+    statuses = [VideoStatus.SUCCESS, VideoStatus.DELETED]
+
+    videos = crud.get_videos(
+        sqlite_session,
+        status=statuses,
+        order_by=Video.last_checked.asc().nulls_first(),
+        limit=2,
+    )
+
+    assert [v.id for v in videos] == ["never", "old"]
+    assert crud.count_videos(sqlite_session, status=statuses) == 3
+    assert crud.count_videos(sqlite_session) == 4
+
+
+@pytest.mark.integration
+def test_get_latest_video_ids_uses_status_date_index(sqlite_session: Session) -> None:
+    sqlite_session.add_all(
+        [
+            Video(id=str(day), date=datetime(2025, 1, day), status=VideoStatus.SUCCESS)
+            for day in range(1, 6)
+        ]
+        + [Video(id="deleted", date=datetime(2025, 2, 1), status=VideoStatus.DELETED)]
+    )
+    sqlite_session.commit()
+
+    ids = crud.get_latest_video_ids(
+        sqlite_session, VideoStatus.SUCCESS, after=datetime(2025, 1, 2), limit=2
+    )
+    assert ids == ["5", "4"]
+
+    plan = sqlite_session.execute(
+        text(
+            "EXPLAIN QUERY PLAN SELECT id FROM videos WHERE status = 'success' "
+            "AND date > '2025-01-02' ORDER BY date DESC LIMIT 2"
+        )
+    ).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_videos_status_date" in details
+    assert "TEMP B-TREE" not in details
+
+
+@pytest.mark.integration
+def test_get_videos_to_check_selects_oldest_checked_columns(sqlite_session: Session) -> None:
+    sqlite_session.add_all(
+        [
+            Video(
+                id=f"s{i}",
+                date=datetime(2025, 1, 1),
+                status=VideoStatus.SUCCESS,
+                last_checked=datetime(2025, 1, 10 + i),
+                type="video",
+            )
+            for i in range(5)
+        ]
+        + [
+            Video(id="never", date=datetime(2025, 1, 1), status=VideoStatus.DELETED),
+            Video(id="new", date=datetime(2025, 1, 1), status=VideoStatus.NEW),
+            Video(id="failed", date=datetime(2025, 1, 1), status=VideoStatus.FAILED),
+        ]
+    )
+    sqlite_session.commit()
+    sqlite_session.expunge_all()
+
+    statements: list[str] = []
+
+    def record(_conn, _cursor, statement, *_args) -> None:
+        statements.append(statement)
+
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", record)
+    try:
+        videos = crud.get_videos_to_check(sqlite_session, limit=3)
+    finally:
+        event.remove(sqlite_session.get_bind(), "before_cursor_execute", record)
+
+    assert [v.id for v in videos] == ["never", "s0", "s1"]
+    assert len(statements) == 1
+    assert "LIMIT" in statements[0]
+    # Колонки, не нужные проверке, не загружаются
+    assert "videos.type" not in statements[0]
+    assert "type" not in inspect(videos[1]).dict
+
+
+@pytest.mark.integration
+def test_get_videos_to_check_uses_status_last_checked_index(sqlite_session: Session) -> None:
+    sqlite_session.add_all(
+        [
+            Video(
+                id=str(i),
+                date=datetime(2025, 1, 1),
+                status=VideoStatus.SUCCESS if i % 2 else VideoStatus.DELETED,
+                last_checked=datetime(2025, 1, 1 + i),
+            )
+            for i in range(6)
+        ]
+    )
+    sqlite_session.commit()
+
+    queries: list[tuple[str, tuple]] = []
+
+    def record(_conn, _cursor, statement, parameters, *_args) -> None:
+        queries.append((statement, parameters))
+
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", record)
+    try:
+        videos = crud.get_videos_to_check(sqlite_session, limit=3)
+    finally:
+        event.remove(sqlite_session.get_bind(), "before_cursor_execute", record)
+
+    assert [v.id for v in videos] == ["0", "1", "2"]
+    statement, parameters = queries[0]
+    plan = sqlite_session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+    details = [row[-1] for row in plan]
+    # Каждый статус читается по индексу уже в нужном порядке,
+    # сортируются только отобранные кандидаты (не больше limit на статус)
+    assert sum("ix_videos_status_last_checked" in detail for detail in details) == 2
+    assert sum("TEMP B-TREE" in detail for detail in details) == 1
@@ -0,0 +1,75 @@
+import logging
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from atp import database
+
+
+@pytest.mark.integration
+def test_configure_sqlite_applies_pragmas_on_connect(tmp_path: Path) -> None:
+    engine = database.configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}"))
+    try:
+        with engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()  # noqa: E731
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1
+            assert pragma("busy_timeout") == database.SQLITE_BUSY_TIMEOUT
+            assert pragma("mmap_size") == database.SQLITE_MMAP_SIZE
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.integration
+def test_wal_readers_do_not_block_writer(tmp_path: Path) -> None:
+    engine = database.configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}"))
+    try:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+
+        with engine.connect() as reader, engine.connect() as writer:
+            reader.exec_driver_sql("BEGIN")
+            assert reader.exec_driver_sql("SELECT count(*) FROM t").scalar() == 0
+
+            # Запись проходит, пока открыта читающая транзакция
+            writer.exec_driver_sql("BEGIN IMMEDIATE")
+            writer.exec_driver_sql("INSERT INTO t VALUES (1)")
+            writer.exec_driver_sql("COMMIT")
+
+            assert reader.exec_driver_sql("SELECT count(*) FROM t").scalar() == 0
+            reader.exec_driver_sql("COMMIT")
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.integration
+def test_check_database_settings_reports_effective_values(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    engine = database.configure_sqlite(create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}"))
+    try:
+        with caplog.at_level(logging.INFO, logger=database.__name__):
+            effective = database.check_database_settings(engine)
+    finally:
+        engine.dispose()
+
+    assert effective["journal_mode"] == "wal"
+    assert "journal_mode=wal" in caplog.text
+    assert "expected" not in caplog.text
+
+
+@pytest.mark.integration
+def test_check_database_settings_warns_when_wal_unavailable(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    # База в памяти не поддерживает WAL, как и некоторые сетевые файловые системы
+    engine = database.configure_sqlite(create_engine("sqlite:///:memory:"))
+    try:
+        with caplog.at_level(logging.WARNING, logger=database.__name__):
+            effective = database.check_database_settings(engine)
+    finally:
+        engine.dispose()
+
+    assert effective["journal_mode"] == "memory"
+    assert "SQLite journal_mode is memory, expected wal" in caplog.text
@@ -1,3 +1,4 @@
+import threading
 from datetime import datetime
 from types import SimpleNamespace
 
@@ -82,3 +83,51 @@ def test_download_new_videos_includes_failed_in_hope_mode(
     by_id = {v.id: v for v in crud.get_videos(sqlite_session)}
     assert by_id["n1"].status == VideoStatus.SUCCESS
     assert by_id["f1"].status == VideoStatus.SUCCESS
+
+
+@pytest.mark.integration
+def test_download_new_videos_parallel_workers_write_from_single_thread(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ids = [f"v{i}" for i in range(8)]
+    sqlite_session.add_all(
+        [Video(id=video_id, date=datetime(2025, 1, 1), status=VideoStatus.NEW) for video_id in ids]
+    )
+    sqlite_session.commit()
+
+    monkeypatch.setattr(download, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(download, "HOPE_MODE", False)
+    monkeypatch.setattr(download, "DOWNLOAD_WORKERS", 4)
+
+    main_thread = threading.get_ident()
+    barrier = threading.Barrier(4, timeout=5)
+    download_threads: set[int] = set()
+    downloaded: list[Video] = []
+
+    def fake_download(video: Video):
+        download_threads.add(threading.get_ident())
+        downloaded.append(video)
+        if video.id in ids[:4]:
+            # Первые 4 видео скачиваются одновременно
+            barrier.wait()
+        return SimpleNamespace(name=video.id, author="a", type=VideoType.VIDEO, deleted_reason=None)
+
+    update_threads: set[int] = set()
+    original_update = crud.update_video
+
+    def recording_update(db, video, **kwargs):
+        update_threads.add(threading.get_ident())
+        return original_update(db, video, **kwargs)
+
+    monkeypatch.setattr(download, "download_video", fake_download)
+    monkeypatch.setattr(download.crud, "update_video", recording_update)
+
+    download.download_new_videos()
+
+    by_id = {v.id: v for v in crud.get_videos(sqlite_session)}
+    assert all(by_id[video_id].status == VideoStatus.SUCCESS for video_id in ids)
+    assert all(by_id[video_id].name == video_id for video_id in ids)
+    assert main_thread not in download_threads
+    assert update_threads == {main_thread}
+    # В потоки передаются копии, не привязанные к сессии
+    assert all(video not in sqlite_session for video in downloaded)
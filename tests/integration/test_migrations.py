@@ -9,7 +9,7 @@ from sqlalchemy import Column, DateTime, String, create_engine, inspect
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from atp import database, settings
-from atp.models import Video, VideoStatus, VideoType
+from atp.models import OutboxEntry, Video, VideoStatus, VideoType
 
 EXPECTED_VIDEO_COLUMNS = {
     "id",
@@ -212,3 +212,59 @@ def test_run_migrations_on_nonempty_db_preserves_and_transforms_videos(
     finally:
         vs.close()
         verify_engine.dispose()
+
+
+@pytest.mark.integration
+def test_run_migrations_creates_status_indexes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_url = f"sqlite:///{tmp_path / 'indexes.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", db_url)
+    monkeypatch.setattr(database, "DATABASE_URL", db_url)
+
+    database.run_migrations()
+
+    engine = create_engine(db_url)
+    indexes = {
+        index["name"]: index["column_names"] for index in inspect(engine).get_indexes("videos")
+    }
+    engine.dispose()
+    assert indexes == {
+        "ix_videos_status_last_checked": ["status", "last_checked"],
+        "ix_videos_status_date": ["status", "date"],
+    }
+
+
+@pytest.mark.integration
+def test_run_migrations_creates_app_state_table(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_url = f"sqlite:///{tmp_path / 'state.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", db_url)
+    monkeypatch.setattr(database, "DATABASE_URL", db_url)
+
+    database.run_migrations()
+
+    engine = create_engine(db_url)
+    columns = {col["name"] for col in inspect(engine).get_columns("app_state")}
+    engine.dispose()
+    assert columns == {"key", "value", "updated_at"}
+
+
+@pytest.mark.integration
+def test_run_migrations_creates_outbox_table(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_url = f"sqlite:///{tmp_path / 'outbox.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", db_url)
+    monkeypatch.setattr(database, "DATABASE_URL", db_url)
+
+    database.run_migrations()
+
+    engine = create_engine(db_url)
+    inspector = inspect(engine)
+    columns = {col["name"] for col in inspector.get_columns("outbox")}
+    indexes = {index["name"] for index in inspector.get_indexes("outbox")}
+    engine.dispose()
+    assert columns == set(OutboxEntry.__table__.columns.keys())
+    assert "ix_outbox_next_attempt_at" in indexes
@@ -0,0 +1,270 @@
+import io
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import Session
+
+from atp import crud, outbox, part_cache, settings
+from atp.models import OutboxEntry, Video, VideoStatus
+
+
+@pytest.fixture
+def outbox_env(
+    sqlite_session: Session, downloads_dir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    """Настраивает очередь на тестовую базу и временные директории"""
+    monkeypatch.setattr(outbox, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(settings, "DOWNLOADS_DIR", str(downloads_dir))
+    monkeypatch.setattr(settings, "PART_CACHE_DIR", tmp_path / "part_cache")
+    settings.PART_CACHE_DIR.mkdir()
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_DELAY", 60)
+    monkeypatch.setattr(outbox, "generate_bmp", lambda _seed: io.BytesIO(b"bmp"))
+    return downloads_dir
+
+
+def _queue(db: Session, video_id: str, reason: str = "gone") -> None:
+    db.add(Video(id=video_id, date=datetime(2025, 1, 1), status=VideoStatus.SUCCESS, name="n"))
+    db.commit()
+    crud.add_outbox_entry(db, video_id, reason)
+
+
+def _make_due(db: Session) -> None:
+    for entry in db.query(OutboxEntry):
+        entry.next_attempt_at = datetime.now() - timedelta(seconds=1)
+    db.commit()
+
+
+@pytest.mark.integration
+def test_send_outbox_sends_small_video_and_marks_deleted(
+    sqlite_session: Session, outbox_env: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _queue(sqlite_session, "small", "not found")
+    (outbox_env / "small.mp4").write_bytes(b"x" * 10)
+    sent: list[bytes] = []
+
+    def fake_send(caption: str, video=None, photos=None) -> dict:  # noqa: ARG001
+        sent.append(video.read())
+        return {"message_id": 123}
+
+    monkeypatch.setattr(outbox, "send_media", fake_send)
+
+    assert outbox.send_outbox() == 1
+
+    assert sent == [b"x" * 10]
+    video = crud.get_videos(sqlite_session)[0]
+    assert video.status == VideoStatus.DELETED
+    assert video.message_id == 123
+    assert video.deleted_reason == "not found"
+    assert sqlite_session.query(OutboxEntry).count() == 0
+
+
+@pytest.mark.integration
+def test_send_outbox_resumes_without_rendering_parts_again(
+    sqlite_session: Session, outbox_env: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _queue(sqlite_session, "big")
+    (outbox_env / "big.mp4").write_bytes(b"x" * 3000)
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+
+    splits: list[int] = []
+
+    def fake_split(video_path: Path, parts: int, work_dir: Path) -> list[Path]:
+        splits.append(parts)
+        paths = [work_dir / f"{video_path.stem}_part{i + 1}.mp4" for i in range(parts)]
+        for i, path in enumerate(paths):
+            path.write_bytes(f"part{i + 1}".encode())
+        return paths
+
+    placeholders: list[int] = []
+    monkeypatch.setattr(part_cache, "split_video", fake_split)
+    monkeypatch.setattr(
+        outbox,
+        "send_media",
+        lambda caption, photos=None, video=None: (  # noqa: ARG005
+            placeholders.append(len(photos)) or [{"message_id": 10 + i} for i in range(len(photos))]
+        ),
+    )
+
+    edits: list[tuple[int, bytes]] = []
+    fail_at = {"message_id": 12}
+
+    def fake_edit(message_id: int, caption: str, video) -> bool:  # noqa: ARG001
+        if message_id == fail_at["message_id"]:
+            return False
+        edits.append((message_id, video.read()))
+        return True
+
+    monkeypatch.setattr(outbox, "edit_media", fake_edit)
+
+    assert outbox.send_outbox() == 0
+
+    entry = sqlite_session.query(OutboxEntry).one()
+    assert splits == [4]
+    assert json.loads(entry.message_ids) == [10, 11, 12, 13]
+    assert entry.sent_parts == 2
+    assert entry.attempts == 1
+    assert "part 3" in entry.last_error
+    assert entry.next_attempt_at > datetime.now() + timedelta(seconds=50)
+    # Пока пауза не прошла, отправка не повторяется
+    assert outbox.send_outbox() == 0
+    assert entry.attempts == 1
+
+    fail_at["message_id"] = None
+    _make_due(sqlite_session)
+    assert outbox.send_outbox() == 1
+
+    # Видео не разбивается заново, заглушки не отправляются повторно
+    assert splits == [4]
+    assert placeholders == [4]
+    assert edits == [(10, b"part1"), (11, b"part2"), (12, b"part3"), (13, b"part4")]
+    video = crud.get_videos(sqlite_session)[0]
+    assert (video.status, video.message_id) == (VideoStatus.DELETED, 10)
+    assert sqlite_session.query(OutboxEntry).count() == 0
+    # Части остаются в кэше для следующих отправок этого файла
+    assert len(list(settings.PART_CACHE_DIR.iterdir())) == 1
+
+
+@pytest.mark.integration
+def test_send_outbox_resumes_from_cache_when_split_returns_fewer_parts(
+    sqlite_session: Session, outbox_env: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _queue(sqlite_session, "big")
+    (outbox_env / "big.mp4").write_bytes(b"x" * 3000)
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+
+    splits: list[int] = []
+
+    def fake_split(video_path: Path, parts: int, work_dir: Path) -> list[Path]:
+        # Точки разреза попали на одни и те же ключевые кадры: частей меньше запрошенного
+        splits.append(parts)
+        paths = [work_dir / f"{video_path.stem}_part{i + 1}.mp4" for i in range(2)]
+        for i, path in enumerate(paths):
+            path.write_bytes(f"part{i + 1}".encode())
+        return paths
+
+    monkeypatch.setattr(part_cache, "split_video", fake_split)
+    monkeypatch.setattr(
+        outbox,
+        "send_media",
+        lambda caption, photos=None, video=None: [  # noqa: ARG005
+            {"message_id": 10 + i} for i in range(len(photos))
+        ],
+    )
+    edits: list[int] = []
+    monkeypatch.setattr(
+        outbox,
+        "edit_media",
+        lambda message_id, caption, video: message_id != 11 and not edits.append(message_id),  # noqa: ARG005
+    )
+
+    assert outbox.send_outbox() == 0
+    entry = sqlite_session.query(OutboxEntry).one()
+    assert json.loads(entry.message_ids) == [10, 11]
+    assert entry.sent_parts == 1
+
+    monkeypatch.setattr(
+        outbox,
+        "edit_media",
+        lambda message_id, caption, video: not edits.append(message_id),  # noqa: ARG005
+    )
+    _make_due(sqlite_session)
+    assert outbox.send_outbox() == 1
+
+    # Повтор берёт части по сохранённому ключу, а не по количеству заглушек
+    assert splits == [4]
+    assert edits == [10, 11]
+
+
+@pytest.mark.integration
+def test_send_outbox_renders_parts_again_when_source_changes(
+    sqlite_session: Session, outbox_env: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _queue(sqlite_session, "big")
+    source = outbox_env / "big.mp4"
+    source.write_bytes(b"x" * 3000)
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+
+    splits: list[bytes] = []
+
+    def fake_split(video_path: Path, parts: int, work_dir: Path) -> list[Path]:
+        splits.append(video_path.read_bytes()[:1])
+        paths = [work_dir / f"part{i + 1}.mp4" for i in range(parts)]
+        for path in paths:
+            path.write_bytes(video_path.read_bytes()[:1])
+        return paths
+
+    edits: list[bytes] = []
+    monkeypatch.setattr(part_cache, "split_video", fake_split)
+    monkeypatch.setattr(
+        outbox,
+        "send_media",
+        lambda caption, photos=None, video=None: [  # noqa: ARG005
+            {"message_id": i} for i in range(len(photos))
+        ],
+    )
+    monkeypatch.setattr(outbox, "edit_media", lambda **_kwargs: False)
+
+    assert outbox.send_outbox() == 0
+
+    # Файл перекачан: части нужно сделать заново и заменить все заглушки
+    source.write_bytes(b"y" * 3000)
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    monkeypatch.setattr(
+        outbox,
+        "edit_media",
+        lambda message_id, caption, video: edits.append(video.read()) or True,  # noqa: ARG005
+    )
+    _make_due(sqlite_session)
+    assert outbox.send_outbox() == 1
+
+    assert splits == [b"x", b"y"]
+    assert edits == [b"y"] * 4
+
+
+@pytest.mark.integration
+@pytest.mark.usefixtures("outbox_env")
+def test_send_outbox_drops_entry_without_video_file(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _queue(sqlite_session, "missing")
+    monkeypatch.setattr(outbox, "send_media", lambda **_kwargs: pytest.fail("must not send"))
+
+    assert outbox.send_outbox() == 0
+
+    assert sqlite_session.query(OutboxEntry).count() == 0
+    assert crud.get_videos(sqlite_session)[0].status == VideoStatus.SUCCESS
+
+
+@pytest.mark.integration
+def test_send_outbox_skips_entry_cancelled_during_delivery(
+    sqlite_session: Session, outbox_env: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _queue(sqlite_session, "back")
+    (outbox_env / "back.mp4").write_bytes(b"x" * 3000)
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+
+    def fake_split(_video_path: Path, parts: int, work_dir: Path) -> list[Path]:
+        paths = [work_dir / f"part{i + 1}.mp4" for i in range(parts)]
+        for path in paths:
+            path.write_bytes(b"part")
+        return paths
+
+    def send_while_cancelled(caption: str, photos=None, video=None) -> list[dict]:  # noqa: ARG001
+        # Проверка в другой сессии увидела, что видео снова доступно, пока отправлялись заглушки
+        connection = sqlite_session.connection().connection
+        connection.execute("DELETE FROM outbox")
+        connection.commit()
+        return [{"message_id": i} for i in range(len(photos))]
+
+    monkeypatch.setattr(part_cache, "split_video", fake_split)
+    monkeypatch.setattr(outbox, "send_media", send_while_cancelled)
+    monkeypatch.setattr(outbox, "edit_media", lambda **_kwargs: pytest.fail("must not edit"))
+
+    assert outbox.send_outbox() == 0
+
+    assert sqlite_session.query(OutboxEntry).count() == 0
+    assert crud.get_videos(sqlite_session)[0].status == VideoStatus.SUCCESS
@@ -0,0 +1,63 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+import ffmpeg
+import pytest
+
+from atp import media
+
+# Рендер 35 изображений занимает около минуты, поэтому сравнение запускается только явно:
+# ATP_BENCHMARK=1 pytest -m benchmark
+pytestmark = [
+    pytest.mark.benchmark,
+    pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed"),
+    pytest.mark.skipif(os.getenv("ATP_BENCHMARK") != "1", reason="set ATP_BENCHMARK=1 to run"),
+]
+
+IMAGE_COUNT = 35
+
+
+@pytest.fixture
+def slideshow_dir(tmp_path: Path) -> Path:
+    """Слайдшоу из 35 изображений разного размера и аудио на 70 секунд"""
+    slide_dir = tmp_path / "slides"
+    slide_dir.mkdir()
+    for i in range(1, IMAGE_COUNT + 1):
+        size = "1080x1440" if i % 2 else "1440x1080"
+        (
+            ffmpeg.input(f"testsrc=size={size}:duration=1", f="lavfi")
+            .output(str(slide_dir / f"{i}.jpg"), vframes=1, loglevel="error")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    (
+        ffmpeg.input("sine=frequency=440:duration=70", f="lavfi")
+        .output(str(slide_dir / "audio.mp3"), loglevel="error")
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return slide_dir
+
+
+@pytest.mark.integration
+def test_slideshow_renderers_benchmark(
+    tmp_path: Path, slideshow_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Рендер concat demuxer'ом быстрее графа фильтров на большом слайдшоу"""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    monkeypatch.setattr(media, "DOWNLOADS_DIR", str(out_dir))
+
+    timings: dict[str, float] = {}
+    for renderer in media.SLIDESHOW_RENDERERS:
+        work_dir = tmp_path / renderer
+        shutil.copytree(slideshow_dir, work_dir)
+
+        started = time.perf_counter()
+        assert media.render_slideshow(renderer, work_dir, renderer=renderer) is True
+        timings[renderer] = time.perf_counter() - started
+
+        duration = media._probe_duration(out_dir / f"{renderer}.mp4")
+        assert duration == pytest.approx(70, abs=0.5)
+
+    assert timings["concat"] < timings["filter"], timings
@@ -0,0 +1,50 @@
+import shutil
+from pathlib import Path
+
+import ffmpeg
+import pytest
+
+from atp import media
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg is not installed",
+)
+
+
+@pytest.fixture
+def video(tmp_path: Path) -> Path:
+    """Видео на 30 секунд с ключевым кадром каждую секунду"""
+    path = tmp_path / "v.mp4"
+    (
+        ffmpeg.output(
+            ffmpeg.input("testsrc=size=320x240:rate=25:duration=30", f="lavfi"),
+            ffmpeg.input("sine=duration=30", f="lavfi"),
+            str(path),
+            vcodec="libx264",
+            acodec="aac",
+            g=25,
+            loglevel="error",
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return path
+
+
+@pytest.mark.integration
+def test_split_video_stream_copy_without_encoding(
+    tmp_path: Path, video: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", True)
+    monkeypatch.setattr(media.settings, "TELEGRAM_MAX_VIDEO_SIZE", media.get_file_size(video))
+    monkeypatch.setattr(media, "_encode_part", lambda *_args: pytest.fail("must not re-encode"))
+
+    parts = media.split_video(video, 3, work_dir)
+
+    assert parts == [work_dir / f"v_part{i}.mp4" for i in range(1, 4)]
+    durations = [media._probe_duration(part) for part in parts]
+    assert sum(durations) == pytest.approx(30, abs=0.5)
+    assert all(duration == pytest.approx(10, abs=1.5) for duration in durations)
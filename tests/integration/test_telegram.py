@@ -1,9 +1,21 @@
+import http.server
 import io
+import json
+import threading
+from collections.abc import Generator
+from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
 
 from atp import settings, telegram
+from atp.multipart import MultipartEncoder
+
+
+def use_session(monkeypatch: pytest.MonkeyPatch, post) -> None:
+    """Подменяет HTTP сессию общего клиента Telegram"""
+    client = telegram.TelegramClient(session=SimpleNamespace(post=post), sleep=lambda _s: None)
+    monkeypatch.setattr(telegram, "_client", client)
 
 
 @pytest.mark.integration
@@ -11,13 +23,14 @@ def test_send_media_single_video(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "chat")
 
-    def fake_post(url: str, data: dict, files: dict, timeout: int):  # noqa: ARG001
+    def fake_post(url: str, data: MultipartEncoder, headers: dict, timeout: tuple):  # noqa: ARG001
         assert url.endswith("/sendVideo")
-        assert data["chat_id"] == "chat"
-        assert "video" in files
+        assert data.fields["chat_id"] == "chat"
+        assert "video" in data.files
+        assert headers["Content-Type"] == data.content_type
         return SimpleNamespace(status_code=200, json=lambda: {"result": {"message_id": 1}})
 
-    monkeypatch.setattr(telegram.requests, "post", fake_post)
+    use_session(monkeypatch, fake_post)
     result = telegram.send_media(caption="c", video=io.BytesIO(b"v"))
     assert result["message_id"] == 1
 
@@ -29,13 +42,13 @@ def test_send_media_group_uses_send_media_group_endpoint(
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "chat")
 
-    def fake_post(url: str, data: dict, files: dict, timeout: int):  # noqa: ARG001
+    def fake_post(url: str, data: MultipartEncoder, headers: dict, timeout: tuple):  # noqa: ARG001
         assert url.endswith("/sendMediaGroup")
-        assert data["chat_id"] == "chat"
-        assert set(files) == {"photo0", "photo1"}
+        assert data.fields["chat_id"] == "chat"
+        assert set(data.files) == {"photo0", "photo1"}
         return SimpleNamespace(status_code=200, json=lambda: {"result": [{"message_id": 10}]})
 
-    monkeypatch.setattr(telegram.requests, "post", fake_post)
+    use_session(monkeypatch, fake_post)
     result = telegram.send_media(caption="c", photos=[io.BytesIO(b"1"), io.BytesIO(b"2")])
     assert isinstance(result, list)
     assert result[0]["message_id"] == 10
@@ -63,17 +76,79 @@ def test_discover_chat_id_sets_value_and_sends_probe_message(
         ]
     }
 
-    def fake_get(_url: str, timeout: int):  # noqa: ARG001
-        return SimpleNamespace(status_code=200, json=lambda: update_payload, text="ok")
-
-    def fake_post(_url: str, data: dict, timeout: int):  # noqa: ARG001
+    def fake_post(url: str, data: dict | None, headers: None, timeout: tuple):  # noqa: ARG001
+        if url.endswith("/getUpdates"):
+            return SimpleNamespace(status_code=200, json=lambda: update_payload, text="ok")
+        assert url.endswith("/sendMessage")
         assert data["chat_id"] == str(-1415926589830)
         return SimpleNamespace(status_code=200, text="ok")
 
-    monkeypatch.setattr(telegram.requests, "get", fake_get)
-    monkeypatch.setattr(telegram.requests, "post", fake_post)
+    use_session(monkeypatch, fake_post)
 
     telegram.discover_chat_id()
 
     assert str(-1415926589830) == settings.TELEGRAM_CHAT_ID
     assert ("TELEGRAM_CHAT_ID", str(-1415926589830)) in writes
+
+
+class FakeBotApi(http.server.BaseHTTPRequestHandler):
+    """Тестовый Bot API: на первый запрос отвечает 429, затем принимает загрузки"""
+
+    protocol_version = "HTTP/1.1"
+    requests: list[dict] = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.requests.append(
+            {"path": self.path, "size": len(body), "client_port": self.client_address[1]}
+        )
+        if len(self.requests) == 1:
+            status, payload = 429, {"ok": False, "parameters": {"retry_after": 0}}
+        else:
+            status, payload = 200, {"ok": True, "result": {"message_id": len(self.requests)}}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def bot_api() -> Generator[str, None, None]:
+    FakeBotApi.requests = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FakeBotApi)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.integration
+def test_client_talks_to_local_bot_api(
+    tmp_path: Path, bot_api: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "chat")
+    monkeypatch.setattr(telegram, "_client", telegram.TelegramClient(api_url=bot_api))
+    video_path = tmp_path / "v.mp4"
+    video_path.write_bytes(b"v" * 1_000_000)
+
+    with open(video_path, "rb") as video:
+        result = telegram.send_media(caption="c", video=video)
+    assert telegram.edit_media(result["message_id"], "c", photo=io.BytesIO(b"bmp"))
+
+    assert [request["path"] for request in FakeBotApi.requests] == [
+        "/bottoken/sendVideo",
+        "/bottoken/sendVideo",
+        "/bottoken/editMessageMedia",
+    ]
+    assert FakeBotApi.requests[0]["size"] == FakeBotApi.requests[1]["size"] > 1_000_000
+    # Все запросы идут через одно keep-alive соединение
+    assert len({request["client_port"] for request in FakeBotApi.requests}) == 1
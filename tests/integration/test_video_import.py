@@ -1,11 +1,13 @@
 import json
+import os
 from datetime import datetime
 from pathlib import Path
 
 import pytest
 from sqlalchemy.orm import Session
+from yt_dlp.utils import unsmuggle_url
 
-from atp import crud, video_import
+from atp import crud, tiktok, video_import
 from atp.models import Video
 
 
@@ -102,6 +104,58 @@ def test_import_from_file_updates_saved_flag_for_existing_video(
     assert v.saved
 
 
+@pytest.mark.integration
+def test_import_from_file_streams_in_chunks(
+    sqlite_session: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def entry(video_id: int) -> dict:
+        return {
+            "date": "2025-01-02 10:00:00",
+            "link": f"https://www.tiktok.com/@u/video/{video_id}/",
+        }
+
+    payload = {
+        "Your Activity": {
+            "Watch History": {"VideoList": [entry(i) for i in range(100, 120)]},
+            "Like List": {"ItemFavoriteList": [entry(i) for i in range(5)]},
+            # Видео 0 сохранено, но попадает в другую пачку, чем его лайк
+            "Favorite Videos": {"FavoriteVideoList": [entry(5), entry(0), entry(6)]},
+        },
+        "Comment": {"Comments": {"CommentsList": [{"comment": ']}"{'}]}},
+    }
+    src = tmp_path / "data.json"
+    src.write_text(json.dumps(payload), encoding="utf-8")
+
+    monkeypatch.setattr(video_import, "TIKTOK_DATA_FILE", str(src))
+    monkeypatch.setattr(video_import, "DOWNLOAD_SAVED_VIDEOS", True)
+    monkeypatch.setattr(video_import, "DOWNLOAD_LIKED_VIDEOS", True)
+    monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(crud, "BULK_CHUNK_SIZE", 2)
+
+    chunks: list[list[str]] = []
+    original_add = crud.add_videos_bulk
+
+    def recording_add(db: Session, videos: list) -> None:
+        chunks.append([video.id for video in videos])
+        original_add(db, videos)
+
+    monkeypatch.setattr(video_import.crud, "add_videos_bulk", recording_add)
+
+    video_import.import_from_file()
+
+    assert chunks == [["0", "1"], ["2", "3"], ["4", "5"], ["6"]]
+    state = {v.id: (v.liked, v.saved) for v in crud.get_videos(sqlite_session)}
+    assert state == {
+        "0": (True, True),
+        "1": (True, False),
+        "2": (True, False),
+        "3": (True, False),
+        "4": (True, False),
+        "5": (False, True),
+        "6": (False, True),
+    }
+
+
 @pytest.mark.integration
 def test_import_from_tiktok_adds_and_updates_videos(
     sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
@@ -138,3 +192,139 @@ def test_import_from_tiktok_adds_and_updates_videos(
     assert {v.id for v in videos if v.id.startswith("new-saved-") and not v.liked and v.saved} == {
         f"new-saved-{i}" for i in range(20)
     }
+
+
+@pytest.mark.integration
+def test_import_from_file_skips_unchanged_file(
+    sqlite_session: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    payload = {
+        "Your Activity": {
+            "Like List": {
+                "ItemFavoriteList": [
+                    {"date": "2025-01-02 10:00:00", "link": "https://www.tiktok.com/@u/video/2/"}
+                ]
+            },
+        }
+    }
+    src = tmp_path / "data.json"
+    src.write_text(json.dumps(payload), encoding="utf-8")
+
+    monkeypatch.setattr(video_import, "TIKTOK_DATA_FILE", str(src))
+    monkeypatch.setattr(video_import, "DOWNLOAD_SAVED_VIDEOS", False)
+    monkeypatch.setattr(video_import, "DOWNLOAD_LIKED_VIDEOS", True)
+    monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
+
+    parsed: list[str] = []
+    original_iter = video_import.iter_tiktok_json_file
+
+    def counting_iter(file: str):
+        parsed.append(file)
+        return original_iter(file)
+
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", counting_iter)
+    hashed: list[str] = []
+    original_hash = video_import._file_sha256
+    monkeypatch.setattr(
+        video_import, "_file_sha256", lambda file: hashed.append(file) or original_hash(file)
+    )
+
+    video_import.import_from_file()
+    assert len(parsed) == 1
+    assert len(hashed) == 1
+
+    # Файл не менялся: не читаем его вовсе
+    video_import.import_from_file()
+    assert len(parsed) == 1
+    assert len(hashed) == 1
+
+    # Файл скопировали заново с тем же содержимым: сверяем хеш, но не разбираем
+    os.utime(src, ns=(0, 0))
+    video_import.import_from_file()
+    assert len(parsed) == 1
+    assert len(hashed) == 2
+    video_import.import_from_file()
+    assert len(hashed) == 2
+
+    # Включили новый источник: импортируем заново
+    monkeypatch.setattr(video_import, "DOWNLOAD_SAVED_VIDEOS", True)
+    video_import.import_from_file()
+    assert len(parsed) == 2
+
+    # Новый экспорт
+    payload["Your Activity"]["Favorite Videos"] = {
+        "FavoriteVideoList": [
+            {"date": "2025-01-03 10:00:00", "link": "https://www.tiktok.com/@u/video/3/"}
+        ]
+    }
+    src.write_text(json.dumps(payload), encoding="utf-8")
+    video_import.import_from_file()
+    assert len(parsed) == 3
+    assert {v.id for v in crud.get_videos(sqlite_session)} == {"2", "3"}
+
+
+class _PagedLikedIE(tiktok.TikTokLikedIE):
+    """Лента лайков из 5 видео на страницу, без обращения к TikTok"""
+
+    feed: list[str] = []
+    pages: list[int] = []
+
+    def _real_initialize(self) -> None:
+        pass
+
+    def _real_extract(self, url):
+        url, data = unsmuggle_url(url, {})
+        return self.playlist_result(
+            self._entries("sec", "u", cursor=data.get("cursor")), "sec", "u"
+        )
+
+    def _build_web_query(self, _sec_uid, cursor):
+        return {"cursor": cursor}
+
+    def _download_json(self, _url, _video_id, _note, query):
+        self.pages.append(query["cursor"])
+        start = len(self.pages) * 5 - 5
+        page = self.feed[start : start + 5]
+        return {
+            "itemList": [{"id": video_id} for video_id in page],
+            "cursor": query["cursor"] - 1000,
+            "hasMore": start + 5 < len(self.feed),
+        }
+
+    def _parse_aweme_video_web(self, _video, _webpage_url, video_id, extract_flat=False):  # noqa: ARG002
+        return {"id": video_id, "timestamp": 1735689600}
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    ("new_count", "expected_pages"),
+    [
+        (0, 2),  # 10 уже лайкнутых видео подряд: 2 страницы
+        (3, 3),  # 3 новых + 10 известных: 13 видео, 3 страницы
+        (12, 5),  # 12 новых + 10 известных: 22 видео, 5 страниц
+    ],
+)
+def test_import_from_tiktok_fetches_pages_lazily(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch, new_count: int, expected_pages: int
+) -> None:
+    known = [f"known-{i}" for i in range(500)]
+    sqlite_session.add_all([Video(id=i, date=datetime(2025, 1, 1), liked=True) for i in known])
+    sqlite_session.commit()
+
+    _PagedLikedIE.feed = [f"new-{i}" for i in range(new_count)] + known
+    _PagedLikedIE.pages = []
+    monkeypatch.setattr(tiktok, "TikTokLikedIE", _PagedLikedIE)
+    monkeypatch.setattr(tiktok, "COOKIES_FILE", None)
+    monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
+    monkeypatch.setattr(video_import, "TIKTOK_USER", "u")
+
+    video_import.import_from_tiktok_source(video_import.get_user_liked_videos, "liked")
+
+    # Ленту читаем до эвристики остановки, а не все 100 страниц
+    assert len(_PagedLikedIE.pages) == expected_pages
+    assert crud.count_videos(sqlite_session) == 500 + new_count
+
+    # Следующий импорт останавливается на отметке прошлого уже на первой странице
+    _PagedLikedIE.pages = []
+    video_import.import_from_tiktok_source(video_import.get_user_liked_videos, "liked")
+    assert len(_PagedLikedIE.pages) == 1
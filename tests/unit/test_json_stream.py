@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from atp.json_stream import JsonStream
+
+DOCUMENT = {
+    "skip": {"a": [1, 2.5, -3e2, True, False, None], "b": 'кав"ычки \\ [{скобки}]', "c": {}},
+    "empty": [],
+    "keep": [{"x": "\\u043f", "y": ["]", "}"]}, "строка", 0],
+}
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_json_stream_reads_and_skips_across_chunk_boundaries(chunk_size: int) -> None:
+    stream = JsonStream(io.StringIO(json.dumps(DOCUMENT, ensure_ascii=False)), chunk_size)
+
+    result = {}
+    for key in stream.iter_object():
+        if key == "keep":
+            result[key] = [stream.read_value() for _ in stream.iter_array()]
+        else:
+            stream.skip_value()
+
+    assert result == {"keep": DOCUMENT["keep"]}
+    assert stream.peek() == ""
+
+
+@pytest.mark.unit
+def test_json_stream_skips_large_value_in_bounded_buffer() -> None:
+    payload = json.dumps({"history": [{"link": "x" * 100, "n": i} for i in range(20_000)], "k": 1})
+    stream = JsonStream(io.StringIO(payload), chunk_size=1024)
+    max_buffer = 0
+    original_fill = stream._fill
+
+    def tracking_fill() -> bool:
+        nonlocal max_buffer
+        filled = original_fill()
+        max_buffer = max(max_buffer, len(stream._buffer))
+        return filled
+
+    stream._fill = tracking_fill
+
+    values = {}
+    for key in stream.iter_object():
+        if key == "k":
+            values[key] = stream.read_value()
+        else:
+            stream.skip_value()
+
+    assert values == {"k": 1}
+    assert len(payload) > 2_000_000
+    assert max_buffer <= 2 * 1024
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("payload", ['{"a": [1, 2}', '{"a": "unterminated', '{"a" 1}', "[1]"])
+def test_json_stream_raises_on_invalid_json(payload: str) -> None:
+    stream = JsonStream(io.StringIO(payload), chunk_size=4)
+
+    with pytest.raises(ValueError):
+        for _key in stream.iter_object():
+            stream.skip_value()
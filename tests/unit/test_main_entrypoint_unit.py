@@ -1,4 +1,5 @@
 import logging
+import threading
 
 import pytest
 
@@ -14,22 +15,12 @@ def test_setup_logging_falls_back_to_info(monkeypatch: pytest.MonkeyPatch) -> No
 
 
 @pytest.mark.unit
-def test_run_download_from_file_calls_import_and_download(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    calls: list[str] = []
-    monkeypatch.setattr(app, "import_from_file", lambda: calls.append("import"))
-    monkeypatch.setattr(app, "download_new_videos", lambda: calls.append("download"))
-    app.run_download_from_file()
-    assert calls == ["import", "download"]
-
-
-@pytest.mark.unit
-def test_run_download_from_tiktok_calls_import_and_download(
+def test_run_import_from_tiktok_imports_and_wakes_download(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     calls: list[str] = []
     monkeypatch.setattr(app, "import_from_tiktok", lambda: calls.append("import"))
-    monkeypatch.setattr(app, "download_new_videos", lambda: calls.append("download"))
-    app.run_download_from_tiktok()
-    assert calls == ["import", "download"]
+    monkeypatch.setattr(app, "download_wakeup", threading.Event())
+    app.run_import_from_tiktok()
+    assert calls == ["import"]
+    assert app.download_wakeup.is_set()
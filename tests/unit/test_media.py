@@ -1,3 +1,5 @@
+import logging
+import threading
 from pathlib import Path
 
 import ffmpeg
@@ -33,19 +35,17 @@ def test_probe_duration_parses_float(monkeypatch: pytest.MonkeyPatch) -> None:
 def test_render_slideshow_returns_false_when_no_images(
     tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
-    monkeypatch.setattr(media, "SLIDESHOW_TMP_DIR", tmp_path)
     monkeypatch.setattr(media.os, "listdir", lambda _p: [])
-    assert media.render_slideshow("1") is False
+    assert media.render_slideshow("1", tmp_path) is False
 
 
 @pytest.mark.unit
 def test_render_slideshow_returns_false_when_audio_probe_fails(
     tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
-    monkeypatch.setattr(media, "SLIDESHOW_TMP_DIR", tmp_path)
     monkeypatch.setattr(media.os, "listdir", lambda _p: ["1.jpg"])
     monkeypatch.setattr(media, "_probe_duration", lambda _p: None)
-    assert media.render_slideshow("1") is False
+    assert media.render_slideshow("1", tmp_path) is False
 
 
 @pytest.mark.unit
@@ -60,8 +60,8 @@ def test_render_slideshow_success_copies_output(
     (slide_dir / "2.jpg").write_bytes(b"jpg")
     (slide_dir / "audio.mp3").write_bytes(b"mp3")
 
-    monkeypatch.setattr(media, "SLIDESHOW_TMP_DIR", slide_dir)
     monkeypatch.setattr(media, "DOWNLOADS_DIR", str(out_dir))
+    monkeypatch.setattr(media.settings, "SLIDESHOW_RENDERER", "filter")
     monkeypatch.setattr(media.os, "listdir", lambda _p: ["1.jpg", "2.jpg"])
     monkeypatch.setattr(media, "_probe_duration", lambda _p: 10.0)
 
@@ -93,7 +93,7 @@ def test_render_slideshow_success_copies_output(
     monkeypatch.setattr(media.ffmpeg, "concat", lambda *_streams, **_kwargs: FakeStream())
     monkeypatch.setattr(media.ffmpeg, "output", fake_output)
 
-    assert media.render_slideshow("vid") is True
+    assert media.render_slideshow("vid", slide_dir) is True
     assert len(slide_inputs) == 2
     assert slide_inputs[0][1]["loop"] == 1
     assert slide_inputs[0][1]["t"] == 3
@@ -103,17 +103,97 @@ def test_render_slideshow_success_copies_output(
 
 
 @pytest.mark.unit
-def test_split_video_returns_empty_if_probe_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_render_slideshow_concat_prepares_each_still_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    slide_dir = tmp_path / "slides"
+    out_dir = tmp_path / "out"
+    slide_dir.mkdir()
+    out_dir.mkdir()
+    for name in ("1.jpg", "2.jpg", "10.jpg", "audio.mp3"):
+        (slide_dir / name).write_bytes(b"data")
+
+    monkeypatch.setattr(media, "DOWNLOADS_DIR", str(out_dir))
+    monkeypatch.setattr(media.settings, "SLIDESHOW_RENDERER", "concat")
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 10.0)
+
+    still_renders: list[str] = []
+    output_kwargs: dict = {}
+
+    class FakeStream:
+        def __init__(self, output_path: str | None = None):
+            self.output_path = output_path
+
+        def filter(self, *_args, **_kwargs):
+            return self
+
+        def output(self, path, **_kwargs):
+            return FakeStream(path)
+
+        def overwrite_output(self):
+            return self
+
+        def run(self, **_kwargs):
+            if self.output_path.endswith(".png"):
+                still_renders.append(Path(self.output_path).name)
+            Path(self.output_path).write_bytes(b"out")
+
+    def fake_input(_path, **kwargs):
+        if kwargs.get("f") == "concat":
+            assert kwargs["safe"] == 0
+        return FakeStream()
+
+    def fake_output(*_streams, **kwargs):
+        output_kwargs.update(kwargs)
+        return FakeStream(_streams[-1])
+
+    monkeypatch.setattr(media.ffmpeg, "input", fake_input)
+    monkeypatch.setattr(media.ffmpeg, "output", fake_output)
+
+    assert media.render_slideshow("vid", slide_dir) is True
+    assert still_renders == ["1.png", "2.png", "10.png"]
+    assert output_kwargs["r"] == media.CONCAT_FRAMERATE
+    assert output_kwargs["tune"] == "stillimage"
+    assert output_kwargs["t"] == pytest.approx(10.0)
+
+    stills = slide_dir / "stills"
+    assert (slide_dir / "slides.ffconcat").read_text().splitlines() == [
+        "ffconcat version 1.0",
+        f"file '{stills / '1.png'}'",
+        "duration 3.000",
+        f"file '{stills / '2.png'}'",
+        "duration 3.000",
+        f"file '{stills / '10.png'}'",
+        "duration 4.000",
+        f"file '{stills / '10.png'}'",
+    ]
+    assert (out_dir / "vid.mp4").exists()
+
+    # Повторный рендер переиспользует готовые кадры
+    assert media.render_slideshow("vid", slide_dir) is True
+    assert len(still_renders) == 3
+
+
+@pytest.mark.unit
+def test_concat_entry_escapes_quotes() -> None:
+    assert media._concat_entry(Path("/tmp/it's.png")) == "file '/tmp/it'\\''s.png'\n"
+
+
+@pytest.mark.unit
+def test_split_video_returns_empty_if_probe_fails(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
     monkeypatch.setattr(media, "_probe_duration", lambda _p: None)
-    assert media.split_video(Path("/tmp/v.mp4"), 2) == []
+    assert media.split_video(Path("/tmp/v.mp4"), 2, tmp_path) == []
 
 
 @pytest.mark.unit
-def test_split_video_returns_empty_on_ffmpeg_error(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_split_video_returns_empty_on_ffmpeg_error(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
     monkeypatch.setattr(media, "_probe_duration", lambda _p: 10.0)
     monkeypatch.setattr(media.settings, "TELEGRAM_MAX_VIDEO_SIZE", 1024 * 1024)
-    called = {"cleanup": False}
-    monkeypatch.setattr(media, "temp_files_cleanup", lambda: called.__setitem__("cleanup", True))
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", False)
 
     class FakeInput:
         def output(self, *args, **kwargs):  # noqa: ARG002
@@ -127,61 +207,334 @@ def test_split_video_returns_empty_on_ffmpeg_error(monkeypatch: pytest.MonkeyPat
 
     monkeypatch.setattr(media.ffmpeg, "input", lambda *args, **kwargs: FakeInput())  # noqa: ARG005
 
-    assert media.split_video(Path("/tmp/v.mp4"), 2) == []
-    assert called["cleanup"] is True
+    assert media.split_video(Path("/tmp/v.mp4"), 2, tmp_path) == []
+
+
+class FakeSplitInput:
+    """ffmpeg.input для split_video: создаёт файл части и запоминает параметры кодирования"""
+
+    outputs: list[tuple[str, dict]] = []
+
+    def output(self, out_path: str, **kwargs):
+        Path(out_path).write_bytes(b"x")
+        self.outputs.append((out_path, kwargs))
+        return self
+
+    def overwrite_output(self):
+        return self
+
+    def run(self, **kwargs):  # noqa: ARG002
+        return None
 
 
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "sizes",
     [
-        [1500, 900, 900],  # part 1 retries once, part 2 fits first try
-        [900, 1500, 900],  # part 1 fits first try, part 2 retries once
+        {"v_part1.mp4": [1500, 900], "v_part2.mp4": [900]},  # part 1 retries once
+        {"v_part1.mp4": [900], "v_part2.mp4": [1500, 900]},  # part 2 retries once
     ],
 )
 def test_split_video_retries_lower_bitrate_until_fits(
     tmp_path: Path,
     monkeypatch: pytest.MonkeyPatch,
-    sizes: list[int],
+    sizes: dict[str, list[int]],
 ) -> None:
     video = tmp_path / "v.mp4"
     video.write_bytes(b"x")
     monkeypatch.setattr(media, "_probe_duration", lambda _p: 10.0)
     monkeypatch.setattr(media.settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
-    monkeypatch.setattr(media, "PARTS_TMP_DIR", tmp_path)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", False)
+    monkeypatch.setattr(FakeSplitInput, "outputs", [])
+    monkeypatch.setattr(media.ffmpeg, "input", lambda *args, **kwargs: FakeSplitInput())  # noqa: ARG005
+    size_iters = {name: iter(part_sizes) for name, part_sizes in sizes.items()}
+    monkeypatch.setattr(media, "get_file_size", lambda path: next(size_iters[path.name]))
 
-    class FakeInput:
-        def output(self, out_path: str, **kwargs):  # noqa: ARG002
-            Path(out_path).write_bytes(b"x")
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    output_parts = media.split_video(video, 2, work_dir)
+
+    assert output_parts == [work_dir / "v_part1.mp4", work_dir / "v_part2.mp4"]
+    assert len(FakeSplitInput.outputs) == 3
+    assert all(kwargs["x265-params"].startswith("pools=") for _, kwargs in FakeSplitInput.outputs)
+
+
+def fake_encoder(overshoot: float, calls: list[tuple[float, int]]):
+    """_encode_segment, который превышает заданный битрейт в overshoot раз"""
+
+    def encode(_video_path, _start, duration, output_path, video_bitrate_k, _threads):
+        calls.append((duration, video_bitrate_k))
+        size = int((video_bitrate_k + 64) * 125 * duration * overshoot)
+        output_path.write_bytes(b"x")
+        return size
+
+    return encode
+
+
+@pytest.mark.unit
+def test_encode_part_uses_sample_to_fit_on_first_attempt(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[tuple[float, int]] = []
+    monkeypatch.setattr(media, "_encode_segment", fake_encoder(1.3, calls))
+    monkeypatch.setattr(media, "encode_attempts", media.Counter())
+
+    assert media._encode_part(tmp_path / "v.mp4", 0, 2, 0.0, 120.0, tmp_path / "v_part1.mp4", 1)
+    # Проба и одно полное кодирование с уменьшенным битрейтом
+    assert [duration for duration, _ in calls] == [media.SAMPLE_DURATION, 120.0]
+    assert calls[1][1] < calls[0][1]
+    assert media.encode_attempts == {1: 1}
+    assert not (tmp_path / "v_part1_sample.mp4").exists()
+
+
+@pytest.mark.unit
+def test_encode_part_lowers_bitrate_proportionally_on_miss(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    calls: list[tuple[float, int]] = []
+    monkeypatch.setattr(media, "_encode_segment", fake_encoder(1.3, calls))
+    monkeypatch.setattr(media, "encode_attempts", media.Counter())
+
+    # Короткая часть кодируется без пробы, промах исправляется за одну попытку
+    assert media._encode_part(tmp_path / "v.mp4", 0, 2, 0.0, 20.0, tmp_path / "v_part1.mp4", 1)
+    assert [duration for duration, _ in calls] == [20.0, 20.0]
+    assert media.encode_attempts == {2: 1}
+
+
+@pytest.mark.unit
+def test_encode_part_gives_up_after_max_attempts(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(media.settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+    monkeypatch.setattr(media, "get_file_size", lambda _path: 5000)
+    monkeypatch.setattr(FakeSplitInput, "outputs", [])
+    monkeypatch.setattr(media.ffmpeg, "input", lambda *args, **kwargs: FakeSplitInput())  # noqa: ARG005
+    monkeypatch.setattr(media, "encode_attempts", media.Counter())
+
+    assert not media._encode_part(tmp_path / "v.mp4", 0, 1, 0.0, 5.0, tmp_path / "v_part1.mp4", 1)
+    assert len(FakeSplitInput.outputs) == media.MAX_ENCODE_ATTEMPTS
+    assert media.encode_attempts == {}
+
+
+@pytest.mark.unit
+def test_split_video_encodes_parts_concurrently_in_order(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"x")
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 40.0)
+    monkeypatch.setattr(media, "_available_cores", lambda: 8)
+    monkeypatch.setattr(media.settings, "SPLIT_WORKERS", 0)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", False)
+    monkeypatch.setattr(media, "get_file_size", lambda _path: 1)
+
+    # Все 4 части должны кодироваться одновременно, иначе барьер не пройдётся
+    barrier = threading.Barrier(4, timeout=5)
+    threads: set[str] = set()
+    encoded: list[tuple[Path, dict]] = []
+
+    def fake_encode(video_path, _index, parts, start, part_duration, output_path, threads_count):
+        barrier.wait()
+        threads.add(threading.current_thread().name)
+        encoded.append((output_path, {"start": start, "threads": threads_count}))
+        assert (video_path, parts, part_duration) == (video, 4, 10.0)
+        return True
+
+    monkeypatch.setattr(media, "_encode_part", fake_encode)
+
+    output_parts = media.split_video(video, 4, tmp_path)
+
+    assert output_parts == [tmp_path / f"v_part{i}.mp4" for i in range(1, 5)]
+    assert len(threads) == 4
+    assert {params["threads"] for _path, params in encoded} == {2}
+    assert sorted(params["start"] for _path, params in encoded) == [0, 10, 20, 30]
+
+
+@pytest.mark.unit
+def test_split_video_logs_encode_attempts_summary(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"x")
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 20.0)
+    monkeypatch.setattr(media.settings, "SPLIT_WORKERS", 1)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", False)
+    monkeypatch.setattr(media, "encode_attempts", media.Counter({1: 3}))
+
+    def fake_encode(*_args) -> bool:
+        media._record_encode_attempts(2)
+        return True
+
+    monkeypatch.setattr(media, "_encode_part", fake_encode)
+
+    with caplog.at_level(logging.INFO, logger="atp.media"):
+        assert len(media.split_video(video, 2, tmp_path)) == 2
+
+    assert "(attempts: parts): 1: 3, 2: 2" in caplog.text
+
+
+@pytest.mark.unit
+def test_split_video_removes_parts_on_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"x")
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 30.0)
+    monkeypatch.setattr(media.settings, "SPLIT_WORKERS", 2)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", False)
+
+    def fake_encode(_video_path, index, _parts, _start, _duration, output_path, _threads):
+        output_path.write_bytes(b"x")
+        if index == 1:
+            raise ffmpeg.Error("ffmpeg", b"", b"bad")
+        return True
+
+    monkeypatch.setattr(media, "_encode_part", fake_encode)
+
+    assert media.split_video(video, 3, tmp_path) == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["v.mp4"]
+
+
+@pytest.mark.unit
+def test_split_video_fails_if_part_does_not_fit(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"x")
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 30.0)
+    monkeypatch.setattr(media.settings, "SPLIT_WORKERS", 1)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", False)
+
+    def fake_encode(_video_path, index, _parts, _start, _duration, output_path, _threads):
+        output_path.write_bytes(b"x")
+        return index != 1
+
+    monkeypatch.setattr(media, "_encode_part", fake_encode)
+
+    # Неполное видео не отправляется: вместо двух частей из трёх - ошибка
+    assert media.split_video(video, 3, tmp_path) == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["v.mp4"]
+
+
+@pytest.mark.unit
+def test_probe_keyframes_counts_bytes_before_video_keyframes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    probe = {
+        "streams": [{"index": 0, "codec_type": "video"}, {"index": 1, "codec_type": "audio"}],
+        "packets": [
+            {"stream_index": 0, "pts_time": "0.000000", "size": "100", "flags": "K__"},
+            {"stream_index": 1, "pts_time": "-0.02", "size": "10", "flags": "K__"},
+            {"stream_index": 0, "pts_time": "0.500000", "size": "20", "flags": "___"},
+            {"stream_index": 0, "pts_time": "N/A", "size": "5", "flags": "___"},
+            {"stream_index": 1, "pts_time": "1.5", "size": "10", "flags": "K__"},
+            {"stream_index": 0, "pts_time": "2.000000", "size": "200", "flags": "K__"},
+        ],
+    }
+    monkeypatch.setattr(media.ffmpeg, "probe", lambda _path, **_kwargs: probe)
+
+    keyframes, total_size = media._probe_keyframes(Path("/tmp/v.mp4"))
+
+    # Аудио пакеты учитываются в размере, но не считаются ключевыми кадрами
+    assert keyframes == [(0.0, 10), (2.0, 140)]
+    assert total_size == 340
+
+
+@pytest.mark.unit
+def test_copy_cut_points_balance_part_sizes() -> None:
+    keyframes = [(0.0, 0), (2.0, 100), (4.0, 500), (6.0, 550), (8.0, 900)]
+    assert media._copy_cut_points(keyframes, 1000, 2) == [4.0]
+    assert media._copy_cut_points(keyframes, 1000, 3) == [4.0, 6.0]
+    # Ключевых кадров меньше, чем частей: одинаковые точки не повторяются
+    assert media._copy_cut_points([(0.0, 0), (5.0, 500)], 1000, 4) == [5.0]
+
+
+def fake_segment_input(outputs: list[dict], fail: bool = False):
+    """ffmpeg.input для нарезки segment muxer'ом: создаёт файлы частей по segment_times"""
+
+    class FakeSegmentInput:
+        def output(self, pattern: str, **kwargs):
+            outputs.append(kwargs)
+            self.pattern = pattern
+            self.count = len(kwargs["segment_times"].split(",")) + 1
             return self
 
         def overwrite_output(self):
             return self
 
-        def run(self, **kwargs):  # noqa: ARG002
-            return None
+        def run(self, **_kwargs):
+            if fail:
+                raise ffmpeg.Error("ffmpeg", b"", b"bad")
+            for i in range(1, self.count + 1):
+                Path(self.pattern % i).write_bytes(b"x")
+
+    return lambda _path, **_kwargs: FakeSegmentInput()
 
-    monkeypatch.setattr(media.ffmpeg, "input", lambda *args, **kwargs: FakeInput())  # noqa: ARG005
-    size_iter = iter(sizes)
-    monkeypatch.setattr(media, "get_file_size", lambda _path: next(size_iter))
 
-    output_parts = media.split_video(video, 2)
+@pytest.mark.unit
+def test_split_video_stream_copy_reencodes_only_oversized_parts(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = tmp_path / "v.mp4"
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 30.0)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", True)
+    monkeypatch.setattr(media.settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+    monkeypatch.setattr(
+        media, "_probe_keyframes", lambda _p: ([(0.0, 0), (9.5, 900), (21.0, 1800)], 2700)
+    )
+    outputs: list[dict] = []
+    monkeypatch.setattr(media.ffmpeg, "input", fake_segment_input(outputs))
+    sizes = {"v_part1.mp4": 900, "v_part2.mp4": 1200, "v_part3.mp4": 600}
+    monkeypatch.setattr(media, "get_file_size", lambda path: sizes[path.name])
 
-    assert len(output_parts) == 2
+    encoded: list[tuple] = []
+
+    def fake_encode(_video_path, index, parts, start, duration, output_path, _threads):
+        encoded.append((index, parts, start, duration, output_path.name))
+        return True
+
+    monkeypatch.setattr(media, "_encode_part", fake_encode)
+
+    output_parts = media.split_video(video, 3, tmp_path)
+
+    assert output_parts == [tmp_path / f"v_part{i}.mp4" for i in range(1, 4)]
+    assert outputs[0]["c"] == "copy"
+    assert outputs[0]["segment_times"] == "9.499000,20.999000"
+    assert encoded == [(1, 3, 9.5, 11.5, "v_part2.mp4")]
+
+
+@pytest.mark.unit
+def test_split_video_falls_back_to_encoding_when_stream_copy_fails(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = tmp_path / "v.mp4"
+    monkeypatch.setattr(media, "_probe_duration", lambda _p: 20.0)
+    monkeypatch.setattr(media.settings, "SPLIT_STREAM_COPY", True)
+    monkeypatch.setattr(media, "_probe_keyframes", lambda _p: ([(0.0, 0), (10.0, 500)], 1000))
+    monkeypatch.setattr(media.ffmpeg, "input", fake_segment_input([], fail=True))
+
+    encoded: list[tuple] = []
+
+    def fake_encode(_video_path, index, _parts, start, duration, _output_path, _threads):
+        encoded.append((index, start, duration))
+        return True
+
+    monkeypatch.setattr(media, "_encode_part", fake_encode)
+
+    assert len(media.split_video(video, 2, tmp_path)) == 2
+    assert sorted(encoded) == [(0, 0.0, 10.0), (1, 10.0, 10.0)]
 
 
 @pytest.mark.unit
 def test_temp_files_cleanup_ignores_remove_errors(
     tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
-    a = tmp_path / "a"
-    b = tmp_path / "b"
-    a.mkdir()
-    b.mkdir()
-    (a / "f1").write_text("x", encoding="utf-8")
-    (b / "f2").write_text("x", encoding="utf-8")
-    monkeypatch.setattr(media, "SLIDESHOW_TMP_DIR", a)
-    monkeypatch.setattr(media, "PARTS_TMP_DIR", b)
+    stale = tmp_path / "1_abc"
+    stale.mkdir()
+    (stale / "part1.mp4").write_text("x", encoding="utf-8")
+    (tmp_path / "f1").write_text("x", encoding="utf-8")
+    (tmp_path / "f2").write_text("x", encoding="utf-8")
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
 
     def fail_once(path):
         if str(path).endswith("f1"):
@@ -190,5 +543,30 @@ def test_temp_files_cleanup_ignores_remove_errors(
 
     monkeypatch.setattr(media.os, "remove", fail_once)
     media.temp_files_cleanup()
-    assert (a / "f1").exists()
-    assert not (b / "f2").exists()
+    assert (tmp_path / "f1").exists()
+    assert not (tmp_path / "f2").exists()
+    assert not stale.exists()
+
+
+@pytest.mark.unit
+def test_workspace_is_isolated_and_removed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
+
+    with media.workspace("1") as first, media.workspace("1") as second:
+        assert first != second
+        assert first.parent == second.parent == tmp_path
+        (first / "1.jpg").write_bytes(b"jpg")
+        assert not (second / "1.jpg").exists()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+def test_workspace_is_removed_on_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
+
+    with pytest.raises(RuntimeError), media.workspace("1") as work_dir:
+        (work_dir / "part1.mp4").write_bytes(b"x")
+        raise RuntimeError("boom")
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,82 @@
+import io
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import pytest
+
+from atp.multipart import MultipartEncoder
+
+
+def parse_form(content_type: str, body: bytes) -> dict[str, tuple[str | None, bytes]]:
+    """Разбирает multipart тело: имя поля -> (имя файла, содержимое)"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    return {
+        part.get_param("name", header="content-disposition"): (
+            part.get_filename(),
+            part.get_payload(decode=True),
+        )
+        for part in message.iter_parts()
+    }
+
+
+class RecordingFile(io.BytesIO):
+    """BytesIO, запоминающий размер каждого чтения"""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+        self.reads: list[int] = []
+
+    def read(self, size: int | None = -1) -> bytes:
+        self.reads.append(size)
+        return super().read(size)
+
+
+@pytest.mark.unit
+def test_multipart_encoder_builds_valid_form() -> None:
+    video = RecordingFile(b"v" * 1000, "/tmp/work/video.mp4")
+    body = MultipartEncoder(
+        {"chat_id": "chat", "supports_streaming": True},
+        {"video": video, "thumb": io.BytesIO(b"bmp")},
+        chunk_size=64,
+    )
+
+    data = body.read()
+
+    assert len(data) == len(body)
+    assert parse_form(body.content_type, data) == {
+        "chat_id": (None, b"chat"),
+        "supports_streaming": (None, b"True"),
+        "video": ("video.mp4", b"v" * 1000),
+        "thumb": ("thumb", b"bmp"),
+    }
+    # Файл читается кусками, а не целиком
+    assert max(video.reads) == 64
+
+
+@pytest.mark.unit
+def test_multipart_encoder_reads_in_chunks_and_resets() -> None:
+    file = io.BytesIO(b"skip" + b"x" * 300)
+    file.seek(4)
+    body = MultipartEncoder({"a": "b"}, {"f": file}, chunk_size=50)
+
+    first = b"".join(iter(lambda: body.read(7), b""))
+    body.reset()
+    second = b"".join(body)
+
+    assert first == second
+    assert len(first) == len(body)
+    # Файл отправляется с позиции, на которой был передан
+    assert parse_form(body.content_type, first)["f"] == ("f", b"x" * 300)
+
+
+@pytest.mark.unit
+def test_multipart_encoder_fails_on_truncated_file() -> None:
+    file = io.BytesIO(b"x" * 100)
+    body = MultipartEncoder({}, {"f": file})
+    file.truncate(10)
+
+    with pytest.raises(OSError, match="truncated"):
+        body.read()
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from atp import outbox, settings
+from atp.models import Video
+
+
+@pytest.mark.unit
+def test_get_caption_truncates_to_telegram_limit() -> None:
+    video = Video(
+        id="v1",
+        author="author",
+        name="x" * 2000,
+        date=datetime(2025, 1, 1),
+    )
+
+    caption = outbox._get_caption(video)
+
+    assert len(caption) == 1024
+    assert caption.endswith("01.01.2025")
+
+
+@pytest.mark.unit
+def test_get_caption_keeps_text_when_exactly_at_limit() -> None:
+    author = "a" * 100
+    # 1024 - (len(author + "\n") + len("\n01.01.2025")) = 912
+    name = "x" * 912
+    video = Video(
+        id="v2",
+        author=author,
+        name=name,
+        date=datetime(2025, 1, 1),
+    )
+
+    caption = outbox._get_caption(video)
+
+    assert len(caption) == 1024
+    assert not caption.split("\n")[1].endswith("...")
+    assert caption.endswith("01.01.2025")
+
+
+@pytest.mark.unit
+def test_get_caption_adds_ellipsis_when_name_is_too_long() -> None:
+    author = "author"
+    # Allowed name length with this author is 1006, make it 1 char longer.
+    name = "x" * 1007
+    video = Video(
+        id="v3",
+        author=author,
+        name=name,
+        date=datetime(2025, 1, 1),
+    )
+
+    caption = outbox._get_caption(video)
+
+    content, _, date = caption.rpartition("\n")
+    assert len(caption) == 1024
+    assert content.endswith("...")
+    assert date == "01.01.2025"
+
+
+@pytest.mark.unit
+def test_retry_delay_doubles_up_to_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_DELAY", 60)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_RETRY_DELAY", 300)
+
+    assert [outbox._retry_delay(attempt) for attempt in range(1, 6)] == [60, 120, 240, 300, 300]
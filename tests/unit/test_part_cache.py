@@ -0,0 +1,153 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from atp import part_cache, settings
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "part_cache"
+    path.mkdir()
+    monkeypatch.setattr(settings, "PART_CACHE_DIR", path)
+    monkeypatch.setattr(settings, "PART_CACHE_SIZE", 1)
+    return path
+
+
+@pytest.fixture
+def splits(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, int]]:
+    """Подменяет split_video: каждая часть - 200 КБ, вызовы записываются"""
+    calls: list[tuple[str, int]] = []
+
+    def fake_split(video_path: Path, parts: int, work_dir: Path) -> list[Path]:
+        calls.append((video_path.name, parts))
+        paths = [work_dir / f"{video_path.stem}_part{i + 1}.mp4" for i in range(parts)]
+        for i, path in enumerate(paths):
+            path.write_bytes(bytes([i]) * 200 * 1024)
+        return paths
+
+    monkeypatch.setattr(part_cache, "split_video", fake_split)
+    return calls
+
+
+def _video(tmp_path: Path, name: str, content: bytes) -> Path:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+def _age(path: Path, seconds: int) -> None:
+    """Делает запись кэша давно использованной"""
+    stat = path.stat()
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+@pytest.mark.unit
+def test_get_video_parts_reuses_parts_of_identical_content(
+    tmp_path: Path, cache_dir: Path, splits: list[tuple[str, int]]
+) -> None:
+    video = _video(tmp_path, "a.mp4", b"same")
+    copy = _video(tmp_path, "b.mp4", b"same")
+
+    parts = part_cache.get_video_parts("a", video, 3)
+    again = part_cache.get_video_parts("b", copy, 3)
+
+    assert splits == [("a.mp4", 3)]
+    assert again == parts
+    assert [part.name for part in parts] == ["part01.mp4", "part02.mp4", "part03.mp4"]
+    assert [part.read_bytes()[:1] for part in parts] == [b"\x00", b"\x01", b"\x02"]
+    assert all(part.parent.parent == cache_dir for part in parts)
+
+
+@pytest.mark.unit
+@pytest.mark.usefixtures("cache_dir")
+def test_get_video_parts_key_includes_content_and_part_count(
+    tmp_path: Path, splits: list[tuple[str, int]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = _video(tmp_path, "a.mp4", b"first")
+
+    part_cache.get_video_parts("a", video, 2)
+    part_cache.get_video_parts("a", video, 3)
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_VIDEO_SIZE", 1000)
+    part_cache.get_video_parts("a", video, 3)
+    video.write_bytes(b"second")
+    part_cache.get_video_parts("a", video, 3)
+
+    assert splits == [("a.mp4", 2), ("a.mp4", 3), ("a.mp4", 3), ("a.mp4", 3)]
+
+
+@pytest.mark.unit
+def test_get_video_parts_evicts_least_recently_used(
+    tmp_path: Path, cache_dir: Path, splits: list[tuple[str, int]]
+) -> None:
+    # Лимит 1 МБ, запись из 2 частей занимает 400 КБ: рядом с новой помещается одна старая
+    first = _video(tmp_path, "first.mp4", b"1")
+    second = _video(tmp_path, "second.mp4", b"2")
+    third = _video(tmp_path, "third.mp4", b"3")
+
+    first_dir = part_cache.get_video_parts("1", first, 2)[0].parent
+    _age(first_dir, 20)
+    second_dir = part_cache.get_video_parts("2", second, 2)[0].parent
+    _age(second_dir, 10)
+    # Обращение к первой записи делает её самой свежей
+    part_cache.get_video_parts("1", first, 2)
+    third_dir = part_cache.get_video_parts("3", third, 2)[0].parent
+
+    assert sorted(cache_dir.iterdir()) == sorted([first_dir, third_dir])
+    assert splits == [("first.mp4", 2), ("second.mp4", 2), ("third.mp4", 2)]
+
+
+@pytest.mark.unit
+def test_get_video_parts_keeps_entry_in_use_over_limit(
+    tmp_path: Path, cache_dir: Path, splits: list[tuple[str, int]]
+) -> None:
+    video = _video(tmp_path, "big.mp4", b"big")
+
+    parts = part_cache.get_video_parts("big", video, 6)
+
+    assert len(splits) == 1
+    assert list(cache_dir.iterdir()) == [parts[0].parent]
+    assert all(part.exists() for part in parts)
+
+
+@pytest.mark.unit
+def test_get_video_parts_does_not_cache_failed_split(
+    tmp_path: Path, cache_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    video = _video(tmp_path, "a.mp4", b"a")
+    monkeypatch.setattr(part_cache, "split_video", lambda *_args: [])
+
+    assert part_cache.get_video_parts("a", video, 2) == []
+    assert list(cache_dir.iterdir()) == []
+
+
+@pytest.mark.unit
+@pytest.mark.usefixtures("cache_dir")
+def test_get_cached_parts_by_key_skips_parts_older_than_source(
+    tmp_path: Path, splits: list[tuple[str, int]]
+) -> None:
+    video = _video(tmp_path, "a.mp4", b"a")
+    parts = part_cache.get_video_parts("a", video, 3)
+    key = parts[0].parent.name
+
+    assert part_cache.key_parts(key) == 3
+    assert part_cache.get_cached_parts(key, video) == parts
+    assert part_cache.get_cached_parts("missing-1-3", video) == []
+
+    # Файл изменили после разбивки: части по старому ключу не подходят
+    stat = video.stat()
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert part_cache.get_cached_parts(key, video) == []
+    assert splits == [("a.mp4", 3)]
+
+
+@pytest.mark.unit
+def test_cache_cleanup_removes_unfinished_entries(cache_dir: Path) -> None:
+    (cache_dir / ".tmp-abc").mkdir()
+    (cache_dir / ".tmp-abc" / "part01.mp4").write_bytes(b"x")
+    (cache_dir / "done").mkdir()
+
+    part_cache.cache_cleanup()
+
+    assert list(cache_dir.iterdir()) == [cache_dir / "done"]
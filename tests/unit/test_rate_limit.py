@@ -0,0 +1,103 @@
+import pytest
+
+from atp import rate_limit
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.mark.unit
+def test_token_bucket_spaces_requests_by_rate() -> None:
+    clock = FakeClock()
+    bucket = rate_limit.TokenBucket(2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(5):
+        bucket.acquire()
+
+    # Первый запрос сразу, остальные через 1 / rate секунд
+    assert clock.sleeps == [0.5, 0.5, 0.5, 0.5]
+    assert clock.now == 2.0
+
+
+@pytest.mark.unit
+def test_token_bucket_allows_burst_up_to_capacity() -> None:
+    clock = FakeClock()
+    bucket = rate_limit.TokenBucket(1, capacity=3, clock=clock, sleep=clock.sleep)
+
+    clock.now = 10
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [1]
+
+
+@pytest.mark.unit
+def test_token_bucket_reserves_slots_for_concurrent_callers() -> None:
+    clock = FakeClock()
+    bucket = rate_limit.TokenBucket(1, clock=clock, sleep=lambda _s: None)
+
+    # Потоки, пришедшие одновременно, ждут каждый свою очередь, а не одну и ту же секунду
+    waits = [bucket._reserve() for _ in range(3)]
+
+    assert waits == [0, 1, 2]
+
+
+@pytest.mark.unit
+def test_token_bucket_without_rate_never_waits() -> None:
+    sleeps: list[float] = []
+    bucket = rate_limit.TokenBucket(0, sleep=sleeps.append)
+
+    for _ in range(10):
+        bucket.acquire()
+
+    assert sleeps == []
+
+
+@pytest.mark.unit
+def test_get_rate_limiter_shares_bucket_per_key() -> None:
+    a = rate_limit.get_rate_limiter("test:a", 2)
+    assert rate_limit.get_rate_limiter("test:a", 2) is a
+    assert rate_limit.get_rate_limiter("test:b", 2) is not a
+    # При изменении настроек создаётся новый ограничитель
+    assert rate_limit.get_rate_limiter("test:a", 3) is not a
+
+
+@pytest.mark.unit
+def test_token_bucket_pause_delays_and_respaces_requests() -> None:
+    clock = FakeClock()
+    bucket = rate_limit.TokenBucket(1, capacity=5, clock=clock, sleep=clock.sleep)
+
+    clock.now = 10
+    bucket.acquire()
+    bucket.pause(3)
+    for _ in range(3):
+        bucket.acquire()
+
+    # Первый запрос ждёт конца паузы, запас токенов после паузы не копится
+    assert clock.sleeps == [3, 1, 1]
+    assert clock.now == 15
+
+
+@pytest.mark.unit
+def test_token_bucket_pause_applies_without_rate_limit() -> None:
+    clock = FakeClock()
+    bucket = rate_limit.TokenBucket(0, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    bucket.pause(2)
+    bucket.acquire()
+    bucket.acquire()
+
+    assert clock.sleeps == [2]
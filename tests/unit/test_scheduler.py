@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from atp import scheduler
+from atp.scheduler import Scheduler, next_run_at
+
+
+async def _run_until(sched: Scheduler, done: threading.Event, timeout: float = 5) -> None:
+    """Запускает планировщик, пока не выставлено событие done, и отменяет его"""
+    task = asyncio.create_task(sched.run())
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not done.is_set():
+        assert asyncio.get_running_loop().time() < deadline, "scheduler did not finish in time"
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.fixture(autouse=True)
+def fast_wakeup(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(scheduler, "WAKEUP_POLL_INTERVAL", 0.01)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("now", "minute", "expected"),
+    [
+        (datetime(2025, 1, 1, 10, 15), 30, datetime(2025, 1, 1, 10, 30)),
+        (datetime(2025, 1, 1, 10, 30), 30, datetime(2025, 1, 1, 11, 30)),
+        (datetime(2025, 1, 1, 23, 45, 10), 0, datetime(2025, 1, 2, 0, 0)),
+    ],
+)
+def test_next_run_at(now: datetime, minute: int, expected: datetime) -> None:
+    assert next_run_at(now, minute) == expected
+
+
+@pytest.mark.unit
+def test_slow_job_does_not_delay_other_jobs() -> None:
+    release = threading.Event()
+    done = threading.Event()
+    runs = {"slow": 0, "fast": 0}
+
+    def slow() -> None:
+        runs["slow"] += 1
+        release.wait(timeout=5)
+
+    def fast() -> None:
+        runs["fast"] += 1
+        if runs["fast"] == 3:
+            release.set()
+            done.set()
+
+    sched = Scheduler()
+    sched.loop("slow", slow, interval=0.01)
+    sched.loop("fast", fast, interval=0.01)
+
+    asyncio.run(_run_until(sched, done))
+
+    # Быстрая задача отработала 3 раза, пока медленная выполнялась первый раз
+    assert runs == {"slow": 1, "fast": 3}
+
+
+@pytest.mark.unit
+def test_loop_runs_again_on_wakeup_and_survives_errors() -> None:
+    wakeup = threading.Event()
+    done = threading.Event()
+    calls: list[int] = []
+
+    def job() -> None:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            # Задача ждёт только события, интервала нет
+            threading.Timer(0.05, wakeup.set).start()
+            raise RuntimeError("boom")
+        done.set()
+
+    sched = Scheduler()
+    sched.loop("job", job, wakeup=wakeup)
+
+    asyncio.run(_run_until(sched, done))
+
+    assert calls == [0, 1]
+
+
+@pytest.mark.unit
+def test_hourly_job_runs_at_minute() -> None:
+    done = threading.Event()
+    start = datetime(2025, 1, 1, 10, 29, 59, 950000)
+    started_at = datetime.now()
+
+    sched = Scheduler(clock=lambda: start + (datetime.now() - started_at))
+    sched.hourly("import", done.set, minute=30)
+
+    asyncio.run(_run_until(sched, done, timeout=2))
+
+    assert datetime.now() - started_at >= timedelta(seconds=0.04)
+
+
+@pytest.mark.unit
+def test_cancel_stops_pending_runs() -> None:
+    started = threading.Event()
+    release = threading.Event()
+    calls: list[str] = []
+
+    def job() -> None:
+        calls.append("run")
+        started.set()
+        release.wait(timeout=5)
+
+    sched = Scheduler()
+    sched.loop("job", job, interval=0)
+
+    asyncio.run(_run_until(sched, started))
+    release.set()
+
+    assert calls == ["run"]
+
+
+@pytest.mark.unit
+def test_duplicate_job_name_is_rejected() -> None:
+    sched = Scheduler()
+    sched.loop("job", lambda: None, interval=1)
+
+    with pytest.raises(ValueError, match="already scheduled"):
+        sched.hourly("job", lambda: None, minute=0)
+    with pytest.raises(ValueError, match="interval or wakeup"):
+        sched.loop("other", lambda: None)
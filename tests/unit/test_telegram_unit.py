@@ -4,6 +4,13 @@ from types import SimpleNamespace
 import pytest
 
 from atp import settings, telegram
+from atp.multipart import MultipartEncoder
+
+
+def use_session(monkeypatch: pytest.MonkeyPatch, post) -> None:
+    """Подменяет HTTP сессию общего клиента Telegram"""
+    client = telegram.TelegramClient(session=SimpleNamespace(post=post), sleep=lambda _s: None)
+    monkeypatch.setattr(telegram, "_client", client)
 
 
 @pytest.mark.unit
@@ -26,9 +33,8 @@ def test_send_media_requires_video_or_photos(monkeypatch: pytest.MonkeyPatch) ->
 def test_send_media_raises_on_non_200(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "chat")
-    monkeypatch.setattr(
-        telegram.requests,
-        "post",
+    use_session(
+        monkeypatch,
         lambda *args, **kwargs: SimpleNamespace(status_code=400, text="bad"),  # noqa: ARG005
     )
     with pytest.raises(Exception, match="Failed to send Telegram media"):
@@ -53,9 +59,8 @@ def test_edit_media_returns_false_without_payload(monkeypatch: pytest.MonkeyPatc
 def test_edit_media_returns_false_on_non_200(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "chat")
-    monkeypatch.setattr(
-        telegram.requests,
-        "post",
+    use_session(
+        monkeypatch,
         lambda *args, **kwargs: SimpleNamespace(status_code=400, text="bad"),  # noqa: ARG005
     )
     assert telegram.edit_media(1, "c", video=io.BytesIO(b"x")) is False
@@ -67,12 +72,12 @@ def test_edit_media_success_with_parse_mode(monkeypatch: pytest.MonkeyPatch) ->
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "chat")
     captured = {}
 
-    def fake_post(url: str, data: dict, files: dict, timeout: int):  # noqa: ARG001
-        captured["data"] = data
-        captured["files"] = files
+    def fake_post(url: str, data: MultipartEncoder, headers: dict, timeout: int):  # noqa: ARG001
+        captured["data"] = data.fields
+        captured["files"] = data.files
         return SimpleNamespace(status_code=200, text="ok")
 
-    monkeypatch.setattr(telegram.requests, "post", fake_post)
+    use_session(monkeypatch, fake_post)
     ok = telegram.edit_media(
         5,
         "caption",
@@ -88,15 +93,15 @@ def test_edit_media_success_with_parse_mode(monkeypatch: pytest.MonkeyPatch) ->
 def test_discover_chat_id_returns_early_without_token(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "")
-    called = {"get": False}
+    called = {"post": False}
 
-    def _get(*args, **kwargs):  # noqa: ARG001
-        called["get"] = True
+    def _post(*args, **kwargs):  # noqa: ARG001
+        called["post"] = True
         return None
 
-    monkeypatch.setattr(telegram.requests, "get", _get)
+    use_session(monkeypatch, _post)
     telegram.discover_chat_id()
-    assert called["get"] is False
+    assert called["post"] is False
 
 
 @pytest.mark.unit
@@ -108,20 +113,18 @@ def test_discover_chat_id_clears_chat_id_when_probe_message_fails(
     writes: list[tuple[str, str]] = []
     monkeypatch.setattr(settings, "set_config_value", lambda k, v: writes.append((k, v)))
 
-    def fake_get(*args, **kwargs):  # noqa: ARG001
-        return SimpleNamespace(
-            status_code=200,
-            json=lambda: {
-                "result": [{"message": {"chat": {"id": 123, "title": "x"}}}],
-            },
-            text="ok",
-        )
-
-    def fake_post(*args, **kwargs):  # noqa: ARG001
+    def fake_post(url: str, **kwargs):  # noqa: ARG001
+        if url.endswith("/getUpdates"):
+            return SimpleNamespace(
+                status_code=200,
+                json=lambda: {
+                    "result": [{"message": {"chat": {"id": 123, "title": "x"}}}],
+                },
+                text="ok",
+            )
         return SimpleNamespace(status_code=400, text="forbidden")
 
-    monkeypatch.setattr(telegram.requests, "get", fake_get)
-    monkeypatch.setattr(telegram.requests, "post", fake_post)
+    use_session(monkeypatch, fake_post)
 
     telegram.discover_chat_id()
 
@@ -136,9 +139,8 @@ def test_discover_chat_id_handles_failed_updates_request(
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "")
     monkeypatch.setattr(settings, "set_config_value", lambda *_args, **_kwargs: None)
-    monkeypatch.setattr(
-        telegram.requests,
-        "get",
+    use_session(
+        monkeypatch,
         lambda *args, **kwargs: SimpleNamespace(status_code=500, text="err"),  # noqa: ARG005
     )
     telegram.discover_chat_id()
@@ -150,9 +152,8 @@ def test_discover_chat_id_handles_empty_updates(monkeypatch: pytest.MonkeyPatch)
     monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "")
     monkeypatch.setattr(settings, "set_config_value", lambda *_args, **_kwargs: None)
-    monkeypatch.setattr(
-        telegram.requests,
-        "get",
+    use_session(
+        monkeypatch,
         lambda *args, **kwargs: SimpleNamespace(  # noqa: ARG005
             status_code=200, text="ok", json=lambda: {"result": []}
         ),
@@ -167,11 +168,104 @@ def test_discover_chat_id_clears_value_on_exception(monkeypatch: pytest.MonkeyPa
     monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "")
     writes: list[tuple[str, str]] = []
     monkeypatch.setattr(settings, "set_config_value", lambda k, v: writes.append((k, v)))
-    monkeypatch.setattr(
-        telegram.requests,
-        "get",
+    use_session(
+        monkeypatch,
         lambda *args, **kwargs: (_ for _ in ()).throw(RuntimeError("boom")),  # noqa: ARG005
     )
     telegram.discover_chat_id()
     assert settings.TELEGRAM_CHAT_ID is None
     assert ("TELEGRAM_CHAT_ID", "") in writes
+
+
+@pytest.mark.unit
+def test_client_retries_after_rate_limit_and_resends_file(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
+    bodies: list[bytes] = []
+    sleeps: list[float] = []
+
+    def fake_post(_url: str, data, headers: dict, timeout: tuple):  # noqa: ARG001
+        bodies.append(data.read())
+        if len(bodies) < 3:
+            return SimpleNamespace(
+                status_code=429,
+                headers={},
+                json=lambda: {"ok": False, "parameters": {"retry_after": 7}},
+            )
+        return SimpleNamespace(status_code=200)
+
+    client = telegram.TelegramClient(session=SimpleNamespace(post=fake_post), sleep=sleeps.append)
+    response = client.call("sendVideo", {"chat_id": "c"}, {"video": io.BytesIO(b"v" * 100)})
+
+    assert response.status_code == 200
+    assert sleeps == [7, 7]
+    # После 429 тело отправляется заново целиком
+    assert len(bodies) == 3
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert b"v" * 100 in bodies[0]
+
+
+@pytest.mark.unit
+def test_client_gives_up_after_max_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
+    sleeps: list[float] = []
+    response_429 = SimpleNamespace(
+        status_code=429, headers={}, json=lambda: (_ for _ in ()).throw(ValueError())
+    )
+    client = telegram.TelegramClient(
+        session=SimpleNamespace(post=lambda *_args, **_kwargs: response_429),
+        max_retries=2,
+        sleep=sleeps.append,
+    )
+
+    assert client.call("getUpdates") is response_429
+    # Без retry_after ждём с экспоненциальным backoff
+    assert sleeps == [2, 4]
+
+
+@pytest.mark.unit
+def test_retry_after_reads_header() -> None:
+    response = SimpleNamespace(headers={"Retry-After": "3"}, json=lambda: {"ok": False})
+    assert telegram._retry_after(response, 1) == 3
+
+
+@pytest.mark.unit
+def test_client_pauses_chat_limiter_on_rate_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setattr(settings, "TELEGRAM_RATE_LIMIT", 1)
+    now = [0.0]
+    limiter_sleeps: list[float] = []
+
+    def limiter_sleep(seconds: float) -> None:
+        limiter_sleeps.append(seconds)
+        now[0] += seconds
+
+    limiters: dict[str, telegram.TokenBucket] = {}
+
+    def fake_get_rate_limiter(key: str, rate: float) -> telegram.TokenBucket:
+        assert rate == 1
+        return limiters.setdefault(
+            key, telegram.TokenBucket(rate, clock=lambda: now[0], sleep=limiter_sleep)
+        )
+
+    monkeypatch.setattr(telegram, "get_rate_limiter", fake_get_rate_limiter)
+    statuses = iter([200, 429, 200, 200])
+
+    def fake_post(_url: str, **_kwargs):
+        return SimpleNamespace(
+            status_code=next(statuses),
+            headers={},
+            json=lambda: {"ok": False, "parameters": {"retry_after": 5}},
+        )
+
+    client_sleeps: list[float] = []
+    client = telegram.TelegramClient(
+        session=SimpleNamespace(post=fake_post), sleep=client_sleeps.append
+    )
+
+    for _ in range(3):
+        client.call("editMessageMedia", {"chat_id": "c"})
+
+    # Пауза после 429 общая для чата, отдельный sleep в клиенте не нужен
+    assert client_sleeps == []
+    assert limiter_sleeps == [1, 5, 1]
+    assert list(limiters) == ["telegram:c"]
@@ -1,8 +1,13 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
 from types import SimpleNamespace
 
 import pytest
+from yt_dlp.utils import unsmuggle_url
 
-from atp import tiktok
+from atp import media, tiktok
 from atp.models import Video, VideoStatus, VideoType
 
 
@@ -29,7 +34,7 @@ def test_yt_dlp_request_retries_with_cookies_on_login_error(
 
     class FakeYDL:
         def __init__(self, opts: dict):
-            calls.append(dict(opts))
+            self.opts = dict(opts)
 
         def __enter__(self):
             return self
@@ -38,6 +43,7 @@ def test_yt_dlp_request_retries_with_cookies_on_login_error(
             return False
 
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             if len(calls) == 1:
                 raise Exception(tiktok.COOKIE_ERRORS[i])
             return {"ok": True}
@@ -63,7 +69,7 @@ def test_yt_dlp_request_raises_network_error_after_retries(
 
     class FakeYDL:
         def __init__(self, opts: dict):
-            calls.append(dict(opts))
+            self.opts = dict(opts)
 
         def __enter__(self):
             return self
@@ -72,6 +78,7 @@ def test_yt_dlp_request_raises_network_error_after_retries(
             return False
 
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             raise Exception("Read timed out")
 
     monkeypatch.setattr(tiktok.yt_dlp, "YoutubeDL", FakeYDL)
@@ -101,7 +108,7 @@ def test_yt_dlp_request_raises_non_network_error(
 
     class FakeYDL:
         def __init__(self, opts: dict):
-            calls.append(dict(opts))
+            self.opts = dict(opts)
 
         def __enter__(self):
             return self
@@ -110,6 +117,7 @@ def test_yt_dlp_request_raises_non_network_error(
             return False
 
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             raise ValueError("bad data")
 
     monkeypatch.setattr(tiktok.yt_dlp, "YoutubeDL", FakeYDL)
@@ -130,7 +138,7 @@ def test_yt_dlp_request_raises_correct_error_after_different_errors(
 
     class FakeYDLBase:
         def __init__(self, opts: dict):
-            calls.append(dict(opts))
+            self.opts = dict(opts)
 
         def __enter__(self):
             return self
@@ -143,6 +151,7 @@ def test_yt_dlp_request_raises_correct_error_after_different_errors(
 
     class FakeYDLBadNetwork(FakeYDLBase):
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             if len(calls) == 1:
                 raise ValueError("bad data")
             else:
@@ -150,6 +159,7 @@ def test_yt_dlp_request_raises_correct_error_after_different_errors(
 
     class FakeYDLNetworkBad(FakeYDLBase):
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             if len(calls) == 1:
                 raise ValueError("Read timed out")
             else:
@@ -207,7 +217,7 @@ def test_yt_dlp_request_success_after_network_error(
 
     class FakeYDL:
         def __init__(self, opts: dict):
-            calls.append(dict(opts))
+            self.opts = dict(opts)
 
         def __enter__(self):
             return self
@@ -216,6 +226,7 @@ def test_yt_dlp_request_success_after_network_error(
             return False
 
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             if len(calls) == 1:
                 raise ValueError("Read timed out")
             else:
@@ -230,6 +241,41 @@ def test_yt_dlp_request_success_after_network_error(
     assert len(calls) == 2
 
 
+@pytest.mark.unit
+def test_yt_dlp_request_takes_limiter_token_for_every_attempt(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    events: list[str] = []
+    errors = iter(["Read timed out", tiktok.COOKIE_ERRORS[0]])
+
+    class FakeYDL:
+        def __init__(self, opts: dict):
+            self.opts = dict(opts)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def extract_info(self, *_args, **_kwargs):
+            events.append("request")
+            if error := next(errors, None):
+                raise ValueError(error)
+            return {"ok": True}
+
+    monkeypatch.setattr(tiktok.yt_dlp, "YoutubeDL", FakeYDL)
+    monkeypatch.setattr(tiktok, "MAX_RETRIES", 3)
+    monkeypatch.setattr(tiktok, "COOKIES_FILE", "/tmp/cookies.txt")
+    limiter = SimpleNamespace(acquire=lambda: events.append("token"))
+
+    assert tiktok.yt_dlp_request({}, "https://www.tiktok.com/@/video/1", limiter=limiter) == {
+        "ok": True
+    }
+    # Сетевая ошибка, затем повтор с cookies: каждый запрос ждёт свой токен
+    assert events == ["token", "request"] * 3
+
+
 @pytest.mark.unit
 def test_yt_dlp_request_success_after_different_errors_with_always_retry(
     monkeypatch: pytest.MonkeyPatch,
@@ -238,7 +284,7 @@ def test_yt_dlp_request_success_after_different_errors_with_always_retry(
 
     class FakeYDLBase:
         def __init__(self, opts: dict):
-            calls.append(dict(opts))
+            self.opts = dict(opts)
 
         def __enter__(self):
             return self
@@ -251,6 +297,7 @@ def test_yt_dlp_request_success_after_different_errors_with_always_retry(
 
     class FakeYDLBadNetworkOk(FakeYDLBase):
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             if len(calls) == 1:
                 raise ValueError("bad data")
             elif len(calls) == 2:
@@ -260,6 +307,7 @@ def test_yt_dlp_request_success_after_different_errors_with_always_retry(
 
     class FakeYDLNetworkBadOk(FakeYDLBase):
         def extract_info(self, *_args, **_kwargs):
+            calls.append(self.opts)
             if len(calls) == 1:
                 raise ValueError("Read timed out")
             elif len(calls) == 2:
@@ -283,6 +331,122 @@ def test_yt_dlp_request_success_after_different_errors_with_always_retry(
     assert len(calls) == 3
 
 
+class _PooledFakeYDL:
+    instances: list["_PooledFakeYDL"] = []
+
+    def __init__(self, opts: dict):
+        self.opts = dict(opts)
+        self.requests = 0
+        self.closed = False
+        _PooledFakeYDL.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.closed = True
+        return False
+
+    def extract_info(self, *_args, **_kwargs):
+        self.requests += 1
+        if self.opts.get("fail_network"):
+            raise Exception("Read timed out")
+        return {"ok": True}
+
+
+@pytest.fixture
+def pooled_ydl(monkeypatch: pytest.MonkeyPatch) -> list[_PooledFakeYDL]:
+    _PooledFakeYDL.instances = []
+    monkeypatch.setattr(tiktok.yt_dlp, "YoutubeDL", _PooledFakeYDL)
+    monkeypatch.setattr(tiktok, "COOKIES_FILE", None)
+    monkeypatch.setattr(tiktok, "MAX_RETRIES", 3)
+    return _PooledFakeYDL.instances
+
+
+@pytest.mark.unit
+def test_yt_dlp_request_reuses_instance_per_options_profile(
+    pooled_ydl: list[_PooledFakeYDL],
+) -> None:
+    for video_id in range(3):
+        tiktok.yt_dlp_request({"quiet": True}, f"https://www.tiktok.com/@/video/{video_id}")
+    tiktok.yt_dlp_request({"quiet": False}, "https://www.tiktok.com/@/video/1", download=True)
+
+    assert len(pooled_ydl) == 2
+    assert pooled_ydl[0].requests == 3
+    assert pooled_ydl[1].requests == 1
+    assert not any(ydl.closed for ydl in pooled_ydl)
+
+
+@pytest.mark.unit
+def test_yt_dlp_request_rebuilds_pool_when_proxy_or_cookies_change(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, pooled_ydl: list[_PooledFakeYDL]
+) -> None:
+    cookies = tmp_path / "cookies.txt"
+    cookies.write_text("old", encoding="utf-8")
+    monkeypatch.setattr(tiktok, "COOKIES_FILE", str(cookies))
+    monkeypatch.delenv("ALL_PROXY", raising=False)
+    url = "https://www.tiktok.com/@/video/1"
+
+    tiktok.yt_dlp_request({}, url)
+    tiktok.yt_dlp_request({}, url)
+    assert len(pooled_ydl) == 1
+
+    monkeypatch.setenv("ALL_PROXY", "socks5://127.0.0.1:1080")
+    tiktok.yt_dlp_request({}, url)
+    assert len(pooled_ydl) == 2
+    assert pooled_ydl[0].closed
+
+    cookies.write_text("new", encoding="utf-8")
+    os.utime(cookies, (0, 0))
+    tiktok.yt_dlp_request({}, url)
+    assert len(pooled_ydl) == 3
+    assert pooled_ydl[1].closed
+    assert cookies.read_text(encoding="utf-8") == "new"
+
+
+@pytest.mark.unit
+def test_yt_dlp_request_drops_instance_after_network_error(
+    pooled_ydl: list[_PooledFakeYDL],
+) -> None:
+    with pytest.raises(tiktok.NetworkError):
+        tiktok.yt_dlp_request({"fail_network": True}, "https://www.tiktok.com/@/video/1")
+
+    assert len(pooled_ydl) == 3
+    assert all(ydl.closed for ydl in pooled_ydl)
+
+
+@pytest.mark.unit
+def test_yt_dlp_executor_closes_worker_instances_on_shutdown(
+    pooled_ydl: list[_PooledFakeYDL],
+) -> None:
+    executor = tiktok.YtDlpExecutor(max_workers=2)
+    futures = [
+        executor.submit(tiktok.yt_dlp_request, {}, f"https://www.tiktok.com/@/video/{i}")
+        for i in range(4)
+    ]
+    assert all(future.result() == {"ok": True} for future in futures)
+    assert not any(ydl.closed for ydl in pooled_ydl)
+
+    executor.shutdown(wait=True)
+
+    assert 1 <= len(pooled_ydl) <= 2
+    assert all(ydl.closed for ydl in pooled_ydl)
+    assert tiktok._ydl_pools == {}
+
+
+@pytest.mark.unit
+def test_close_ydl_pool_closes_only_current_thread(pooled_ydl: list[_PooledFakeYDL]) -> None:
+    executor = tiktok.YtDlpExecutor(max_workers=1)
+    executor.submit(tiktok.yt_dlp_request, {}, "https://www.tiktok.com/@/video/1").result()
+    tiktok.yt_dlp_request({}, "https://www.tiktok.com/@/video/2")
+
+    tiktok.close_ydl_pool()
+
+    assert [ydl.closed for ydl in pooled_ydl] == [False, True]
+    executor.shutdown(wait=True)
+    assert all(ydl.closed for ydl in pooled_ydl)
+
+
 @pytest.mark.unit
 def test_download_video_returns_none_on_network_error(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(
@@ -490,6 +654,56 @@ def test_get_user_liked_videos_success(monkeypatch: pytest.MonkeyPatch) -> None:
     assert tiktok.get_user_liked_videos("u") == [{"id": "1"}]
 
 
+@pytest.mark.unit
+def test_get_user_liked_videos_passes_cursor(monkeypatch: pytest.MonkeyPatch) -> None:
+    urls: list[str] = []
+
+    def yt_dlp_request(_opts, url, **_kwargs):
+        urls.append(url)
+        return {"entries": []}
+
+    monkeypatch.setattr(tiktok, "yt_dlp_request", yt_dlp_request)
+    tiktok.get_user_liked_videos("u")
+    tiktok.get_user_liked_videos("u", cursor=123)
+
+    assert urls[0] == "tiktokliked:u"
+    assert unsmuggle_url(urls[1]) == ("tiktokliked:u", {"cursor": 123})
+
+
+class _PagedUserIE(tiktok.TikTokUserBaseIE):
+    _API_BASE_URL = "https://example.com/api"
+
+    def __init__(self, pages: dict[int, dict]):
+        super().__init__()
+        self.pages = pages
+        self.requested: list[int] = []
+
+    def _build_web_query(self, _sec_uid, cursor):
+        return {"cursor": cursor}
+
+    def _download_json(self, _url, _video_id, _note, query):
+        self.requested.append(query["cursor"])
+        return self.pages[query["cursor"]]
+
+    def _parse_aweme_video_web(self, video, _webpage_url, video_id, extract_flat=False):  # noqa: ARG002
+        return {"id": video_id}
+
+
+@pytest.mark.unit
+def test_user_entries_start_from_cursor_and_report_page_cursor() -> None:
+    base = 1_700_000_000_000
+    pages = {
+        base: {"itemList": [{"id": "3"}, {"id": "2"}], "cursor": base - 10, "hasMore": True},
+        base - 10: {"itemList": [{"id": "1"}], "cursor": base - 20, "hasMore": False},
+    }
+    ie = _PagedUserIE(pages)
+
+    entries = [(e["id"], e["page_cursor"]) for e in ie._entries("sec", "u", cursor=base)]
+
+    assert entries == [("3", base), ("2", base), ("1", base - 10)]
+    assert ie.requested == [base, base - 10]
+
+
 @pytest.mark.unit
 def test_get_user_saved_videos_returns_empty_on_error(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(
@@ -522,31 +736,226 @@ def test_get_user_saved_videos_success(monkeypatch: pytest.MonkeyPatch) -> None:
 
 
 @pytest.mark.unit
-def test_download_slideshow_returns_false_on_job_error(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(tiktok, "temp_files_cleanup", lambda: None)
+def test_download_slideshow_returns_false_on_job_error(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
+    monkeypatch.setattr(tiktok, "SLIDESHOW_DOWNLOAD_WORKERS", 0)
 
     class FakeJob:
         def __init__(self, _url: str):
-            pass
+            self.extractor = SimpleNamespace(config=lambda _key, default=None: default)
 
         def run(self):
             raise RuntimeError("fail")
 
     monkeypatch.setattr(tiktok.job, "DownloadJob", FakeJob)
     assert tiktok.download_slideshow("1") is False
+    assert list(tmp_path.iterdir()) == []
+
+
+class FakePhotoExtractor(tiktok.Extractor):
+    """Экстрактор gallery_dl, отдающий ресурсы слайдшоу ссылками text: без сети"""
+
+    category = "tiktok"
+    subcategory = "post"
+    pattern = r"fake:(\d+)"
+
+    def items(self):
+        post: dict = {"id": self.groups[0]}
+        yield tiktok.Message.Directory, "", post
+        for i in range(1, 3):
+            post.update(num=i, extension="jpg")
+            yield tiktok.Message.Url, f"text:image{i}", post
+        post.update(num=0, extension="mp3")
+        yield tiktok.Message.Url, "text:audio", post
 
 
 @pytest.mark.unit
-def test_download_slideshow_returns_render_result(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(tiktok, "temp_files_cleanup", lambda: None)
+def test_download_slideshow_saves_files_to_job_workspace(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path / "workspaces")
+    media.WORKSPACES_DIR.mkdir()
+    monkeypatch.setattr(tiktok, "SLIDESHOW_DOWNLOAD_WORKERS", 0)
+    # Без переопределения gallery_dl сохранил бы файлы в ./gallery-dl
+    monkeypatch.chdir(tmp_path)
+    download_job = tiktok.job.DownloadJob
+    monkeypatch.setattr(
+        tiktok.job, "DownloadJob", lambda _url: download_job(FakePhotoExtractor.from_url("fake:1"))
+    )
 
-    class FakeJob:
-        def __init__(self, _url: str):
-            pass
+    rendered: list[Path] = []
 
-        def run(self):
-            return None
+    def fake_render(_id: str, slideshow_dir: Path) -> bool:
+        rendered.append(slideshow_dir)
+        files = {path.name: path.read_bytes() for path in slideshow_dir.iterdir()}
+        assert files == {"1.jpg": b"image1", "2.jpg": b"image2", "audio.mp3": b"audio"}
+        return True
 
-    monkeypatch.setattr(tiktok.job, "DownloadJob", FakeJob)
-    monkeypatch.setattr(tiktok, "render_slideshow", lambda _id: True)
+    monkeypatch.setattr(tiktok, "render_slideshow", fake_render)
+
+    assert tiktok.download_slideshow("1") is True
+    assert rendered[0].parent == media.WORKSPACES_DIR
+    # Директория задачи удаляется после рендера, в текущую директорию ничего не пишется
+    assert list(media.WORKSPACES_DIR.iterdir()) == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["workspaces"]
+
+
+class FakeSlideshowExtractor:
+    """Экстрактор gallery_dl: отдаёт ссылки на ресурсы и качает их с заданными ошибками"""
+
+    def __init__(self, image_count: int, failures: dict[str, int] | None = None):
+        self.image_count = image_count
+        self.failures = failures or {}
+        self.requests: list[str] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        post: dict = {}
+        yield tiktok.Message.Directory, "", post
+        for i in range(1, self.image_count + 1):
+            post.update(num=i, extension="jpg")
+            yield tiktok.Message.Url, f"https://img/{i}", post
+        post.update(num=0, extension="mp3")
+        yield tiktok.Message.Url, "https://audio", post
+
+    def request(self, url: str, **kwargs):
+        assert kwargs["interval"] is False
+        with self._lock:
+            self.requests.append(url)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            # time.sleep подменяется в тестах, поэтому ждём через Event
+            threading.Event().wait(0.01)
+            if self.failures.get(url, 0) > 0:
+                self.failures[url] -= 1
+                raise ConnectionError(url)
+            return SimpleNamespace(iter_content=lambda _size: [url.encode()])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.mark.unit
+def test_download_slideshow_fetches_assets_concurrently(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
+    monkeypatch.setattr(tiktok, "SLIDESHOW_DOWNLOAD_WORKERS", 4)
+    monkeypatch.setattr(tiktok.time, "sleep", lambda _s: None)
+    extractor = FakeSlideshowExtractor(12, failures={"https://img/3": 1})
+    monkeypatch.setattr(tiktok, "find_extractor", lambda _url: extractor)
+
+    def fake_render(_id: str, slideshow_dir: Path) -> bool:
+        files = sorted(p.name for p in slideshow_dir.iterdir())
+        assert files == sorted([f"{i}.jpg" for i in range(1, 13)] + ["audio.mp3"])
+        assert (slideshow_dir / "3.jpg").read_bytes() == b"https://img/3"
+        assert (slideshow_dir / "audio.mp3").read_bytes() == b"https://audio"
+        return True
+
+    monkeypatch.setattr(tiktok, "render_slideshow", fake_render)
     assert tiktok.download_slideshow("1") is True
+    # Ошибка одного ресурса повторяется только для него
+    assert len(extractor.requests) == 14
+    assert extractor.requests.count("https://img/3") == 2
+    assert 1 < extractor.max_active <= 4
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+def test_download_slideshow_fails_when_asset_retries_exhausted(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
+    monkeypatch.setattr(tiktok, "SLIDESHOW_DOWNLOAD_WORKERS", 4)
+    monkeypatch.setattr(tiktok, "MAX_RETRIES", 3)
+    monkeypatch.setattr(tiktok.time, "sleep", lambda _s: None)
+    extractor = FakeSlideshowExtractor(2, failures={"https://audio": 5})
+    monkeypatch.setattr(tiktok, "find_extractor", lambda _url: extractor)
+    monkeypatch.setattr(tiktok, "render_slideshow", lambda *_: pytest.fail("must not render"))
+
+    assert tiktok.download_slideshow("1") is False
+    assert extractor.requests.count("https://audio") == 3
+
+
+@pytest.mark.unit
+def test_download_slideshow_fails_without_assets(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(media, "WORKSPACES_DIR", tmp_path)
+    monkeypatch.setattr(tiktok, "SLIDESHOW_DOWNLOAD_WORKERS", 4)
+    monkeypatch.setattr(tiktok, "find_extractor", lambda _url: [])
+    monkeypatch.setattr(tiktok, "render_slideshow", lambda *_: pytest.fail("must not render"))
+
+    assert tiktok.download_slideshow("1") is False
+
+
+@pytest.mark.unit
+def test_probe_videos_availability_confirms_only_available_videos(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requested: list[str] = []
+
+    def fake_request(_ydl_opts, url, **_kwargs):
+        requested.append(url)
+        return {
+            "entries": [
+                {"aweme_id": "1", "create_time": 1700000000, "status": {}},
+                {"aweme_id": "2", "status": {"is_delete": True}},
+                {"aweme_id": "3", "status": {"private_status": 1}},
+            ]
+        }
+
+    monkeypatch.setattr(tiktok, "yt_dlp_request", fake_request)
+
+    result = tiktok.probe_videos_availability(["1", "2", "3", "4"])
+
+    assert requested == ["tiktokprobe:1,2,3,4"]
+    assert set(result) == {"1"}
+    assert result["1"].deleted_reason is None
+    assert result["1"].date == datetime.fromtimestamp(1700000000)
+
+
+@pytest.mark.unit
+def test_probe_videos_availability_batches_and_skips_failed_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requested: list[list[str]] = []
+
+    def fake_request(_ydl_opts, url, **_kwargs):
+        ids = url.removeprefix("tiktokprobe:").split(",")
+        requested.append(ids)
+        if len(requested) == 2:
+            raise tiktok.NetworkError()
+        return {"entries": [{"aweme_id": video_id} for video_id in ids]}
+
+    monkeypatch.setattr(tiktok, "yt_dlp_request", fake_request)
+    monkeypatch.setattr(tiktok, "PROBE_BATCH_SIZE", 2)
+
+    result = tiktok.probe_videos_availability(["1", "2", "3", "4", "5"])
+
+    assert requested == [["1", "2"], ["3", "4"], ["5"]]
+    assert set(result) == {"1", "2", "5"}
+
+
+@pytest.mark.unit
+def test_probe_videos_availability_passes_limiter_to_each_batch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    limiters: list[object] = []
+
+    def fake_request(_ydl_opts, **kwargs):
+        limiters.append(kwargs["limiter"])
+        return {"entries": []}
+
+    monkeypatch.setattr(tiktok, "yt_dlp_request", fake_request)
+    monkeypatch.setattr(tiktok, "PROBE_BATCH_SIZE", 2)
+    limiter = object()
+
+    tiktok.probe_videos_availability(["1", "2", "3"], limiter)
+
+    assert limiters == [limiter, limiter]
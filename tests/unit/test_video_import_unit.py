@@ -1,5 +1,5 @@
 import json
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -75,8 +75,8 @@ def assert_flags_for_ids(
 
 
 @pytest.mark.unit
-def test_parse_tiktok_json_file_parses_and_sorts_and_deduplicates(
-    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+def test_iter_tiktok_json_file_parses_and_import_chunk_deduplicates(
+    sqlite_session: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
     file = tmp_path / "tiktok.json"
     _write_json(
@@ -117,17 +117,26 @@ def test_parse_tiktok_json_file_parses_and_sorts_and_deduplicates(
     monkeypatch.setattr(video_import, "DOWNLOAD_SAVED_VIDEOS", True)
     monkeypatch.setattr(video_import, "DOWNLOAD_LIKED_VIDEOS", True)
 
-    result = video_import.parse_tiktok_json_file(str(file))
+    result = list(video_import.iter_tiktok_json_file(str(file)))
 
+    # Видео идут в порядке файла, повторы объединяются только при записи в базу
     assert result == [
-        VideoInfo(id="2", date=datetime(2025, 1, 2, 10, 0, 0), liked=True, saved=False),
         VideoInfo(id="3", date=datetime(2025, 1, 3, 10, 0, 0), liked=False, saved=True),
-        VideoInfo(id="4", date=datetime(2025, 1, 4, 10, 0, 0), liked=True, saved=True),
+        VideoInfo(id="4", date=datetime(2025, 1, 4, 10, 0, 0), liked=False, saved=True),
+        VideoInfo(id="2", date=datetime(2025, 1, 2, 10, 0, 0), liked=True, saved=False),
+        VideoInfo(id="2", date=datetime(2025, 1, 2, 10, 0, 0), liked=True, saved=False),
+        VideoInfo(id="4", date=datetime(2025, 1, 4, 10, 0, 0), liked=True, saved=False),
     ]
+    assert video_import._import_chunk(sqlite_session, result) == (3, 0)
+    assert read_state(sqlite_session) == {
+        "2": (True, False),
+        "3": (False, True),
+        "4": (True, True),
+    }
 
 
 @pytest.mark.unit
-def test_parse_tiktok_json_file_returns_none_on_invalid_shape(
+def test_iter_tiktok_json_file_raises_on_invalid_shape(
     tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
     file = tmp_path / "bad.json"
@@ -135,11 +144,12 @@ def test_parse_tiktok_json_file_returns_none_on_invalid_shape(
     monkeypatch.setattr(video_import, "DOWNLOAD_SAVED_VIDEOS", True)
     monkeypatch.setattr(video_import, "DOWNLOAD_LIKED_VIDEOS", True)
 
-    assert video_import.parse_tiktok_json_file(str(file)) is None
+    with pytest.raises(KeyError):
+        list(video_import.iter_tiktok_json_file(str(file)))
 
 
 @pytest.mark.unit
-def test_parse_tiktok_json_file_respects_import_flags(
+def test_iter_tiktok_json_file_respects_import_flags(
     tmp_path: Path, monkeypatch: pytest.MonkeyPatch
 ) -> None:
     file = tmp_path / "flags.json"
@@ -173,7 +183,7 @@ def test_parse_tiktok_json_file_respects_import_flags(
     monkeypatch.setattr(video_import, "DOWNLOAD_SAVED_VIDEOS", False)
     monkeypatch.setattr(video_import, "DOWNLOAD_LIKED_VIDEOS", True)
 
-    result = video_import.parse_tiktok_json_file(str(file))
+    result = list(video_import.iter_tiktok_json_file(str(file)))
 
     assert result == [
         VideoInfo(id="2", date=datetime(2025, 1, 2, 10, 0, 0), liked=True, saved=False)
@@ -189,7 +199,7 @@ def test_import_from_file_returns_when_source_missing(
     called = []
     monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
     monkeypatch.setattr(video_import.crud, "get_videos", lambda _db: [])
-    monkeypatch.setattr(video_import, "parse_tiktok_json_file", lambda _p: called.append("parse"))
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", lambda _p: called.append("parse"))
     monkeypatch.setattr(
         video_import.crud, "add_videos_bulk", lambda _db, _videos: called.append("bulk")
     )
@@ -206,7 +216,7 @@ def test_import_from_file_returns_when_parser_returns_no_videos(
     monkeypatch.setattr(video_import, "TIKTOK_DATA_FILE", "/tmp/ok.json")
     monkeypatch.setattr(video_import.os.path, "exists", lambda _p: True)
     monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
-    monkeypatch.setattr(video_import, "parse_tiktok_json_file", lambda _p: [])
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", lambda _p: [])
     called = {"bulk": False}
     monkeypatch.setattr(
         video_import.crud,
@@ -232,7 +242,7 @@ def test_import_from_file_add_videos_bulk_only_new_ids(
     d_old = datetime(2025, 1, 15, 12, 0, 0)
     monkeypatch.setattr(
         video_import,
-        "parse_tiktok_json_file",
+        "iter_tiktok_json_file",
         lambda _p: [
             VideoInfo(id="already", date=d_old),
             VideoInfo(id="fresh", date=d_new),
@@ -265,7 +275,7 @@ def test_import_from_file_update_video_sources_bulk_when_existing_gains_like(
     monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
     d = datetime(2025, 2, 1, 12, 0, 0)
     parsed = [VideoInfo(id="2", date=d, liked=True, saved=False)]
-    monkeypatch.setattr(video_import, "parse_tiktok_json_file", lambda _p: parsed)
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", lambda _p: parsed)
 
     bulk_batches: list[list[VideoInfo]] = []
     update_batches: list[list[VideoInfo]] = []
@@ -301,7 +311,7 @@ def test_import_from_file_update_video_sources_bulk_when_existing_gains_saved(
     monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
     d = datetime(2025, 2, 1, 12, 0, 0)
     parsed = [VideoInfo(id="2", date=d, liked=False, saved=True)]
-    monkeypatch.setattr(video_import, "parse_tiktok_json_file", lambda _p: parsed)
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", lambda _p: parsed)
 
     bulk_batches: list[list[VideoInfo]] = []
     update_batches: list[list[VideoInfo]] = []
@@ -341,7 +351,7 @@ def test_import_from_file_mixed_add_and_update_video_sources(
         VideoInfo(id="old", date=d_old, liked=True, saved=False),
         VideoInfo(id="fresh", date=d_new, liked=True, saved=False),
     ]
-    monkeypatch.setattr(video_import, "parse_tiktok_json_file", lambda _p: parsed)
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", lambda _p: parsed)
 
     bulk_batches: list[list[VideoInfo]] = []
     update_batches: list[list[VideoInfo]] = []
@@ -377,7 +387,7 @@ def test_import_from_file_no_update_when_sources_already_match(
     monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
     d = datetime(2025, 2, 1, 12, 0, 0)
     parsed = [VideoInfo(id="2", date=d, liked=True, saved=True)]
-    monkeypatch.setattr(video_import, "parse_tiktok_json_file", lambda _p: parsed)
+    monkeypatch.setattr(video_import, "iter_tiktok_json_file", lambda _p: parsed)
 
     update_called = False
 
@@ -752,3 +762,132 @@ def test_deprecated_run_imports_from_file(monkeypatch: pytest.MonkeyPatch) -> No
     video_import.deprecated_run()
 
     assert called == ["migrations", "from_file", "download"]
+
+
+def make_paged_importer(
+    video_ids: list[str], page_size: int = 5, fail_on_page: int | None = None
+) -> tuple[Callable[..., Iterator[dict]], list[int | None]]:
+    """Лента как в TikTok: страницы листаются по курсору-времени, от новых видео к старым"""
+    timestamps = {video_id: 1735689600 - index for index, video_id in enumerate(video_ids)}
+    requested: list[int | None] = []
+
+    def importer(_user: str, cursor: int | None = None) -> Iterator[dict]:
+        while True:
+            requested.append(cursor)
+            if fail_on_page is not None and len(requested) == fail_on_page:
+                raise RuntimeError("TikTok API error")
+            page = [
+                video_id
+                for video_id in video_ids
+                if cursor is None or timestamps[video_id] < cursor
+            ][:page_size]
+            if not page:
+                return
+            for video_id in page:
+                yield {"id": video_id, "timestamp": timestamps[video_id], "page_cursor": cursor}
+            cursor = timestamps[page[-1]]
+
+    return importer, requested
+
+
+def read_import_state(sqlite_session: Session, source: str) -> dict:
+    return json.loads(crud.get_state(sqlite_session, f"tiktok_import:{source}"))
+
+
+@pytest.mark.unit
+def test_import_from_tiktok_stops_at_previous_newest_videos(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    already_liked_ids = make_ids("already-liked-", 20)
+    first_ids = make_ids("first-", 7)
+    second_ids = make_ids("second-", 3)
+    seed_db_videos(sqlite_session, make_db_rows(already_liked_ids, liked=True))
+    monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
+
+    importer, requested = make_paged_importer(first_ids + already_liked_ids)
+    video_import.import_from_tiktok_source(importer=importer, source="liked")
+    # Первый импорт без отметки останавливается по эвристике
+    assert len(requested) == 4
+    assert read_import_state(sqlite_session, "liked") == {
+        "newest_ids": first_ids + already_liked_ids[:3],
+        "pending": None,
+    }
+
+    importer, requested = make_paged_importer(second_ids + first_ids + already_liked_ids)
+    video_import.import_from_tiktok_source(importer=importer, source="liked")
+
+    # Дошли до отметки на первой странице и дальше не листали
+    assert requested == [None]
+    assert read_import_state(sqlite_session, "liked")["newest_ids"] == (second_ids + first_ids)
+    assert_flags_for_ids(read_state(sqlite_session), second_ids + first_ids, (True, False))
+
+
+@pytest.mark.unit
+def test_import_from_tiktok_resumes_interrupted_import_from_cursor(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    already_liked_ids = make_ids("already-liked-", 20)
+    new_ids = make_ids("new-", 12)
+    fresh_ids = make_ids("fresh-", 2)
+    seed_db_videos(sqlite_session, make_db_rows(already_liked_ids, liked=True))
+    crud.set_state(
+        sqlite_session,
+        "tiktok_import:liked",
+        json.dumps({"newest_ids": already_liked_ids[:10], "pending": None}),
+    )
+    monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
+
+    importer, requested = make_paged_importer(new_ids + already_liked_ids, fail_on_page=3)
+    video_import.import_from_tiktok_source(importer=importer, source="liked")
+
+    state = read_import_state(sqlite_session, "liked")
+    assert state["newest_ids"] == already_liked_ids[:10]
+    assert state["pending"] == {"newest_ids": new_ids[:10], "cursor": requested[1]}
+    assert set(read_state(sqlite_session)) >= set(new_ids[:10])
+
+    importer, requested = make_paged_importer(fresh_ids + new_ids + already_liked_ids)
+    video_import.import_from_tiktok_source(importer=importer, source="liked")
+
+    # Новые видео до отметки прерванного импорта, затем продолжение с сохранённого курсора
+    assert requested[:2] == [None, state["pending"]["cursor"]]
+    assert len(requested) == 3
+    assert read_import_state(sqlite_session, "liked") == {
+        "newest_ids": fresh_ids + new_ids[:8],
+        "pending": None,
+    }
+    assert_flags_for_ids(read_state(sqlite_session), fresh_ids + new_ids, (True, False))
+
+
+@pytest.mark.unit
+def test_import_from_tiktok_resume_does_not_stop_on_refetched_page(
+    sqlite_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Страница больше 10 видео: повторно полученная страница прерванного импорта
+    # целиком из уже импортированных видео и не должна останавливать продолжение
+    already_liked_ids = make_ids("already-liked-", 20)
+    new_ids = make_ids("new-", 60)
+    seed_db_videos(sqlite_session, make_db_rows(already_liked_ids, liked=True))
+    crud.set_state(
+        sqlite_session,
+        "tiktok_import:liked",
+        json.dumps({"newest_ids": already_liked_ids[:10], "pending": None}),
+    )
+    monkeypatch.setattr(video_import, "get_db_session", lambda: sqlite_session)
+
+    importer, requested = make_paged_importer(
+        new_ids + already_liked_ids, page_size=15, fail_on_page=3
+    )
+    video_import.import_from_tiktok_source(importer=importer, source="liked")
+    pending = read_import_state(sqlite_session, "liked")["pending"]
+    assert pending["cursor"] == requested[1]
+    assert len(read_state(sqlite_session)) == 20 + 30
+
+    importer, requested = make_paged_importer(new_ids + already_liked_ids, page_size=15)
+    video_import.import_from_tiktok_source(importer=importer, source="liked")
+
+    assert requested[:2] == [None, pending["cursor"]]
+    assert read_import_state(sqlite_session, "liked") == {
+        "newest_ids": new_ids[:10],
+        "pending": None,
+    }
+    assert_flags_for_ids(read_state(sqlite_session), new_ids, (True, False))